@@ -0,0 +1,694 @@
+import asyncio
+import itertools
+import json
+import signal
+import socket
+import time
+from urllib.parse import urlsplit
+
+from browserProfile import LeanProfile, chrome_options
+from bufferedQue import BufferedQue, SeenIDs
+from metrics import (BROWSER_RESTARTS, DUPLICATES_SKIPPED, PAGE_LOAD_SECONDS,
+                     SCROLL_EXTRACT_SECONDS, TWEET_RATE, TWEETS_COLLECTED,
+                     WINDOW_RETRIES, WINDOW_SECONDS, WINDOWS, WINDOWS_IN_FLIGHT,
+                     log)
+from pageScripts import (BASE_URL, EMPTY_SEARCH_SELECTOR, EXTRACT_TWEETS_SCRIPT,
+                         LOADING_SELECTOR, PACING_MODES, TWEET_SELECTOR,
+                         WAIT_FOR_NODES_SCRIPT, extract_tweets_args,
+                         search_url, tweets_from_script, window_tweet_ids)
+from scheduler import WindowResult
+
+W3C_ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+class WebDriverError(Exception):
+    """Error response of a WebDriver command"""
+
+    def __init__(self, error: str, message: str):
+        super().__init__(f"{error}: {message}")
+        self.error = error
+
+
+class AsyncWebDriver:
+    """
+    Minimal asyncio client of a W3C WebDriver HTTP endpoint (e.g.
+    chromedriver). Commands of a session are sent one at a time over a
+    single kept-alive connection.
+    """
+
+    def __init__(self, url: str, process=None):
+        """
+            Args:
+                `url` (str): base url of WebDriver endpoint
+                    (e.g. 'http://127.0.0.1:9515')
+                `process` (asyncio.subprocess.Process): driver process that
+                    is terminated on `quit`
+        """
+        address = urlsplit(url)
+        self._host = address.hostname
+        self._port = address.port or 80
+        self._prefix = address.path.rstrip('/')
+        self._process = process
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+        self.session_id = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self._host, self._port)
+        sock = self._writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    async def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def _read_response(self) -> tuple:
+        """Reads an HTTP response, returns status code and decoded body"""
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by webdriver")
+        status = int(status_line.split()[1])
+        headers = dict()
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, value = line.decode('latin-1').split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await self._reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                body += await self._reader.readexactly(size)
+                await self._reader.readline()
+        else:
+            body = await self._reader.readexactly(
+                int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            await self._disconnect()
+        return status, body
+
+    async def request(self, method: str, path: str, payload=None):
+        """
+            Sends a command and returns `value` of its response.
+
+                Raises:
+                    WebDriverError if webdriver responds with an error
+        """
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = (f"{method} {self._prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self._host}:{self._port}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: keep-alive\r\n\r\n").encode()
+
+        async with self._lock:
+            for attempt in range(2):
+                reused = self._writer is not None
+                if not reused:
+                    await self._connect()
+                try:
+                    self._writer.write(head + body)
+                    await self._writer.drain()
+                    status, response = await self._read_response()
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    await self._disconnect()
+                    # a kept-alive connection may be closed by the server
+                    if not reused or attempt:
+                        raise
+
+        value = json.loads(response).get('value') if response else None
+        if status >= 400 or (isinstance(value, dict) and 'error' in value):
+            error = value if isinstance(value, dict) else dict()
+            raise WebDriverError(error.get('error', str(status)),
+                                 error.get('message', ''))
+        return value
+
+    async def _session_request(self, method: str, path: str, payload=None):
+        return await self.request(method, f"/session/{self.session_id}{path}",
+                                  payload)
+
+    async def new_session(self, capabilities: dict) -> None:
+        value = await self.request('POST', "/session",
+                                   {'capabilities': {'alwaysMatch': capabilities}})
+        self.session_id = value['sessionId']
+
+    async def execute_cdp_cmd(self, cmd: str, params: dict):
+        """Runs a Chrome DevTools Protocol command (chromedriver only)"""
+        return await self._session_request(
+            'POST', "/goog/cdp/execute", {'cmd': cmd, 'params': params})
+
+    async def get(self, url: str) -> None:
+        await self._session_request('POST', "/url", {'url': url})
+
+    async def set_script_timeout(self, seconds: float) -> None:
+        await self._session_request('POST', "/timeouts",
+                                    {'script': int(seconds * 1000)})
+
+    async def execute_script(self, script: str, *args):
+        return await self._session_request(
+            'POST', "/execute/sync", {'script': script, 'args': list(args)})
+
+    async def execute_async_script(self, script: str, *args):
+        return await self._session_request(
+            'POST', "/execute/async", {'script': script, 'args': list(args)})
+
+    async def find_element_by_xpath(self, xpath: str) -> str:
+        """Returns id of first element matching `xpath`"""
+        value = await self._session_request(
+            'POST', "/element", {'using': 'xpath', 'value': xpath})
+        return value[W3C_ELEMENT_KEY]
+
+    async def send_keys(self, element: str, text: str) -> None:
+        await self._session_request('POST', f"/element/{element}/value",
+                                    {'text': text})
+
+    async def click(self, element: str) -> None:
+        await self._session_request('POST', f"/element/{element}/click", {})
+
+    async def quit(self) -> None:
+        """Deletes session, closes connection and stops driver process"""
+        try:
+            if self.session_id is not None:
+                await self._session_request('DELETE', "")
+        except (WebDriverError, OSError):
+            pass
+        finally:
+            self.session_id = None
+            await self._disconnect()
+            if self._process is not None and self._process.returncode is None:
+                self._process.terminate()
+                await self._process.wait()
+
+
+async def start_chromedriver(chromePath: str, timeout=20.0) -> AsyncWebDriver:
+    """Starts chromedriver on a free port and waits until it is ready"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    process = await asyncio.create_subprocess_exec(
+        chromePath, f"--port={port}", stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL)
+    driver = AsyncWebDriver(f"http://127.0.0.1:{port}", process=process)
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            if (await driver.request('GET', "/status")).get('ready'):
+                return driver
+        except OSError:
+            await driver._disconnect()
+        if time.time() > deadline:
+            await driver.quit()
+            raise TimeoutError(f"chromedriver is not ready in {timeout}s")
+        await asyncio.sleep(0.1)
+
+
+class AsyncCollector:
+    """
+    asyncio version of Collector that drives a browser through an
+    AsyncWebDriver, so many collectors run on one event loop without a
+    thread each. `search` and `retrieve_tweets_to_container` follow the
+    semantics of Collector methods with script extraction.
+    """
+
+    _Lsleep_seconds = 3.0
+    _Msleep_seconds = 2.25
+    _Ssleep_seconds = 1.5
+    _event_timeout_seconds = 1.5
+    _event_max_timeout_seconds = 12.0
+    _event_settle_seconds = 0.2
+    _event_end_tries = 3
+    _ids = itertools.count(1)
+
+    def __init__(self, driver: AsyncWebDriver):
+        """
+            Use `start` to create a logged in collector.
+
+                Args:
+                    `driver` (AsyncWebDriver): driver with an open session
+        """
+        self._driver = driver
+        self._process = False
+        self._page_count = 0
+        # window of the search page and ids of tweets collected on the page
+        # since the last script call (None before the first call)
+        self._search_window = (None, None)
+        self._known_ids = None
+        # name of the collector in logs, and its worker slot in metrics that
+        # is kept by the collector replacing it (see `AsyncEngine`)
+        self.name = f"async{next(self._ids)}"
+        self.slot = 0
+
+    @classmethod
+    async def start(cls, username: str, password: str, chromePath=None,
+                    url=None, lean_profile: LeanProfile = None) -> 'AsyncCollector':
+        """
+            Starts a headless browser session and logs in.
+
+                Args:
+                    `username` (str): Twitter account's username, browser is
+                        not logged in if None
+                    `password` (str): Twitter account's password
+                    `chromePath` (str): chromedriver executable that is
+                        started for the collector
+                    `url` (str): url of a running WebDriver endpoint to use
+                        instead of starting chromedriver
+                    `lean_profile` (LeanProfile): browser profile, see
+                        `browserProfile`
+        """
+        if url is not None:
+            driver = AsyncWebDriver(url)
+        else:
+            driver = await start_chromedriver(chromePath or "chromedriver")
+        try:
+            await driver.new_session({'browserName': 'chrome',
+                                      'goog:chromeOptions': chrome_options(lean_profile)})
+            if lean_profile is not None and lean_profile.blocked_urls:
+                await driver.execute_cdp_cmd('Network.enable', {})
+                await driver.execute_cdp_cmd(
+                    'Network.setBlockedURLs', {'urls': list(lean_profile.blocked_urls)})
+            await driver.set_script_timeout(cls._event_max_timeout_seconds + 5)
+            collector = cls(driver)
+            if username is not None:
+                await collector._login(username, password)
+        except BaseException:
+            await driver.quit()
+            raise
+        return collector
+
+    async def _login(self, username: str, password: str) -> None:
+        """Logs in to twitter with given account"""
+        await self._driver.get(BASE_URL + "login")
+        element = await self._driver.find_element_by_xpath(
+            "//input[contains(@name, 'username')]")
+        await self._driver.send_keys(element, username)
+        await asyncio.sleep(0.5)
+        element = await self._driver.find_element_by_xpath(
+            "//input[contains(@name, 'password')]")
+        await self._driver.send_keys(element, password)
+        await self._driver.click(await self._driver.find_element_by_xpath(
+            "//div[contains(@data-testid, 'LoginForm_Login_Button')]"))
+        await asyncio.sleep(self._Msleep_seconds)
+
+    @property
+    def page_count(self) -> int:
+        """Number of search pages loaded by this collector"""
+        return self._page_count
+
+    async def is_alive(self) -> bool:
+        """Returns true if browser of the collector still responds"""
+        try:
+            return await self._driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    async def search(self, searchKey: str, tabName="top", from_=None, to_=None,
+                     lang=None, pacing='sleep') -> None:
+        """Makes a search on twitter, see `Collector.search`"""
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+
+        search_str = search_url(searchKey, tabName, from_, to_, lang)
+        self._search_window = (from_, to_)
+        self._known_ids = None
+        log('search', search_str, collector=self.name, url=search_str)
+        t0 = time.perf_counter()
+        await self._driver.get(search_str)
+        self._page_count += 1
+        if pacing == 'event':
+            await self._wait_for_nodes(f"{TWEET_SELECTOR}, {EMPTY_SEARCH_SELECTOR}",
+                                       self._event_max_timeout_seconds)
+        else:
+            await asyncio.sleep(self._Msleep_seconds)
+        PAGE_LOAD_SECONDS.observe(time.perf_counter() - t0)
+
+    async def _wait_for_nodes(self, selector: str, timeout: float, scroll=False) -> str:
+        """Waits until a node matching `selector` is rendered, see
+        `Collector._wait_for_nodes`"""
+        return await self._driver.execute_async_script(
+            WAIT_FOR_NODES_SCRIPT, selector, scroll, int(timeout * 1000),
+            int(self._event_settle_seconds * 1000), LOADING_SELECTOR)
+
+    async def _extract_tweets(self, searchKey, lang, is_known, seen) -> list:
+        """Returns visible tweets that are not known, read with a single
+        script call, see `Collector._extract_tweets_by_script`"""
+        if self._known_ids is None:
+            known_ids = window_tweet_ids(seen, *self._search_window)
+        else:
+            known_ids = self._known_ids
+        result = await self._driver.execute_script(
+            EXTRACT_TWEETS_SCRIPT, *extract_tweets_args(lang, known_ids))
+        tweets = list(tweets_from_script(result, searchKey, is_known))
+        self._known_ids = [tweet.tweet_id for tweet in tweets]
+        return tweets
+
+    async def retrieve_tweets_to_container(self, searchKey, container, lang='en',
+                                           extraction='script', pacing='sleep',
+                                           checkpoint=None,
+                                           seen: SeenIDs = None) -> int:
+        """
+            Scrolls through search results and passes tweets to container,
+            see `Collector.retrieve_tweets_to_container`. Only `'script'`
+            extraction is supported. `container.extend` and `checkpoint`
+            are called on the default executor of the event loop, since they
+            may block (e.g. DBWriter with a full queue).
+
+                Returns:
+                    number of tweets appended to container
+        """
+        if extraction != 'script':
+            raise ValueError(f"unsupported extraction mode: {extraction}")
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+
+        retrieved_count = 0
+        scroll_height = 0
+        try_count = 0
+        max_try_count = self._event_end_tries if pacing == 'event' else 5
+        timeout = self._event_timeout_seconds
+        page_state = None
+        oldest = None
+        last_tweet = None
+        bufque = BufferedQue(50)
+        skipped_ids = set()
+        self._process = True
+        t_start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        def is_known(tweet_id):
+            if bufque.contains(tweet_id):
+                return True
+            if seen is not None and tweet_id in seen:
+                skipped_ids.add(tweet_id)
+                return True
+            return False
+
+        # Collect tweets until enough different tweet is collected
+        while try_count < max_try_count and self._process:
+            if pacing == 'sleep':
+                # Control if reached the end
+                new_scroll_height = await self._driver.execute_script(
+                    "return document.documentElement.scrollHeight")
+                if abs(scroll_height - new_scroll_height) < 5:
+                    try_count += 1
+                else:
+                    try_count = 0
+                    scroll_height = new_scroll_height
+
+            # Extract visible tweets and add them to bufferedque
+            skipped_count = len(skipped_ids)
+            oldest_changed = False
+            t0 = time.perf_counter()
+            tweets = await self._extract_tweets(searchKey, lang, is_known, seen)
+            SCROLL_EXTRACT_SECONDS.observe(time.perf_counter() - t0,
+                                           extraction=extraction)
+            TWEETS_COLLECTED.inc(len(tweets), worker=self.slot)
+            DUPLICATES_SKIPPED.inc(len(skipped_ids) - skipped_count,
+                                   worker=self.slot)
+            overhead_tweets = []
+            for tweet in tweets:
+                overhead_tweet = bufque.add(tweet.tweet_id, tweet)
+                if overhead_tweet is not None:
+                    overhead_tweets.append(overhead_tweet)
+                    if seen is not None:
+                        seen.add(overhead_tweet.tweet_id)
+                    if (oldest is None or
+                            overhead_tweet.timestamp < oldest.timestamp):
+                        oldest = overhead_tweet
+                        oldest_changed = True
+                last_tweet = tweet
+            retrieved_count += len(tweets)
+            # progress is passed after its tweets
+            if overhead_tweets:
+                await loop.run_in_executor(None, container.extend, overhead_tweets)
+            if checkpoint is not None and oldest_changed:
+                await loop.run_in_executor(None, checkpoint, oldest, False)
+
+            if pacing == 'event':
+                # Control if reached the end, wait longer while page is loading
+                if tweets or len(skipped_ids) > skipped_count:
+                    try_count = 0
+                    timeout = self._event_timeout_seconds
+                elif (page_state == 'loading' and
+                        timeout < self._event_max_timeout_seconds):
+                    timeout = min(timeout * 2, self._event_max_timeout_seconds)
+                else:
+                    try_count += 1
+
+                # Scroll page down and wait for new tweets
+                if try_count < max_try_count:
+                    page_state = await self._wait_for_nodes(
+                        TWEET_SELECTOR, timeout, scroll=True)
+            else:
+                # Scroll page down
+                await self._driver.execute_script(
+                    "window.scrollTo(0, document.body.scrollHeight)")
+                await asyncio.sleep(self._Ssleep_seconds)
+
+            # Process information
+            if last_tweet is not None:
+                last_date = time.strftime("%Y-%m-%d", time.gmtime(last_tweet.timestamp))
+                log('scroll',
+                    f"Last retrieved date: {last_date}({retrieved_count})-try count: {try_count}",
+                    collector=self.name, last_date=last_date,
+                    retrieved=retrieved_count, try_count=try_count)
+            else:
+                log('scroll', f"No tweets - try count: {try_count}",
+                    collector=self.name, retrieved=0, try_count=try_count)
+
+        remaining = bufque.toList()
+        await loop.run_in_executor(None, container.extend, remaining)
+        if seen is not None:
+            seen.update(tweet.tweet_id for tweet in remaining)
+        for tweet in remaining:
+            if oldest is None or tweet.timestamp < oldest.timestamp:
+                oldest = tweet
+        if checkpoint is not None:
+            await loop.run_in_executor(None, checkpoint, oldest,
+                                       try_count >= max_try_count)
+        TWEET_RATE.set(retrieved_count / max(time.perf_counter() - t_start, 1e-9),
+                       worker=self.slot)
+        log('search_end', "Cannot retrieve new tweets. Finisihing...",
+            collector=self.name)
+        return retrieved_count
+
+    def stop(self) -> None:
+        """Stops running retrieve loop after current scroll"""
+        self._process = False
+
+    async def closeAll(self) -> None:
+        await self._driver.quit()
+
+
+class AsyncEngine:
+    """
+    Runs a coroutine task over search windows with a fixed number of
+    AsyncCollectors on one event loop, the asyncio counterpart of Scheduler
+    and SessionPool. Each worker owns a collector that is started lazily,
+    restarted when it stops responding and recycled after `recycle_pages`
+    page loads.
+    """
+
+    def __init__(self, start_collector, worker_count: int, retry_count=2,
+                 recycle_pages=50):
+        """
+            Args:
+                `start_collector` (callable): coroutine function that returns
+                    a started AsyncCollector (e.g. a partial of
+                    `AsyncCollector.start`)
+                `worker_count` (int): number of collectors
+                `retry_count` (int): number of re-runs of a failed window
+                `recycle_pages` (int): page loads after which a collector is
+                    restarted, 0 for never
+        """
+        self._start_collector = start_collector
+        self._worker_count = worker_count
+        self._retry_count = retry_count
+        self._recycle_pages = recycle_pages
+        self._collectors = set()
+        self._cancelled = False
+        self._window_count = 0
+        self._exhausted = True
+        self._stopped = False
+        self._result_event = None
+
+    def _interrupt(self) -> None:
+        log('cancel', "Cancelling collection...")
+        self.cancel()
+
+    def cancel(self) -> None:
+        """Stops dispatching windows and running retrieve loops"""
+        self._cancelled = True
+        for collector in self._collectors:
+            collector.stop()
+        if self._result_event is not None:
+            # wakes source feed up to stop it
+            self._result_event.set()
+
+    async def _work(self, task, work: asyncio.Queue, results: list,
+                    on_result, slot: int) -> None:
+        """Worker coroutine, runs until a None is taken from `work`. Its
+        collectors report metrics with worker `slot`"""
+        collector = None
+        try:
+            while True:
+                item = await work.get()
+                if item is None:
+                    return
+                window, attempt, elapsed = item
+
+                if self._cancelled:
+                    result = WindowResult(window, 'cancelled', attempt - 1,
+                                          None, None, elapsed)
+                else:
+                    t0 = time.time()
+                    WINDOWS_IN_FLIGHT.inc()
+                    try:
+                        if collector is None:
+                            collector = await self._start_collector()
+                            collector.slot = slot
+                            self._collectors.add(collector)
+                        value = await task(collector, window)
+                        result = WindowResult(
+                            window, 'cancelled' if self._cancelled else 'done',
+                            attempt, value, None, elapsed + time.time() - t0)
+                    except Exception as e:
+                        elapsed += time.time() - t0
+                        if collector is not None and not await collector.is_alive():
+                            BROWSER_RESTARTS.inc(reason='unresponsive')
+                            self._collectors.discard(collector)
+                            await collector.closeAll()
+                            collector = None
+                        if attempt <= self._retry_count and not self._cancelled:
+                            log('window_retry',
+                                f"Window {window.since} - {window.until} failed "
+                                f"({attempt}/{self._retry_count + 1}): {e}",
+                                since=window.since, until=window.until,
+                                attempt=attempt, error=str(e))
+                            WINDOW_RETRIES.inc()
+                            work.put_nowait((window, attempt + 1, elapsed))
+                            continue
+                        result = WindowResult(window, 'failed', attempt,
+                                              None, e, elapsed)
+                    finally:
+                        WINDOWS_IN_FLIGHT.dec()
+
+                    if (collector is not None and self._recycle_pages and
+                            collector.page_count >= self._recycle_pages):
+                        BROWSER_RESTARTS.inc(reason='recycle')
+                        self._collectors.discard(collector)
+                        await collector.closeAll()
+                        collector = None
+
+                WINDOWS.inc(status=result.status)
+                WINDOW_SECONDS.observe(result.elapsed)
+                results.append(result)
+                if on_result is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, on_result, result)
+                self._result_event.set()
+                self._stop_if_finished(work, results)
+        finally:
+            if collector is not None:
+                self._collectors.discard(collector)
+                await collector.closeAll()
+
+    def _stop_if_finished(self, work: asyncio.Queue, results: list) -> None:
+        """Stops workers once every window is finished and no window comes
+        from source"""
+        if (not self._stopped and self._exhausted and
+                len(results) >= self._window_count):
+            self._stopped = True
+            for _ in range(self._worker_count):
+                work.put_nowait(None)
+
+    async def _feed(self, source, work: asyncio.Queue, results: list,
+                    poll_seconds: float) -> None:
+        """Queues windows of `source` whenever a worker is free, see
+        `Scheduler.run`"""
+        loop = asyncio.get_running_loop()
+        while not self._cancelled:
+            self._result_event.clear()
+            timeout = None
+            free = self._worker_count - (self._window_count - len(results))
+            if free > 0:
+                windows = await loop.run_in_executor(None, source, free)
+                if windows is None:
+                    break
+                for window in windows:
+                    work.put_nowait((window, 1, 0.0))
+                    self._window_count += 1
+                if free > len(windows):
+                    timeout = poll_seconds
+            try:
+                await asyncio.wait_for(self._result_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._exhausted = True
+        self._stop_if_finished(work, results)
+
+    async def run(self, windows, task, on_result=None, source=None,
+                  poll_seconds=5.0) -> list:
+        """
+            Runs task over given windows and returns when every window is
+            done, failed or cancelled. SIGINT cancels the run.
+
+                Args:
+                    `windows` (iterable): windows in dispatch order (anything
+                        with `since` and `until`)
+                    `task` (callable): coroutine function called with an
+                        AsyncCollector and a window, raising an exception is
+                        considered as a failed attempt
+                    `on_result` (callable): called on the default executor of
+                        the loop with each WindowResult
+                    `source` (callable): called on the default executor with
+                        the number of free workers whenever a worker is
+                        free, returns a list of windows to run next (empty if
+                        none is available yet) or None when it has no more
+                        windows, see `Scheduler.run`
+                    `poll_seconds` (float): seconds to wait before calling
+                        `source` again after it returned no windows
+
+                Returns:
+                    list of WindowResult in completion order
+        """
+        work = asyncio.Queue()
+        results = []
+        self._window_count = 0
+        for window in windows:
+            work.put_nowait((window, 1, 0.0))
+            self._window_count += 1
+        if self._window_count == 0 and source is None:
+            return results
+        self._cancelled = False
+        self._exhausted = source is None
+        self._stopped = False
+        self._result_event = asyncio.Event()
+
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGINT, self._interrupt)
+            handles_signal = True
+        except (NotImplementedError, RuntimeError):
+            handles_signal = False
+        coroutines = [self._work(task, work, results, on_result, slot)
+                      for slot in range(self._worker_count)]
+        if source is not None:
+            coroutines.append(self._feed(source, work, results, poll_seconds))
+        try:
+            await asyncio.gather(*coroutines)
+        finally:
+            if handles_signal:
+                loop.remove_signal_handler(signal.SIGINT)
+        return results
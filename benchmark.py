@@ -0,0 +1,206 @@
+import argparse
+import os
+import tempfile
+import time
+
+from bufferedQue import BufferedQue
+from collector import DOM_EXTRACTION_MODES, Collector
+from replayServer import TIMELINE_FIXTURES, ReplayServer
+from tweet import Tweet
+from writer import Writer
+
+PROFILE_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "fixtures", "profiles")
+
+TWEET_HTML = """
+<article>
+    <div data-testid="tweet">
+        <a href="/{writer}/status/{tweet_id}">
+            <time datetime="2020-07-28T{hour:02d}:{minute:02d}:00.000Z">Jul 28</time>
+        </a>
+        <div dir="ltr"><span>@{writer}</span></div>
+        <div lang="en" dir="auto">Synthetic tweet {tweet_id} about $AAPL
+and its second line</div>
+        <div data-testid="reply">{reply}</div>
+        <div data-testid="retweet">{retweet}</div>
+        <div data-testid="like">{like}</div>
+    </div>
+</article>
+"""
+
+
+def synthetic_page(tweet_count: int) -> str:
+    """Returns html of a search page that contains `tweet_count` tweets"""
+    tweets = [TWEET_HTML.format(writer=f"user{i % 97}",
+                                tweet_id=1288000000000000000 + i,
+                                hour=(i // 60) % 24, minute=i % 60,
+                                reply=i % 7, retweet=i % 13,
+                                like="1.2K" if i % 5 == 0 else i % 31)
+              for i in range(tweet_count)]
+    return "<html><body>" + "".join(tweets) + "</body></html>"
+
+
+def benchmark_extraction(collector: Collector, repeat: int) -> dict:
+    """
+        Runs each extraction mode `repeat` times on the loaded page. Each
+        run reads every tweet of the page as new ones, then extracts again
+        with no new tweet (rescan, e.g. a scroll that rendered nothing).
+
+            Returns:
+                dict of <mode, (seconds per scroll, extracted tweet list,
+                seconds per rescan)>
+    """
+    results = dict()
+    for mode in DOM_EXTRACTION_MODES:
+        extract = (collector._extract_tweets_by_script if mode == 'script'
+                   else collector._extract_tweets_by_elements)
+        seconds = 0.0
+        rescan_seconds = 0.0
+        for _ in range(repeat):
+            collector._untag_tweets()
+            t0 = time.perf_counter()
+            tweets = list(extract('AAPL', 'en', BufferedQue(50).contains))
+            t1 = time.perf_counter()
+            list(extract('AAPL', 'en', BufferedQue(50).contains))
+            seconds += t1 - t0
+            rescan_seconds += time.perf_counter() - t1
+        results[mode] = (seconds / repeat, tweets, rescan_seconds / repeat)
+    return results
+
+
+def benchmark_profiles(collector: Collector, fixture_dir: str, repeat: int) -> dict:
+    """
+        Reads each stored profile page of `fixture_dir` (<user_id>.html)
+        `repeat` times with each extraction mode. Page loads are not timed.
+
+            Returns:
+                dict of <mode, (seconds per profile, list of Writer or
+                UnreachableWriter in fixture order)>
+    """
+    fixtures = sorted(name for name in os.listdir(fixture_dir)
+                      if name.endswith(".html"))
+    results = dict()
+    for mode in DOM_EXTRACTION_MODES:
+        read = (collector._read_profile_by_script if mode == 'script'
+                else collector._read_profile_by_elements)
+        seconds = 0.0
+        writers = []
+        for name in fixtures:
+            user_id = name[:-len(".html")]
+            collector._driver.get("file://" + os.path.join(fixture_dir, name))
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                writer = collector._writer_from_profile(user_id, read(user_id))
+            seconds += time.perf_counter() - t0
+            writers.append(writer)
+        results[mode] = (seconds / repeat / max(len(fixtures), 1), writers)
+    return results
+
+
+def benchmark_network(collector: Collector, url: str) -> dict:
+    """
+        Collects the replayed search page of `url` (see ReplayServer) until
+        its end with script and network extraction. Collector must be
+        started with `capture_network`.
+
+            Returns:
+                dict of <mode, (seconds, collected tweet list, writer list)>
+    """
+    results = dict()
+    for mode in ('script', 'network'):
+        tweets = []
+        writers = []
+        collector._driver.get(url)
+        t0 = time.perf_counter()
+        collector._retrieve_tweets('AAPL', tweets.append, tweets.extend,
+                                   extraction=mode, pacing='event',
+                                   on_writer=writers.append)
+        results[mode] = (time.perf_counter() - t0, tweets, writers)
+    return results
+
+
+def _profile_fields(writer) -> tuple:
+    if isinstance(writer, Writer):
+        return tuple(getattr(writer, name) for name in Writer.__slots__)
+    return tuple(writer)
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-d', '--chromedriver_path', type=str,
+                             default='chromedriver',
+                             help="chromedriver path that is used")
+    argv_parser.add_argument('-n', '--tweet_count', type=int, default=50,
+                             help="number of tweets on synthetic page")
+    argv_parser.add_argument('-r', '--repeat', type=int, default=20,
+                             help="number of extraction per mode")
+    argv_parser.add_argument('-b', '--benchmark', type=str, default='tweets',
+                             choices=['tweets', 'profiles', 'network'],
+                             help="extraction to benchmark")
+    argv_parser.add_argument('-x', '--fixtures', type=str, default=None,
+                             help="directory of stored profile pages (<user_id>.html) "
+                                  "or recorded timeline responses (network)")
+    args = argv_parser.parse_args()
+
+    collector = Collector(None, None, chromePath=args.chromedriver_path,
+                          capture_network=(args.benchmark == 'network'))
+    try:
+        if args.benchmark == 'profiles':
+            results = benchmark_profiles(collector, args.fixtures or PROFILE_FIXTURES,
+                                         args.repeat)
+        elif args.benchmark == 'network':
+            replay_server = ReplayServer(args.fixtures or TIMELINE_FIXTURES)
+            try:
+                results = benchmark_network(collector, replay_server.start())
+            finally:
+                replay_server.close()
+        else:
+            with tempfile.TemporaryDirectory() as page_dir:
+                page_path = os.path.join(page_dir, "search.html")
+                with open(page_path, 'w') as page_file:
+                    page_file.write(synthetic_page(args.tweet_count))
+                collector._driver.get("file://" + page_path)
+                results = benchmark_extraction(collector, args.repeat)
+    finally:
+        collector.closeAll()
+
+    if args.benchmark == 'profiles':
+        for mode, (seconds, writers) in results.items():
+            print(f"{mode:>8}: {seconds * 1000:9.2f} ms/profile "
+                  f"({len(writers)} profiles)")
+        for element_writer, script_writer in zip(results['element'][1],
+                                                 results['script'][1]):
+            if _profile_fields(element_writer) != _profile_fields(script_writer):
+                print(f"WARNING: extraction modes differ for "
+                      f"{element_writer.user_id}:\n"
+                      f"  element: {_profile_fields(element_writer)}\n"
+                      f"  script : {_profile_fields(script_writer)}")
+    elif args.benchmark == 'network':
+        for mode, (seconds, tweets, writers) in results.items():
+            print(f"{mode:>8}: {seconds * 1000:9.2f} ms "
+                  f"({len(tweets)} tweets, {len(writers)} writers)")
+        script_tweets = {tweet.tweet_id: tweet for tweet in results['script'][1]}
+        network_tweets = {tweet.tweet_id: tweet for tweet in results['network'][1]}
+        if set(script_tweets) != set(network_tweets):
+            print("WARNING: extraction modes collected different tweets")
+        rounded = sum(1 for tweet_id, tweet in network_tweets.items()
+                      if tweet_id in script_tweets and
+                      (tweet.like_num, tweet.retweet_num) !=
+                      (script_tweets[tweet_id].like_num,
+                       script_tweets[tweet_id].retweet_num))
+        print(f" rounded counts in page: {rounded} tweets")
+    else:
+        for mode, (seconds, tweets, rescan_seconds) in results.items():
+            print(f"{mode:>8}: {seconds * 1000:9.2f} ms/scroll "
+                  f"{seconds * 1000 / max(len(tweets), 1):7.3f} ms/tweet "
+                  f"{rescan_seconds * 1000:9.2f} ms/rescan "
+                  f"({len(tweets)} tweets)")
+
+        element_tweets = [tuple(getattr(tweet, name) for name in Tweet.__slots__)
+                          for tweet in results['element'][1]]
+        script_tweets = [tuple(getattr(tweet, name) for name in Tweet.__slots__)
+                         for tweet in results['script'][1]]
+        if element_tweets != script_tweets:
+            print("WARNING: extraction modes produced different tweets")
+    if args.benchmark != 'network':
+        print(f" speedup: {results['element'][0] / results['script'][0]:.1f}x")
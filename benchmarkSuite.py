@@ -0,0 +1,422 @@
+import argparse
+import asyncio
+import contextlib
+import datetime
+import functools
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from asyncCollector import AsyncCollector, AsyncEngine
+from bufferedQue import BufferedQue, SeenIDs
+from collector import DOM_EXTRACTION_MODES, Collector
+from dbWriter import DBWriter
+from fakeDriver import FakeDriver
+from fakeWebDriver import UNREACHABLE_PREFIXES, FakeSearchPage, FakeWebDriverServer
+from metrics import set_log_format
+from mockTwitter import MockTwitterServer
+from pageArchive import PageArchive, list_archives
+from pageParser import close_parser_pool, lxml, parser_pool
+from reparse import reparse_archives
+from scheduler import Scheduler
+from searchKeys import GroupContainer, KeyGroup, KeyWindow, parse_key
+from sessionPool import SessionPool
+from tweet import Tweet
+from tweetDB import TweetDB
+
+SEARCH_KEY = "$AAPL"
+
+# First day of windows of scheduler benchmarks
+WINDOW_START = datetime.date(2020, 1, 1)
+
+
+class Suite:
+    """
+    Offline throughput benchmarks of collection paths. Collectors run over
+    `fakeDriver.FakeDriver` (no browser, measures the Python side of
+    collection) or, with `chromePath`, a headless chrome on a
+    MockTwitterServer. Sizes are fixed by parameters so that results of
+    different commits are comparable.
+    """
+
+    def __init__(self, tweet_count=1000, writer_count=100, db_tweets=20000,
+                 window_count=8, worker_count=4, latency=0.0, chromePath=None):
+        """
+            Args:
+                `tweet_count` (int): number of tweets of each search
+                `writer_count` (int): number of writers whose profiles are
+                    collected
+                `db_tweets` (int): number of tweets of database benchmarks
+                `window_count` (int): number of windows of scheduler benchmarks
+                `worker_count` (int): number of sessions of scheduler benchmarks
+                `latency` (float): seconds each fake WebDriver call takes
+                `chromePath` (str): chromedriver executable, fake driver is
+                    used if None
+        """
+        self.tweet_count = tweet_count
+        self.writer_count = writer_count
+        self.db_tweets = db_tweets
+        self.window_count = window_count
+        self.worker_count = worker_count
+        self.latency = latency
+        self.chromePath = chromePath
+        self._mock_server = None
+        self._base_url = None
+
+    @property
+    def params(self) -> dict:
+        return {'tweet_count': self.tweet_count, 'writer_count': self.writer_count,
+                'db_tweets': self.db_tweets, 'window_count': self.window_count,
+                'worker_count': self.worker_count, 'latency': self.latency,
+                'driver': 'chrome' if self.chromePath else 'fake'}
+
+    def __enter__(self):
+        if self.chromePath:
+            self._mock_server = MockTwitterServer(tweet_count=self.tweet_count,
+                                                  delay=self.latency)
+            self._base_url = self._mock_server.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._mock_server is not None:
+            self._mock_server.close()
+        return False
+
+    def _collector(self) -> Collector:
+        if self.chromePath:
+            return Collector(None, None, chromePath=self.chromePath,
+                             base_url=self._base_url)
+        collector = Collector.with_driver(FakeDriver(tweet_count=self.tweet_count,
+                                                     latency=self.latency))
+        collector._Msleep_seconds = 0
+        collector._Ssleep_seconds = 0
+        return collector
+
+    def _tweets(self, count: int) -> list:
+        """Returns `count` tweets of fake searches (one per day)"""
+        tweets = []
+        day = WINDOW_START
+        while len(tweets) < count:
+            page = FakeSearchPage(f"/search?q={SEARCH_KEY} since:{day} "
+                                  f"until:{day + datetime.timedelta(days=1)}",
+                                  min(count - len(tweets), 5000), 1, 1)
+            tweets += [Tweet(int(tweet['status'].rsplit('/', 1)[1]),
+                             tweet['writer'][1:],
+                             int(datetime.datetime.strptime(
+                                 tweet['datetime'], "%Y-%m-%dT%H:%M:%S.000Z")
+                                 .replace(tzinfo=datetime.timezone.utc).timestamp()),
+                             tweet['body'], (SEARCH_KEY,), int(tweet['reply']),
+                             int(tweet['retweet']), 0)
+                       for tweet in page.tweets]
+            day += datetime.timedelta(days=1)
+        return tweets
+
+    def _windows(self) -> list:
+        group = KeyGroup([parse_key(SEARCH_KEY)])
+        return [KeyWindow(group, WINDOW_START + datetime.timedelta(days=i),
+                          WINDOW_START + datetime.timedelta(days=i + 1))
+                for i in range(self.window_count)]
+
+    def retrieve_tweets(self, extraction: str) -> tuple:
+        """Searches once and collects every tweet of the search with
+        `Collector.retrieve_tweets_to_container`"""
+        collector = self._collector()
+        try:
+            tweets = []
+            t0 = time.perf_counter()
+            collector.search(SEARCH_KEY, tabName='live', from_=WINDOW_START,
+                             to_=WINDOW_START + datetime.timedelta(days=1),
+                             pacing='event')
+            collector.retrieve_tweets_to_container(
+                SEARCH_KEY, tweets, extraction=extraction, pacing='event')
+            return len(tweets), time.perf_counter() - t0, 'tweets/s'
+        finally:
+            collector.closeAll()
+
+    def capture(self) -> dict:
+        """Captures a search into an archive with
+        `Collector.capture_to_archive` and reparses it into a database (if
+        lxml is installed)"""
+        collector = self._collector()
+        results = dict()
+        with tempfile.TemporaryDirectory() as archive_dir:
+            try:
+                until = WINDOW_START + datetime.timedelta(days=1)
+                t0 = time.perf_counter()
+                collector.search(SEARCH_KEY, tabName='live', from_=WINDOW_START,
+                                 to_=until, pacing='event')
+                count = collector.capture_to_archive(
+                    PageArchive(archive_dir, SEARCH_KEY, WINDOW_START, until),
+                    pacing='event')
+                results['capture'] = (count, time.perf_counter() - t0, 'tweets/s')
+            finally:
+                collector.closeAll()
+            if lxml is not None:
+                t0 = time.perf_counter()
+                inserted, _ = reparse_archives(list_archives(archive_dir),
+                                               os.path.join(archive_dir, "reparse"),
+                                               processes=1)
+                results['reparse'] = (inserted, time.perf_counter() - t0, 'tweets/s')
+        return results
+
+    def retrieve_writers(self, extraction: str) -> tuple:
+        """Collects profiles of `writer_count` writers (some of them
+        unreachable) with `Collector.retrieve_writers_to_db`, counts writers
+        whose profile or unreachable status is stored"""
+        # every tenth writer is suspended, deleted or restricted in turn
+        prefixes = list(UNREACHABLE_PREFIXES)
+        user_ids = [f"{prefixes[(i // 10) % len(prefixes)]}{i}" if i % 10 == 9
+                    else f"user{i}" for i in range(self.writer_count)]
+        tweets = [Tweet(i + 1, user_id, 1577836800 + i, "profile", (SEARCH_KEY,))
+                  for i, user_id in enumerate(user_ids)]
+        collector = self._collector()
+        with tempfile.TemporaryDirectory() as db_dir:
+            database = TweetDB(os.path.join(db_dir, "writers"))
+            database.create_tables()
+            database.insert_tweets(tweets)
+            try:
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    collector.retrieve_writers_to_db(database, [], pacing='event',
+                                                     extraction=extraction)
+                seconds = time.perf_counter() - t0
+                stored = len(user_ids) - len(database.get_missing_writers())
+                return stored, seconds, 'writers/s'
+            finally:
+                database.close_DB()
+                collector.closeAll()
+
+    def database(self) -> dict:
+        """Inserts `db_tweets` tweets into a file database and reads them
+        back through the query paths of TweetDB"""
+        tweets = self._tweets(self.db_tweets)
+        results = dict()
+        with tempfile.TemporaryDirectory() as db_dir:
+            database = TweetDB(os.path.join(db_dir, "tweets"),
+                               pragmas={'journal_mode': 'WAL', 'synchronous': 'NORMAL'})
+            database.create_tables()
+            try:
+                t0 = time.perf_counter()
+                for i in range(0, len(tweets), 500):
+                    database.insert_tweets(tweets[i:i + 500])
+                results['db.insert_tweets'] = (len(tweets), time.perf_counter() - t0, 'rows/s')
+
+                t0 = time.perf_counter()
+                count = sum(1 for _ in database.iter_tweets(searchKey=SEARCH_KEY))
+                results['db.iter_tweets'] = (count, time.perf_counter() - t0, 'rows/s')
+
+                t0 = time.perf_counter()
+                count = sum(1 for _ in database.iter_tweet_ids(SEARCH_KEY))
+                results['db.iter_tweet_ids'] = (count, time.perf_counter() - t0, 'rows/s')
+
+                t0 = time.perf_counter()
+                database.get_daily_counts(SEARCH_KEY)
+                results['db.get_daily_counts'] = (len(tweets), time.perf_counter() - t0, 'rows/s')
+
+                t0 = time.perf_counter()
+                database.get_missing_writers()
+                results['db.get_missing_writers'] = (len(tweets), time.perf_counter() - t0, 'rows/s')
+            finally:
+                database.close_DB()
+        return results
+
+    def buffers(self) -> dict:
+        """Duplicate checks of collection: BufferedQue of a collector and
+        SeenIDs shared by collectors"""
+        tweet_ids = list(range(self.db_tweets))
+        results = dict()
+
+        t0 = time.perf_counter()
+        bufque = BufferedQue(50)
+        for tweet_id in tweet_ids:
+            if not bufque.contains(tweet_id):
+                bufque.add(tweet_id, tweet_id)
+        results['bufferedque.add'] = (len(tweet_ids), time.perf_counter() - t0, 'ops/s')
+
+        t0 = time.perf_counter()
+        seen = SeenIDs()
+        for tweet_id in tweet_ids:
+            if tweet_id not in seen:
+                seen.add(tweet_id)
+        results['seenids.add'] = (len(tweet_ids), time.perf_counter() - t0, 'ops/s')
+        return results
+
+    def scheduler(self) -> tuple:
+        """Runs windows end to end like `collection_process` of
+        tweet_collector: Scheduler, SessionPool, GroupContainer and DBWriter"""
+        with tempfile.TemporaryDirectory() as db_dir:
+            db_name = os.path.join(db_dir, "scheduler")
+            TweetDB(db_name).create_tables()
+            db_writer = DBWriter(db_name)
+            db_writer.start()
+            session_pool = SessionPool(self.worker_count, None, None, recycle_pages=0,
+                                       collector_factory=self._collector)
+            seen = SeenIDs()
+
+            def task(key_window):
+                with session_pool.lease() as collector:
+                    collector.search(key_window.group.query, tabName='live',
+                                     from_=key_window.since, to_=key_window.until,
+                                     pacing='event')
+                    return collector.retrieve_tweets_to_container(
+                        key_window.group.name,
+                        GroupContainer(key_window.group, db_writer),
+                        extraction='script', pacing='event', seen=seen)
+
+            try:
+                t0 = time.perf_counter()
+                results = Scheduler(task, self.worker_count, retry_count=0).run(
+                    self._windows())
+            finally:
+                session_pool.close()
+                # commits remaining batch without waiting for its flush deadline
+                db_writer.close()
+            seconds = time.perf_counter() - t0
+        return sum(result.value or 0 for result in results), seconds, 'tweets/s'
+
+    def async_engine(self) -> tuple:
+        """Runs windows on AsyncEngine against a FakeWebDriverServer (with
+        `latency` of each command)"""
+        async def run():
+            server = FakeWebDriverServer(tweet_count=self.tweet_count,
+                                         latency=self.latency)
+            url = await server.start()
+            engine = AsyncEngine(functools.partial(AsyncCollector.start, None, None,
+                                                   url=url),
+                                 self.worker_count, retry_count=0, recycle_pages=0)
+
+            async def task(collector, key_window):
+                await collector.search(key_window.group.query, tabName='live',
+                                       from_=key_window.since, to_=key_window.until,
+                                       pacing='event')
+                tweets = []
+                return await collector.retrieve_tweets_to_container(
+                    key_window.group.name, tweets, pacing='event')
+
+            try:
+                t0 = time.perf_counter()
+                results = await engine.run(self._windows(), task)
+                return (sum(result.value or 0 for result in results),
+                        time.perf_counter() - t0, 'tweets/s')
+            finally:
+                await server.close()
+
+        return asyncio.run(run())
+
+    def benchmarks(self) -> dict:
+        """Returns <name, callable> of benchmarks, each callable returns
+        either (count, seconds, unit) or a dict of them"""
+        benchmarks = dict()
+        for mode in DOM_EXTRACTION_MODES + (('lxml',) if lxml is not None else ()):
+            benchmarks[f'retrieve_tweets.{mode}'] = functools.partial(
+                self.retrieve_tweets, mode)
+        benchmarks['capture'] = self.capture
+        for mode in DOM_EXTRACTION_MODES:
+            benchmarks[f'retrieve_writers.{mode}'] = functools.partial(
+                self.retrieve_writers, mode)
+        benchmarks['db'] = self.database
+        benchmarks['buffers'] = self.buffers
+        benchmarks['scheduler.thread'] = self.scheduler
+        benchmarks['scheduler.async'] = self.async_engine
+        return benchmarks
+
+    def run(self, repeat=3, only=None) -> dict:
+        """
+            Runs benchmarks `repeat` times and keeps the best rate of each.
+
+                Args:
+                    `repeat` (int): number of runs of each benchmark
+                    `only` (list): prefixes of benchmark names to run (all
+                        if None)
+
+                Returns:
+                    dict of <name, {'value', 'unit', 'count', 'seconds'}>
+        """
+        results = dict()
+        for name, benchmark in self.benchmarks().items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            for _ in range(repeat):
+                measured = benchmark()
+                if isinstance(measured, tuple):
+                    measured = {name: measured}
+                for result_name, (count, seconds, unit) in measured.items():
+                    value = count / max(seconds, 1e-9)
+                    best = results.get(result_name)
+                    if best is None or value > best['value']:
+                        results[result_name] = {'value': round(value, 2), 'unit': unit,
+                                                'count': count,
+                                                'seconds': round(seconds, 6)}
+        return results
+
+
+def git_commit() -> str:
+    """Returns commit of the working tree (None outside of a git repository)"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-d', '--chromedriver_path', type=str, default=None,
+                             help="chromedriver path to benchmark a headless chrome on "
+                                  "mock twitter server (fake driver if not given)")
+    argv_parser.add_argument('-n', '--tweet_count', type=int, default=1000,
+                             help="number of tweets of each search")
+    argv_parser.add_argument('-w', '--writer_count', type=int, default=100,
+                             help="number of collected writer profiles")
+    argv_parser.add_argument('-s', '--db_tweets', type=int, default=20000,
+                             help="number of tweets of database benchmarks")
+    argv_parser.add_argument('-W', '--windows', type=int, default=8,
+                             help="number of windows of scheduler benchmarks")
+    argv_parser.add_argument('-t', '--threads', type=int, default=4,
+                             help="number of sessions of scheduler benchmarks")
+    argv_parser.add_argument('-l', '--latency', type=float, default=0.0,
+                             help="seconds each fake WebDriver call takes")
+    argv_parser.add_argument('-r', '--repeat', type=int, default=3,
+                             help="number of runs of each benchmark, best is kept")
+    argv_parser.add_argument('-b', '--benchmarks', type=str, nargs='*', default=None,
+                             help="prefixes of benchmarks to run (e.g. db scheduler)")
+    argv_parser.add_argument('-o', '--output', type=str, default=None,
+                             help="json file to write results into")
+    argv_parser.add_argument('-c', '--compare', type=str, default=None,
+                             help="json results of a previous run to compare with")
+    args = argv_parser.parse_args()
+
+    set_log_format('none')
+    if lxml is not None:
+        # parser processes are forked before any thread is started
+        parser_pool()
+    with Suite(tweet_count=args.tweet_count, writer_count=args.writer_count,
+               db_tweets=args.db_tweets, window_count=args.windows,
+               worker_count=args.threads, latency=args.latency,
+               chromePath=args.chromedriver_path) as suite:
+        report = {'commit': git_commit(), 'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  'python': platform.python_version(), 'params': suite.params,
+                  'results': suite.run(args.repeat, args.benchmarks)}
+    close_parser_pool()
+
+    baseline = dict()
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('params') != report['params']:
+            print(f"WARNING: parameters differ from baseline: {baseline.get('params')}")
+        baseline = baseline.get('results', dict())
+    for name, result in report['results'].items():
+        line = f"{name:>28}: {result['value']:12.1f} {result['unit']}"
+        if name in baseline:
+            line += f"  ({result['value'] / baseline[name]['value']:.2f}x)"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
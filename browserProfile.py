@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+# Arguments every headless chrome of collectors is started with
+CHROME_ARGS = ('--headless', '--no-sandbox', '--disable-dev-shm-usage')
+
+# Requests of a search page that are not needed to read tweets: avatars and
+# media images, video previews and streams, web fonts
+LEAN_BLOCKED_URLS = (
+    '*pbs.twimg.com/*', '*video.twimg.com/*', '*.jpg*', '*.jpeg*', '*.png*',
+    '*.gif*', '*.webp*', '*.svg*', '*.mp4*', '*.m3u8*', '*.woff*', '*.ttf*',
+    '*.otf*',
+)
+
+# Chrome features that a collector does not use
+LEAN_DISABLED_FEATURES = ('Translate', 'MediaRouter', 'OptimizationHints',
+                          'AutofillServerCommunication', 'InterestFeedContentSuggestions')
+
+# Lean browser profile of headless collectors
+#   blocked_urls: url patterns blocked by CDP `Network.setBlockedURLs`
+#   js_heap_mb  : maximum size of JS heap of pages in MB (0 for chrome default)
+LeanProfile = namedtuple('LeanProfile', ['blocked_urls', 'js_heap_mb'])
+
+DEFAULT_LEAN_PROFILE = LeanProfile(blocked_urls=LEAN_BLOCKED_URLS, js_heap_mb=512)
+
+
+def lean_profile_from_settings(value) -> LeanProfile:
+    """
+        Creates LeanProfile from `lean_profile` setting.
+
+            Args:
+                `value` (bool|dict): false to disable, true for
+                    DEFAULT_LEAN_PROFILE or a dict that overrides its fields
+                    (`blocked_urls`, `js_heap_mb`)
+
+            Returns:
+                LeanProfile instance, or None if disabled
+    """
+    if not value:
+        return None
+    if value is True:
+        return DEFAULT_LEAN_PROFILE
+    unknown = set(value) - set(LeanProfile._fields)
+    if unknown:
+        raise ValueError(f"unknown lean_profile settings: {sorted(unknown)}")
+    return DEFAULT_LEAN_PROFILE._replace(
+        **{name: tuple(field) if name == 'blocked_urls' else field
+           for name, field in value.items()})
+
+
+def chrome_args(lean_profile: LeanProfile = None) -> list:
+    """Returns command line arguments of chrome"""
+    args = list(CHROME_ARGS)
+    if lean_profile is not None:
+        args += ['--blink-settings=imagesEnabled=false',
+                 '--autoplay-policy=user-gesture-required',
+                 '--mute-audio',
+                 '--disable-gpu',
+                 '--disable-extensions',
+                 '--disable-sync',
+                 '--disable-default-apps',
+                 '--disable-background-networking',
+                 '--disable-component-update',
+                 '--no-first-run',
+                 '--disable-features=' + ','.join(LEAN_DISABLED_FEATURES)]
+        if lean_profile.js_heap_mb:
+            args.append(f'--js-flags=--max-old-space-size={lean_profile.js_heap_mb}')
+    return args
+
+
+def chrome_prefs(lean_profile: LeanProfile = None) -> dict:
+    """Returns preferences of chrome profile (`prefs` of chrome options)"""
+    if lean_profile is None:
+        return dict()
+    # 2: block
+    return {'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.media_stream': 2,
+            'profile.managed_default_content_settings.notifications': 2,
+            'profile.managed_default_content_settings.plugins': 2,
+            'profile.managed_default_content_settings.geolocation': 2}
+
+
+def chrome_options(lean_profile: LeanProfile = None) -> dict:
+    """Returns `goog:chromeOptions` capability"""
+    options = {'args': chrome_args(lean_profile)}
+    prefs = chrome_prefs(lean_profile)
+    if prefs:
+        options['prefs'] = prefs
+    return options
@@ -1,3 +1,5 @@
+import threading
+from bisect import bisect_left
 from collections import OrderedDict
 
 
@@ -35,7 +37,7 @@ class BufferedQue:
             return None
         self._queue_dict[item_id] = item
         if len(self._queue_dict) > self._buffer_size:
-            return self._queue_dict.pop(list(self._queue_dict.keys())[0])
+            return self._queue_dict.popitem(last=False)[1]
         return None
 
     def get(self, item_id):
@@ -57,3 +59,94 @@ class BufferedQue:
     def __len__(self):
         """Returns how much element is in queue"""
         return len(self._queue_dict)
+
+
+class SeenIDs:
+    """
+    Thread-safe set of ids that is shared between collectors to skip items
+    that are already collected by any of them (or stored before).
+
+    Integer ids are also kept in buckets of nearby ids (ids with the same
+    value after shifting `bucket_bits`), each bucket is sorted when it is
+    queried, so `in_range` reads only buckets of the range instead of every
+    seen id.
+    """
+
+    _ids = None
+    _buckets = None
+
+    def __init__(self, item_ids=(), bucket_bits=44):
+        """
+            Args:
+                `item_ids` (iterable): ids to preload (e.g. stored tweet ids)
+                `bucket_bits` (int): low bits of ids that are not part of
+                    their bucket key (44 bits of a tweet id is about 70
+                    minutes of post time)
+        """
+        self._ids = set()
+        self._buckets = dict()
+        self._unsorted = set()
+        self._bucket_bits = bucket_bits
+        self._lock = threading.Lock()
+        self.update(item_ids)
+
+    def _add(self, item_id) -> None:
+        """Adds a new id to its bucket, lock should be held"""
+        self._ids.add(item_id)
+        key = item_id >> self._bucket_bits
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [item_id]
+        else:
+            if item_id < bucket[-1]:
+                self._unsorted.add(key)
+            bucket.append(item_id)
+
+    def add(self, item_id) -> bool:
+        """Adds an id, returns true if it was not seen before"""
+        with self._lock:
+            if item_id in self._ids:
+                return False
+            self._add(item_id)
+            return True
+
+    def update(self, item_ids) -> None:
+        """Adds multiple ids"""
+        with self._lock:
+            for item_id in item_ids:
+                if item_id not in self._ids:
+                    self._add(item_id)
+
+    def contains(self, item_id) -> bool:
+        """Returns true if given item_id is seen"""
+        return item_id in self._ids
+
+    def in_range(self, low: int, high: int) -> list:
+        """Returns seen ids that are >= low and < high in ascending order"""
+        if low >= high:
+            return []
+        first = low >> self._bucket_bits
+        last = (high - 1) >> self._bucket_bits
+        with self._lock:
+            if last - first < len(self._buckets):
+                keys = range(first, last + 1)
+            else:
+                keys = sorted(key for key in self._buckets if first <= key <= last)
+            item_ids = []
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                if key in self._unsorted:
+                    bucket.sort()
+                    self._unsorted.discard(key)
+                item_ids.extend(bucket[bisect_left(bucket, low):
+                                       bisect_left(bucket, high)])
+            return item_ids
+
+    def __contains__(self, item_id):
+        return item_id in self._ids
+
+    def __len__(self):
+        """Returns how much id is seen"""
+        return len(self._ids)
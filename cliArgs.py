@@ -0,0 +1,17 @@
+import argparse
+
+
+def bool_argument(text: str) -> bool:
+    """
+        Converts a boolean command line value (e.g. `-L True`), to be used as
+        argparse `type` since `bool("False")` is true.
+
+            Raises:
+                argparse.ArgumentTypeError if text is not a boolean
+    """
+    value = text.strip().lower()
+    if value in ('true', 'yes', 'y', '1', 'on'):
+        return True
+    if value in ('false', 'no', 'n', '0', 'off'):
+        return False
+    raise argparse.ArgumentTypeError(f"expected true or false: {text}")
@@ -1,3 +1,7 @@
+import base64
+import collections
+import itertools
+import json
 import time
 
 from selenium import webdriver
@@ -5,12 +9,28 @@ from selenium.common.exceptions import (NoSuchElementException,
                                         StaleElementReferenceException,
                                         WebDriverException)
 
-from bufferedQue import BufferedQue
-from tweet import Tweet
+from browserProfile import LeanProfile, chrome_args, chrome_prefs
+from bufferedQue import BufferedQue, SeenIDs
+from metrics import (BROWSER_RESTARTS, DUPLICATES_SKIPPED, PAGE_LOAD_SECONDS,
+                     SCROLL_EXTRACT_SECONDS, TWEET_RATE, TWEETS_CAPTURED,
+                     TWEETS_COLLECTED, log)
+from pageParser import parser_pool, tweets_from_html
+from pageScripts import (BASE_URL, TWEET_XPATH, STATUS_XPATH, WRITER_XPATH,
+                         TIME_XPATH, BODY_XPATH, REPLY_XPATH, RETWEET_XPATH,
+                         LIKE_XPATH, DOM_EXTRACTION_MODES, EXTRACTION_MODES,
+                         CAPTURE_EXTRACTION, PACING_MODES,
+                         TWEET_SELECTOR, EMPTY_SEARCH_SELECTOR,
+                         LOADING_SELECTOR, PROFILE_SELECTOR,
+                         WAIT_FOR_NODES_SCRIPT, EXTRACT_TWEETS_SCRIPT,
+                         NEW_TWEET_ELEMENTS_SCRIPT, UNTAG_TWEETS_SCRIPT,
+                         CAPTURE_TWEETS_SCRIPT, COLLECTED_ATTRIBUTE,
+                         PROFILE_XPATHS, EXTRACT_PROFILE_SCRIPT,
+                         count_from_text, extract_tweets_args, search_url,
+                         tweets_from_script, window_tweet_ids)
+from timelineParser import is_timeline_url, parse_timeline
+from tweet import Tweet, iso_to_timestamp
 from writer import Writer
-from tweetDB import TweetDB
-
-BASE_URL = "https://www.twitter.com/"
+from tweetDB import TweetDB, UnreachableWriter
 
 
 class Collector:
@@ -19,9 +39,19 @@ class Collector:
     _Lsleep_seconds = 3.0
     _Msleep_seconds = 2.25
     _Ssleep_seconds = 1.5
+    _event_timeout_seconds = 1.5
+    _event_max_timeout_seconds = 12.0
+    _event_settle_seconds = 0.2
+    _event_end_tries = 3
     _process = False
-
-    def __init__(self, username: str, password: str, chromePath=None, firefoxPath=None):
+    _page_count = 0
+    _capture_network = False
+    _base_url = BASE_URL
+    _ids = itertools.count(1)
+
+    def __init__(self, username: str, password: str, chromePath=None, firefoxPath=None,
+                 capture_network=False, lean_profile: LeanProfile = None,
+                 base_url=BASE_URL):
         """
             Collect tweets by using selenium.
 
@@ -30,48 +60,117 @@ class Collector:
                     password (str): Twitter account's password
                     chromePath (str): File path of executable chromedriver
                     firefoxPath (str): File path of executable firefox webdriver (geckodriver)
+                    capture_network (bool): log network traffic of chrome to
+                        read search timeline responses (needed for
+                        `'network'` extraction)
+                    lean_profile (LeanProfile): start chrome without images,
+                        media, fonts and unused features (None for a full
+                        browser, see `browserProfile`)
+                    base_url (str): url of twitter pages (e.g. a
+                        `mockTwitter.MockTwitterServer` for benchmarks)
+
+            If `username` is None, browser is started without logging in.
         """
+        self._setup(capture_network, base_url)
         count = 0
         while count < 5:
-            chrome_options = webdriver.ChromeOptions()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
             try:
-                if chromePath is None:
-                    if firefoxPath is None:
-                        self._driver = webdriver.Chrome(
-                            executable_path="chromedriver",
-                            chrome_options=chrome_options)
-                    else:
-                        self._driver = webdriver.Firefox(
-                            executable_path="geckodriver")
-                else:
-                    self._driver = webdriver.Chrome(executable_path=chromePath,
-                                                    chrome_options=chrome_options)
-
-                self._driver.get(BASE_URL+"login")
-
-                self._driver.find_element_by_xpath(
-                    "//input[contains(@name, 'username')]").send_keys(username)
-                time.sleep(0.5)
-                self._driver.find_element_by_xpath(
-                    "//input[contains(@name, 'password')]").send_keys(password)
-                self._driver.find_element_by_xpath(
-                    "//div[contains(@data-testid, 'LoginForm_Login_Button')]").click()
-                time.sleep(self._Msleep_seconds)
+                self._driver = self._create_driver(chromePath, firefoxPath,
+                                                   capture_network, lean_profile)
+                self._driver.set_script_timeout(
+                    self._event_max_timeout_seconds + 5)
+                if username is not None:
+                    self._login(username, password)
                 count = 6
             except Exception as e:
-                print(e)
+                log('browser_restart', str(e), collector=self.name,
+                    reason='start_failed')
+                BROWSER_RESTARTS.inc(reason='start_failed')
                 if self._driver:
                     self._driver.quit()
                 time.sleep(5)
             count += 1
 
         if count == 5:
-            print("Failed to start and login.")
+            log('start_failed', "Failed to start and login.",
+                collector=self.name)
+
+    def _setup(self, capture_network: bool, base_url: str) -> None:
+        # name of the collector in logs, and its worker slot in metrics that
+        # is kept by the collector replacing it (see `SessionPool`)
+        self.name = f"collector{next(self._ids)}"
+        self.slot = 0
+        self._capture_network = capture_network
+        self._base_url = base_url
+        self._timeline_requests = set()
+        self._captured_writers = []
+        # futures of tweets that are being parsed (`'lxml'` extraction)
+        self._pending_parses = collections.deque()
+        # callback of captured tweet html and number of tweets captured by
+        # last scroll (`'capture'` extraction)
+        self._on_html = None
+        self._captured_count = 0
+        # window of the search page, ids of tweets collected on the page
+        # since the last script call (None before the first call) and seen
+        # ids of the running retrieve (`'script'` extraction)
+        self._search_window = (None, None)
+        self._known_ids = None
+        self._seen = None
+
+    @classmethod
+    def with_driver(cls, driver, capture_network=False, base_url=BASE_URL) -> 'Collector':
+        """
+            Creates a collector over an already started driver without
+            logging in (e.g. `fakeWebDriver.FakeDriver` for browserless
+            benchmarks).
+        """
+        collector = cls.__new__(cls)
+        collector._setup(capture_network, base_url)
+        collector._driver = driver
+        return collector
+
+    @staticmethod
+    def _create_driver(chromePath=None, firefoxPath=None, capture_network=False,
+                       lean_profile: LeanProfile = None):
+        """Starts a headless webdriver with given driver executable path"""
+        if chromePath is None and firefoxPath is not None:
+            return webdriver.Firefox(executable_path="geckodriver")
+
+        chrome_options = webdriver.ChromeOptions()
+        for argument in chrome_args(lean_profile):
+            chrome_options.add_argument(argument)
+        prefs = chrome_prefs(lean_profile)
+        if prefs:
+            chrome_options.add_experimental_option('prefs', prefs)
+        capabilities = chrome_options.to_capabilities()
+        if capture_network:
+            capabilities['goog:loggingPrefs'] = {'performance': 'ALL'}
+        driver = webdriver.Chrome(executable_path=chromePath or "chromedriver",
+                                  desired_capabilities=capabilities)
+        if lean_profile is not None and lean_profile.blocked_urls:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs',
+                                       {'urls': list(lean_profile.blocked_urls)})
+            except WebDriverException:
+                driver.quit()
+                raise
+        return driver
+
+    def _login(self, username: str, password: str) -> None:
+        """Logs in to twitter with given account"""
+        self._driver.get(self._base_url + "login")
+
+        self._driver.find_element_by_xpath(
+            "//input[contains(@name, 'username')]").send_keys(username)
+        time.sleep(0.5)
+        self._driver.find_element_by_xpath(
+            "//input[contains(@name, 'password')]").send_keys(password)
+        self._driver.find_element_by_xpath(
+            "//div[contains(@data-testid, 'LoginForm_Login_Button')]").click()
+        time.sleep(self._Msleep_seconds)
 
-    def search(self, searchKey: str, tabName="top", from_=None, to_=None, lang=None) -> None:
+    def search(self, searchKey: str, tabName="top", from_=None, to_=None, lang=None, pacing='sleep') -> None:
         """
             Method that makes searchs on twitter search engine on specified tab
             and/or specific time intervals.
@@ -87,377 +186,776 @@ class Collector:
                             image (Photos): list related photos
                             video (Videos): list realted videos
                     `from_` (datetime.date): starting date of filtering 
+                        (datetime.datetime to filter by UTC time)
                     `to_` (datetime.date): end date of filtering 
+                        (datetime.datetime to filter by UTC time)
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
         """
-        tab_str = f"&f={tabName}" if tabName != "top" else ""
-        from_str = f"%20since%3A{str(from_)}" if from_ is not None else ""
-        to_str = f"%20until%3A{str(to_)}" if to_ is not None else ""
-        lang_str = f"%20lang%3A{str(lang)}" if lang is not None else ""
-        searchKey = searchKey.replace(' ', '%20')
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+
+        search_str = search_url(searchKey, tabName, from_, to_, lang,
+                                base_url=self._base_url)
+        if self._capture_network:
+            # drop responses of previous pages
+            self._driver.get_log('performance')
+            self._timeline_requests.clear()
+
+        self._search_window = (from_, to_)
+        self._known_ids = None
+        log('search', search_str, collector=self.name, url=search_str)
+        with PAGE_LOAD_SECONDS.time():
+            self._driver.get(search_str)
+            self._page_count += 1
+            if pacing == 'event':
+                self._wait_for_nodes(f"{TWEET_SELECTOR}, {EMPTY_SEARCH_SELECTOR}",
+                                     self._event_max_timeout_seconds)
+            else:
+                time.sleep(self._Msleep_seconds)
 
-        search_str = BASE_URL + "search?q=" + searchKey + \
-            to_str + from_str + lang_str + "&src=typed_query" + tab_str
+    def _wait_for_nodes(self, selector: str, timeout: float, scroll=False) -> str:
+        """
+            Waits until a node matching `selector` is rendered.
 
-        print(search_str)
-        self._driver.get(search_str)
-        time.sleep(self._Msleep_seconds)
+                Args:
+                    `selector` (str): CSS selector of awaited nodes
+                    `timeout` (float): maximum seconds to wait
+                    `scroll` (bool): scroll to the bottom of page and wait
+                        only for newly added nodes
+
+                Returns:
+                    'found', or on timeout 'loading' if page is still loading
+                    and 'idle' otherwise
+        """
+        return self._driver.execute_async_script(
+            WAIT_FOR_NODES_SCRIPT, selector, scroll, int(timeout * 1000),
+            int(self._event_settle_seconds * 1000), LOADING_SELECTOR)
+
+    @property
+    def page_count(self) -> int:
+        """Number of search pages loaded by this collector"""
+        return self._page_count
+
+    def is_alive(self) -> bool:
+        """Returns true if browser of the collector still responds"""
+        if self._driver is None:
+            return False
+        try:
+            return self._driver.execute_script("return 1") == 1
+        except Exception:
+            return False
 
-    def retrieve_tweets_to_database(self, searchKey, database: TweetDB, lang='en'):
+    def _extract_tweets_by_elements(self, searchKey, lang, is_known):
         """
-            Method to obtain tweets from driver.
+            Generator that extracts tweets rendered since last call by
+            walking their elements through WebDriver (a round-trip for each
+            field). Elements are tagged in the page (`COLLECTED_ATTRIBUTE`)
+            and a tweet that cannot be read is untagged to be read again.
 
                 Args:
-                    `searchKey` (str): search key
-                    `database` (TweetDB): database instance to insert tweets in
-        """
-        retrieved_count = 0
-        scroll_height = 0
-        try_count = 0
-        bufque = BufferedQue(50)
-        self._process = True
+                    `searchKey` (str): search key of tweets
+                    `lang` (str): language of tweet bodies
+                    `is_known` (callable): called with tweet id, tweet is
+                        skipped if it returns true
 
-        # Collect tweets until enough different tweet is collected
-        while try_count < 5 and self._process:
-            # Control if reached the end
-            new_scroll_height = self._driver.execute_script(
-                "return document.documentElement.scrollHeight")
-            if abs(scroll_height - new_scroll_height) < 5:
-                try_count += 1
-            else:
-                try_count = 0
-                scroll_height = new_scroll_height
+                Yields:
+                    Tweet instances that are not known
+        """
+        tweet_webElements = self._driver.execute_script(
+            NEW_TWEET_ELEMENTS_SCRIPT, TWEET_XPATH, STATUS_XPATH,
+            COLLECTED_ATTRIBUTE)
 
-            # Obtain raw tweet elements
-            tweet_webElements = self._driver.find_elements_by_xpath(
-                "//div[@data-testid='tweet']")
+        for elem in tweet_webElements:
+            tweet_id = None
+            try:
+                tweet_id = int(elem.find_element_by_xpath(
+                    STATUS_XPATH).get_attribute('href').split('/')[-1])
+                # Check if tweet is already collected, if so continue to next one
+                if is_known(tweet_id):
+                    continue
 
-            # Iterate over raw tweets to extract detailed indormation and insert to database
-            for elem in tweet_webElements:
+                writer = elem.find_element_by_xpath(
+                    WRITER_XPATH).text.replace('@', '')
+                post_date = iso_to_timestamp(elem.find_element_by_xpath(
+                    TIME_XPATH).get_attribute("datetime"))
                 try:
-                    tweet_id = int(elem.find_element_by_xpath(
-                        ".//a[contains(@href, '/status/')]").get_attribute('href').split('/')[-1])
-                    # Check if tweet exist in bufque, if so continue to next one
-                    if bufque.contains(tweet_id):
-                        continue
-
-                    writer = elem.find_element_by_xpath(
-                        ".//div[@dir='ltr']").text.replace('@', '')
-                    post_date = time.strptime(elem.find_element_by_xpath(
-                        ".//time").get_attribute("datetime"), "%Y-%m-%dT%H:%M:%S.000Z")
-                    try:
-                        body = elem.find_element_by_xpath(
-                            f".//div[@lang='{lang}' and @dir='auto']").text.replace('\n', '')
-                    except NoSuchElementException:
-                        continue
-                    try:
-                        comment_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='reply']").text)
-                    except ValueError:
-                        comment_num = 0
-                    try:
-                        retweet_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='retweet']").text)
-                    except ValueError:
-                        retweet_num = 0
-                    try:
-                        like_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='like']").text)
-                    except ValueError:
-                        like_num = 0
-                except (StaleElementReferenceException, NoSuchElementException):
-                    try:
-                        print("Exception during collection of tweet:", writer)
-                    except NameError:
-                        pass
+                    body = elem.find_element_by_xpath(
+                        BODY_XPATH.format(lang=lang)).text.replace('\n', '')
+                except NoSuchElementException:
                     continue
+                comment_num = self._count_from_text(
+                    elem.find_element_by_xpath(REPLY_XPATH).text)
+                retweet_num = self._count_from_text(
+                    elem.find_element_by_xpath(RETWEET_XPATH).text)
+                like_num = self._count_from_text(
+                    elem.find_element_by_xpath(LIKE_XPATH).text)
+            except (StaleElementReferenceException, NoSuchElementException) as e:
+                log('tweet_error', f"Exception during collection of tweet: {tweet_id}",
+                    collector=self.name, tweet_id=tweet_id, error=type(e).__name__)
+                self._untag_tweets(elem)
+                continue
+
+            yield Tweet(tweet_id=tweet_id, writer=writer, post_date=post_date,
+                        body=body, searchKey=searchKey, comment_num=comment_num,
+                        retweet_num=retweet_num, like_num=like_num)
+
+    def _extract_tweets_by_script(self, searchKey, lang, is_known):
+        """
+            Generator that extracts tweets rendered since last call with a
+            single `execute_script` call that returns every field as a JSON
+            array (see `EXTRACT_TWEETS_SCRIPT`). Seen ids of the searched
+            window and collected tweets are passed to the page as known ids,
+            so fields of known tweets are not read.
 
-                # Add tweet to bufferedque
-                tweet = Tweet(tweet_id=tweet_id, writer=writer, post_date=post_date,
-                              body=body, searchKey=searchKey, comment_num=comment_num,
-                              retweet_num=retweet_num, like_num=like_num)
-                overhead_tweet = bufque.add(tweet_id, tweet)
+                Args:
+                    `searchKey` (str): search key of tweets
+                    `lang` (str): language of tweet bodies
+                    `is_known` (callable): called with tweet id, tweet is
+                        skipped if it returns true
 
-                # Insert tweet to database
-                if overhead_tweet is not None:
-                    database.insert_tweet(overhead_tweet)
-                retrieved_count += 1
+                Yields:
+                    Tweet instances that are not known
+        """
+        if self._known_ids is None:
+            known_ids = window_tweet_ids(self._seen, *self._search_window)
+        else:
+            known_ids = self._known_ids
+        self._known_ids = []
+        result = self._driver.execute_script(
+            EXTRACT_TWEETS_SCRIPT, *extract_tweets_args(lang, known_ids))
+        for tweet in tweets_from_script(result, searchKey, is_known):
+            self._known_ids.append(tweet.tweet_id)
+            yield tweet
+
+    def _extract_tweets_by_lxml(self, searchKey, lang, is_known):
+        """
+            Generator that reads html of tweets rendered since last call with
+            a single `execute_script` call and hands it to the parser pool
+            (see `pageParser.parser_pool`). Collector does not wait for the
+            parse, tweets of earlier scrolls whose parse is finished are
+            yielded instead (see `_parsed_tweets`).
 
-            # Scroll page down
-            self._driver.execute_script(
-                "window.scrollTo(0, document.body.scrollHeight)")
-            time.sleep(self._Ssleep_seconds)
+                Args:
+                    `searchKey` (str): search key of tweets
+                    `lang` (str): language of tweet bodies
+                    `is_known` (callable): called with tweet id, tweet is
+                        skipped if it returns true
 
-            # Process information
-            try:
-                last_date = time.strftime("%Y-%m-%d", tweet.post_date)
-                print(
-                    f"Last retrieved date: {last_date}({retrieved_count})-try count: {try_count}")
-            except UnboundLocalError:
-                print(f"No tweets - try count: {try_count}")
+                Yields:
+                    Tweet instances that are not known
+        """
+        nodes = self._capture_nodes()
+        if nodes:
+            self._pending_parses.append(parser_pool().submit(
+                tweets_from_html, "".join(nodes), searchKey, lang))
+        return self._parsed_tweets(is_known)
 
-        database.insert_tweets(bufque.toList())
-        print("Cannot retrieve new tweets. Finisihing...")
+    def _extract_tweets_by_capture(self, searchKey, lang, is_known):
+        """
+            Passes html of tweets rendered since last call to `on_html` of
+            `_retrieve_tweets` without parsing them (see `capture_to_archive`).
 
-    def retrieve_tweets_to_container(self, searchKey, container: list, lang='en'):
+                Returns:
+                    an empty iterator, number of captured tweets is kept in
+                    `_captured_count`
         """
-            Method to obtain tweets from driver.
+        self._captured_count = len(self._capture_nodes())
+        return iter(())
+
+    def _capture_nodes(self) -> list:
+        """Returns outerHTML of tweets rendered since last call (see
+        `CAPTURE_TWEETS_SCRIPT`) after passing them to `on_html`"""
+        nodes = self._driver.execute_script(
+            CAPTURE_TWEETS_SCRIPT, TWEET_XPATH, STATUS_XPATH, TIME_XPATH,
+            COLLECTED_ATTRIBUTE)
+        if nodes and self._on_html is not None:
+            self._on_html(nodes)
+        return nodes
+
+    def _parsed_tweets(self, is_known, wait=False):
+        """
+            Generator of tweets of finished parses in scroll order, stops at
+            the first unfinished one unless `wait` is true.
+
+                Yields:
+                    Tweet instances that are not known
+        """
+        while self._pending_parses and (wait or self._pending_parses[0].done()):
+            for tweet in self._pending_parses.popleft().result():
+                if not is_known(tweet.tweet_id):
+                    yield tweet
+
+    def _untag_tweets(self, element=None) -> None:
+        """Marks a tweet element (or every tweet of the page if None) as not
+        extracted, so DOM extraction reads it again"""
+        try:
+            self._driver.execute_script(UNTAG_TWEETS_SCRIPT, element,
+                                        COLLECTED_ATTRIBUTE)
+        except WebDriverException:
+            pass
+
+    def _read_timeline_responses(self) -> list:
+        """Returns bodies of search timeline responses finished since last
+        call, read from performance log of chrome"""
+        bodies = []
+        for entry in self._driver.get_log('performance'):
+            message = json.loads(entry['message'])['message']
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                if is_timeline_url(params['response']['url']):
+                    self._timeline_requests.add(params['requestId'])
+            elif (method == 'Network.loadingFinished' and
+                    params['requestId'] in self._timeline_requests):
+                self._timeline_requests.discard(params['requestId'])
+                try:
+                    response = self._driver.execute_cdp_cmd(
+                        'Network.getResponseBody',
+                        {'requestId': params['requestId']})
+                except WebDriverException as e:
+                    log('timeline_error',
+                        f"Exception during reading of timeline response: {e}",
+                        collector=self.name, stage='read', error=str(e))
+                    continue
+                body = response['body']
+                if response.get('base64Encoded'):
+                    body = base64.b64decode(body).decode('utf-8')
+                bodies.append(body)
+        return bodies
+
+    def _extract_tweets_by_network(self, searchKey, lang, is_known):
+        """
+            Generator that parses search timeline responses received since
+            last call. Writers of the tweets are kept to be passed out with
+            the tweets (see `_retrieve_tweets`).
 
                 Args:
                     `searchKey` (str): search key of tweets
-                    `container` (list)   : container instance to append tweets
+                    `lang` (str): language of tweets
+                    `is_known` (callable): called with tweet id, tweet is
+                        skipped if it returns true
+
+                Yields:
+                    Tweet instances that are not known
+        """
+        if not self._capture_network:
+            raise ValueError("network extraction needs a collector started "
+                             "with capture_network")
+        for body in self._read_timeline_responses():
+            try:
+                tweets, writers = parse_timeline(body, searchKey, lang)
+            except (ValueError, AttributeError) as e:
+                log('timeline_error',
+                    f"Exception during parsing of timeline response: {e}",
+                    collector=self.name, stage='parse', error=str(e))
+                continue
+            self._captured_writers.extend(writers)
+            for tweet in tweets:
+                # Check if tweet is already collected, if so continue to next one
+                if not is_known(tweet.tweet_id):
+                    yield tweet
+
+    def _retrieve_tweets(self, searchKey, append, extend, lang='en', extraction='element', pacing='sleep',
+                         checkpoint=None, seen: SeenIDs = None, on_writer=None,
+                         on_html=None) -> int:
         """
+            Scrolls through search results and passes every tweet that leaves
+            the buffer to `append` and remaining ones to `extend` at the end.
+
+                Args:
+                    `searchKey` (str): search key of tweets
+                    `append` (callable): called with each Tweet that overflows
+                        the buffer
+                    `extend` (callable): called with the list of Tweets left
+                        in the buffer at the end
+                    `lang` (str): language of tweet bodies
+                    `extraction` (str): `'element'`, `'script'`, `'lxml'` or `'network'`, see
+                        `EXTRACTION_MODES`, or `'capture'` to only pass html
+                        of tweets to `on_html`
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+                    `checkpoint` (callable): called with the oldest Tweet
+                        passed out so far (None if no tweet) and a bool that
+                        is true if end of results is reached. Called after
+                        each scroll that passes tweets out and once at the end
+                    `seen` (SeenIDs): ids of tweets that are collected by any
+                        collector, tweets in it are skipped after reading only
+                        their id and passed out tweets are added to it
+                    `on_writer` (callable): called with each Writer read from
+                        timeline responses (`'network'` extraction only)
+                    `on_html` (callable): called with the list of html of
+                        tweets rendered by each scroll (`'lxml'` and
+                        `'capture'` extractions only)
+
+                Returns:
+                    number of retrieved (or captured) tweets
+        """
+        if extraction not in EXTRACTION_MODES + (CAPTURE_EXTRACTION,):
+            raise ValueError(f"unknown extraction mode: {extraction}")
+        if extraction == CAPTURE_EXTRACTION and on_html is None:
+            raise ValueError("capture extraction needs on_html")
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+        extract = {'element': self._extract_tweets_by_elements,
+                   'script': self._extract_tweets_by_script,
+                   'lxml': self._extract_tweets_by_lxml,
+                   'network': self._extract_tweets_by_network,
+                   CAPTURE_EXTRACTION: self._extract_tweets_by_capture}[extraction]
+
         retrieved_count = 0
         scroll_height = 0
         try_count = 0
+        max_try_count = self._event_end_tries if pacing == 'event' else 5
+        timeout = self._event_timeout_seconds
+        page_state = None
+        oldest = None
         bufque = BufferedQue(50)
+        skipped_ids = set()
+        reported_writers = set()
+        self._captured_writers.clear()
+        self._pending_parses.clear()
+        self._on_html = on_html
+        self._captured_count = 0
+        self._seen = seen
         self._process = True
+        t_start = time.perf_counter()
+
+        def is_known(tweet_id):
+            if bufque.contains(tweet_id):
+                return True
+            if seen is not None and tweet_id in seen:
+                skipped_ids.add(tweet_id)
+                return True
+            return False
 
         # Collect tweets until enough different tweet is collected
-        while try_count < 5 and self._process:
-            # Control if reached the end
-            new_scroll_height = self._driver.execute_script(
-                "return document.documentElement.scrollHeight")
-            if abs(scroll_height - new_scroll_height) < 5:
-                try_count += 1
+        while try_count < max_try_count and self._process:
+            if pacing == 'sleep':
+                # Control if reached the end
+                new_scroll_height = self._driver.execute_script(
+                    "return document.documentElement.scrollHeight")
+                if abs(scroll_height - new_scroll_height) < 5:
+                    try_count += 1
+                else:
+                    try_count = 0
+                    scroll_height = new_scroll_height
+
+            # Extract visible tweets and add them to bufferedque
+            new_count = 0
+            skipped_count = len(skipped_ids)
+            oldest_changed = False
+            t0 = time.perf_counter()
+            for tweet in extract(searchKey, lang, is_known):
+                overhead_tweet = bufque.add(tweet.tweet_id, tweet)
+                if overhead_tweet is not None:
+                    append(overhead_tweet)
+                    if seen is not None:
+                        seen.add(overhead_tweet.tweet_id)
+                    if (oldest is None or
+                            overhead_tweet.timestamp < oldest.timestamp):
+                        oldest = overhead_tweet
+                        oldest_changed = True
+                new_count += 1
+            SCROLL_EXTRACT_SECONDS.observe(time.perf_counter() - t0,
+                                           extraction=extraction)
+            if extraction == CAPTURE_EXTRACTION:
+                new_count = self._captured_count
+                TWEETS_CAPTURED.inc(new_count, worker=self.slot)
             else:
-                try_count = 0
-                scroll_height = new_scroll_height
+                TWEETS_COLLECTED.inc(new_count, worker=self.slot)
+            DUPLICATES_SKIPPED.inc(len(skipped_ids) - skipped_count,
+                                   worker=self.slot)
+            retrieved_count += new_count
+            for writer in self._captured_writers:
+                if on_writer is not None and writer.user_id not in reported_writers:
+                    on_writer(writer)
+                    reported_writers.add(writer.user_id)
+            self._captured_writers.clear()
+            if checkpoint is not None and oldest_changed:
+                checkpoint(oldest, False)
+
+            if pacing == 'event':
+                # Control if reached the end, wait longer while page is loading
+                if (new_count > 0 or len(skipped_ids) > skipped_count or
+                        self._pending_parses):
+                    try_count = 0
+                    timeout = self._event_timeout_seconds
+                elif (page_state == 'loading' and
+                        timeout < self._event_max_timeout_seconds):
+                    timeout = min(timeout * 2, self._event_max_timeout_seconds)
+                else:
+                    try_count += 1
 
-            # Obtain raw tweet elements
-            tweet_webElements = self._driver.find_elements_by_xpath(
-                "//div[@data-testid='tweet']")
+                # Scroll page down and wait for new tweets
+                if try_count < max_try_count:
+                    page_state = self._wait_for_nodes(TWEET_SELECTOR, timeout,
+                                                      scroll=True)
+            else:
+                # Scroll page down
+                self._driver.execute_script(
+                    "window.scrollTo(0, document.body.scrollHeight)")
+                time.sleep(self._Ssleep_seconds)
 
-            # Iterate over raw tweets to extract detailed indormation and append to container
-            for elem in tweet_webElements:
+            # Process information
+            if extraction == CAPTURE_EXTRACTION:
+                log('scroll', f"Captured tweets: {retrieved_count}-try count: {try_count}",
+                    collector=self.name, captured=retrieved_count,
+                    try_count=try_count)
+            else:
                 try:
-                    tweet_id = int(elem.find_element_by_xpath(
-                        ".//a[contains(@href, '/status/')]").get_attribute('href').split('/')[-1])
-                    # Check if tweet exist in bufque, if so continue to next one
-                    if bufque.contains(tweet_id):
-                        continue
-
-                    writer = elem.find_element_by_xpath(
-                        ".//div[@dir='ltr']").text.replace('@', '')
-                    post_date = time.strptime(elem.find_element_by_xpath(
-                        ".//time").get_attribute("datetime"), "%Y-%m-%dT%H:%M:%S.000Z")
-                    try:
-                        body = elem.find_element_by_xpath(
-                            f".//div[@lang='{lang}' and @dir='auto']").text.replace('\n', '')
-                    except NoSuchElementException:
-                        continue
-                    try:
-                        comment_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='reply']").text)
-                    except ValueError:
-                        comment_num = 0
-                    try:
-                        retweet_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='retweet']").text)
-                    except ValueError:
-                        retweet_num = 0
-                    try:
-                        like_num = int(elem.find_element_by_xpath(
-                            ".//div[@data-testid='like']").text)
-                    except ValueError:
-                        like_num = 0
-                except (StaleElementReferenceException, NoSuchElementException):
-                    try:
-                        print("Exception during collection of tweet:", writer)
-                    except NameError:
-                        pass
-                    continue
-
-                # Add tweet to bufferedque
-                tweet = Tweet(tweet_id=tweet_id, writer=writer,
-                              post_date=post_date, body=body,
-                              searchKey=searchKey,
-                              comment_num=comment_num, retweet_num=retweet_num,
-                              like_num=like_num)
-                overhead_tweet = bufque.add(tweet_id, tweet)
-
-                # Insert tweet to container
-                if overhead_tweet is not None:
-                    container.append(overhead_tweet)
-                retrieved_count += 1
+                    last_date = time.strftime("%Y-%m-%d", time.gmtime(tweet.timestamp))
+                    log('scroll',
+                        f"Last retrieved date: {last_date}({retrieved_count})-try count: {try_count}",
+                        collector=self.name, last_date=last_date,
+                        retrieved=retrieved_count, try_count=try_count)
+                except UnboundLocalError:
+                    log('scroll', f"No tweets - try count: {try_count}",
+                        collector=self.name, retrieved=0, try_count=try_count)
+
+        # tweets of last scrolls that are still being parsed
+        for tweet in self._parsed_tweets(is_known, wait=True):
+            overhead_tweet = bufque.add(tweet.tweet_id, tweet)
+            if overhead_tweet is not None:
+                append(overhead_tweet)
+                if seen is not None:
+                    seen.add(overhead_tweet.tweet_id)
+                if oldest is None or overhead_tweet.timestamp < oldest.timestamp:
+                    oldest = overhead_tweet
+            retrieved_count += 1
+            TWEETS_COLLECTED.inc(worker=self.slot)
+
+        remaining = bufque.toList()
+        extend(remaining)
+        if seen is not None:
+            seen.update(tweet.tweet_id for tweet in remaining)
+        for tweet in remaining:
+            if oldest is None or tweet.timestamp < oldest.timestamp:
+                oldest = tweet
+        if checkpoint is not None:
+            checkpoint(oldest, try_count >= max_try_count)
+        TWEET_RATE.set(retrieved_count / max(time.perf_counter() - t_start, 1e-9),
+                       worker=self.slot)
+        return retrieved_count
+
+    def retrieve_tweets_to_database(self, searchKey, database: TweetDB, lang='en', extraction='element', pacing='sleep'):
+        """
+            Method to obtain tweets from driver.
 
-            # Scroll page down
-            self._driver.execute_script(
-                "window.scrollTo(0, document.body.scrollHeight)")
-            time.sleep(self._Ssleep_seconds)
+                Args:
+                    `searchKey` (str): search key
+                    `database` (TweetDB): database instance to insert tweets in
+                    `lang` (str): language of tweet bodies
+                    `extraction` (str): `'element'`, `'script'`, `'lxml'` or `'network'`, see
+                        `EXTRACTION_MODES`
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+        """
+        self._retrieve_tweets(searchKey, database.insert_tweet,
+                              database.insert_tweets, lang=lang,
+                              extraction=extraction, pacing=pacing,
+                              on_writer=lambda writer: database.insert_writers([writer]))
+        log('search_end', "Cannot retrieve new tweets. Finisihing...",
+            collector=self.name)
+
+    def retrieve_tweets_to_container(self, searchKey, container: list, lang='en', extraction='element', pacing='sleep',
+                                     checkpoint=None, seen: SeenIDs = None) -> int:
+        """
+            Method to obtain tweets from driver.
 
-            # Process information
-            try:
-                last_date = time.strftime("%Y-%m-%d", tweet.post_date)
-                print(
-                    f"Last retrieved date: {last_date}({retrieved_count})-try count: {try_count}")
-            except UnboundLocalError:
-                print(f"No tweets - try count: {try_count}")
+                Args:
+                    `searchKey` (str): search key of tweets
+                    `container` (list)   : container instance to append tweets
+                        (any object with `append` and `extend`, e.g. DBWriter).
+                        Writers read by `'network'` extraction are passed to
+                        its `put_writer` if it has one
+                    `lang` (str): language of tweet bodies
+                    `extraction` (str): `'element'`, `'script'`, `'lxml'` or `'network'`, see
+                        `EXTRACTION_MODES`
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+                    `checkpoint` (callable): progress callback, see
+                        `_retrieve_tweets`
+                    `seen` (SeenIDs): ids of already collected tweets, see
+                        `_retrieve_tweets`
+
+                Returns:
+                    number of tweets appended to container
+        """
+        retrieved_count = self._retrieve_tweets(
+            searchKey, container.append, container.extend, lang=lang,
+            extraction=extraction, pacing=pacing, checkpoint=checkpoint,
+            seen=seen, on_writer=getattr(container, 'put_writer', None))
+        log('search_end', "Cannot retrieve new tweets. Finisihing...",
+            collector=self.name)
+        return retrieved_count
+
+    def capture_to_archive(self, archive, pacing='sleep', checkpoint=None) -> int:
+        """
+            Scrolls through search results like `retrieve_tweets_to_container`
+            but only appends html of newly rendered tweets of each scroll to
+            archive, tweets are parsed offline (see `reparse`).
 
-        container.extend(bufque.toList())
-        print("Cannot retrieve new tweets. Finisihing...")
+                Args:
+                    `archive` (PageArchive): archive of the search window
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+                    `checkpoint` (callable): called once at the end with None
+                        and a bool that is true if end of results is reached,
+                        see `_retrieve_tweets`
+
+                Returns:
+                    number of captured tweets
+        """
+        captured_count = self._retrieve_tweets(
+            None, None, lambda tweets: None, extraction=CAPTURE_EXTRACTION,
+            pacing=pacing, checkpoint=checkpoint, on_html=archive.append)
+        log('search_end', "Cannot capture new tweets. Finisihing...",
+            collector=self.name)
+        return captured_count
 
     def insert_unreachable_writer(self, database: TweetDB, user_id: str, status: str):
-        database.c.execute("INSERT INTO UnreachableWriter VALUES (:user_id, :status)",
-                           {'user_id': user_id, 'status': status})
+        database.insert_unreachable_writers([UnreachableWriter(user_id, status)])
 
     def fetch_unreachable_writer(self, database: TweetDB):
-        database.c.execute("SELECT * FROM UnreachableWriter")
-        return database.c.fetchall()
+        return database.get_unreachable_writers()
 
     def classify_unreachable_writer(self):
         try:
-            self._driver.find_element_by_xpath(
-                "//*[contains(text(), 'This account doesn')]")
+            self._driver.find_element_by_xpath(PROFILE_XPATHS['not_exist'])
             return "existance"
         except NoSuchElementException:
             try:
-                self._driver.find_element_by_xpath(
-                    "//*[contains(text(), 'Account suspended')]")
+                self._driver.find_element_by_xpath(PROFILE_XPATHS['suspended'])
                 return "suspended"
             except NoSuchElementException:
                 return None
 
-    def retrieve_writers_to_db(self, database: TweetDB, passed_writers=[]):
-        user_ids = [i[0] for i in database.get_companies_by_query(
-            """ SELECT DISTINCT writer 
-                FROM Tweet
-                EXCEPT
-                SELECT user_id
-                FROM Writer
-            """)]
-        writers = list()
+    def retrieve_writer(self, user_id: str, pacing='sleep', extraction='script'):
+        """
+            Visits profile of a writer and reads its information.
 
-        for passed_writer in self.fetch_unreachable_writer(database):
-            if not passed_writer[0] in passed_writers:
-                passed_writers.append(passed_writer[0])
+                Args:
+                    `user_id` (str): id of twitter user
+                    `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+                    `extraction` (str): `'element'` or `'script'`, see
+                        `DOM_EXTRACTION_MODES`
+
+                Returns:
+                    Writer instance, or UnreachableWriter if profile cannot be
+                    read (`status` is None if reason is not known)
+        """
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+        if extraction not in DOM_EXTRACTION_MODES:
+            raise ValueError(f"unknown extraction mode: {extraction}")
+
+        self._driver.get(self._base_url + user_id)
+        self._page_count += 1
+        if pacing == 'event':
+            self._wait_for_nodes(PROFILE_SELECTOR, self._event_max_timeout_seconds)
+        else:
+            time.sleep(self._Msleep_seconds)
+
+        if extraction == 'script':
+            profile = self._read_profile_by_script(user_id)
+        else:
+            profile = self._read_profile_by_elements(user_id)
+        return self._writer_from_profile(user_id, profile)
+
+    def _read_profile_by_script(self, user_id: str) -> dict:
+        """
+            Reads fields of loaded profile page with a single `execute_script`
+            call (two for restricted accounts, after confirming the warning).
 
-        try:
-            for idx, user_id in enumerate(user_ids):
-                if user_id in passed_writers:
-                    print("instant passed writer:", user_id)
-                    continue
+                Returns:
+                    dict of profile texts, see `EXTRACT_PROFILE_SCRIPT`
+        """
+        xpaths = {name: xpath.format(user_id=user_id)
+                  for name, xpath in PROFILE_XPATHS.items()}
+        profile = json.loads(self._driver.execute_script(
+            EXTRACT_PROFILE_SCRIPT, xpaths))
+        if profile['status'] == 'restricted':
+            self._driver.find_element_by_xpath(
+                PROFILE_XPATHS['view_profile']).click()
+            time.sleep(self._Ssleep_seconds)
+            profile = json.loads(self._driver.execute_script(
+                EXTRACT_PROFILE_SCRIPT, xpaths))
+        return profile
 
-                self._driver.get(f"https://www.twitter.com/{user_id}")
-                time.sleep(self._Msleep_seconds)
+    def _read_profile_by_elements(self, user_id: str) -> dict:
+        """
+            Reads fields of loaded profile page with a WebDriver call for
+            each field.
 
-                username = self._driver.find_element_by_xpath(
-                    "//h2[@aria-level='2' and @role='heading' and @dir='ltr']").text
+                Returns:
+                    dict of profile texts, see `EXTRACT_PROFILE_SCRIPT`
+        """
+        def text(xpath):
+            try:
+                return self._driver.find_element_by_xpath(xpath).text
+            except NoSuchElementException:
+                return None
 
-                # try-catch to handle restricted accounts
-                try:
-                    following = int(self._driver.find_element_by_xpath(
-                        f"//a[contains(@href, '{user_id}/following')]").get_attribute('title').replace(',', ''))
-                except NoSuchElementException:
-                    try:
-                        try:
-                            following = int(self._driver.find_element_by_xpath(
-                                "//div[@dir='auto' and @role='button']").get_attribute('title').replace(',', ''))
-                        except NoSuchElementException:
-                            self._driver.find_element_by_xpath(
-                                "//span[contains(text(), 'Yes, view profile')]").click()
-                            time.sleep(self._Ssleep_seconds)
-                            following = int(self._driver.find_element_by_xpath(
-                                f"//a[contains(@href, '{user_id}/following')]").get_attribute('title').replace(',', ''))
-                    except NoSuchElementException:
-                        passed_writers.append(user_id)
-                        status = self.classify_unreachable_writer()
-                        if status:
-                            self.insert_unreachable_writer(database,
-                                                           user_id, status)
-                        print(f"passed writer:{user_id} - {status}")
-                        continue
-
-                # Follower count data
-                try:
-                    follower = int(self._driver.find_element_by_xpath(
-                        f"//a[contains(@href, '{user_id}/follower')]").get_attribute('title').replace(',', ''))
-                except NoSuchElementException:
-                    try:
-                        follower = following = int(self._driver.find_elements_by_xpath(
-                            "//div[@dir='auto' and @role='button']")[1].get_attribute('title').replace(',', ''))
-                    except NoSuchElementException:
-                        print("passed writer:", user_id)
-                        passed_writers.append(user_id)
-                        continue
-
-                # Tweet count data
-                try:
-                    tweet_count = self.number_converter(self._driver.find_element_by_xpath(
-                        "//div[@dir='auto' and contains(text(), ' Tweets')]").text.split(' ')[0])
-                except NoSuchElementException:
-                    tweet_count = 0
+        def title(xpath):
+            try:
+                return self._driver.find_element_by_xpath(
+                    xpath.format(user_id=user_id)).get_attribute('title')
+            except NoSuchElementException:
+                return None
 
-                # Bio text data
-                try:
-                    bio_text = self._driver.find_element_by_xpath(
-                        "//div[@data-testid='UserDescription']").text.replace('\n', '')
-                except NoSuchElementException:
-                    bio_text = None
-                user_profile_items = self._driver.find_element_by_xpath(
-                    "//div[@data-testid='UserProfileHeader_Items']")
+        def button_title(index):
+            buttons = self._driver.find_elements_by_xpath(
+                PROFILE_XPATHS['buttons'])
+            return buttons[index].get_attribute('title') if len(buttons) > index else None
+
+        profile = dict.fromkeys(('status', 'username', 'following', 'follower',
+                                 'tweet_count', 'bio', 'header', 'website',
+                                 'born', 'joined', 'location'))
+        profile['username'] = text(PROFILE_XPATHS['username'])
+        if profile['username'] is None:
+            profile['status'] = self.classify_unreachable_writer()
+            return profile
+
+        # restricted accounts are shown after a warning
+        profile['following'] = (title(PROFILE_XPATHS['following']) or
+                                button_title(0))
+        if profile['following'] is None:
+            try:
+                self._driver.find_element_by_xpath(
+                    PROFILE_XPATHS['view_profile']).click()
+                time.sleep(self._Ssleep_seconds)
+                profile['following'] = title(PROFILE_XPATHS['following'])
+            except NoSuchElementException:
+                pass
+        if profile['following'] is None:
+            profile['status'] = self.classify_unreachable_writer()
+            return profile
+
+        profile['follower'] = (title(PROFILE_XPATHS['follower']) or
+                               button_title(1))
+        profile['tweet_count'] = text(PROFILE_XPATHS['tweet_count'])
+        profile['bio'] = text(PROFILE_XPATHS['bio'])
+        profile['header'] = text(PROFILE_XPATHS['header'])
+        if profile['header'] is None:
+            return profile
+        profile['website'] = text(PROFILE_XPATHS['website'])
+        profile['born'] = text(PROFILE_XPATHS['born'])
+        profile['joined'] = text(PROFILE_XPATHS['joined'])
+
+        # Location is what remains in header
+        location = profile['header']
+        for item in (profile['born'], profile['joined'], profile['website']):
+            if item:
+                location = location.replace(item, '')
+        profile['location'] = location.strip() or None
+        return profile
+
+    def _writer_from_profile(self, user_id: str, profile: dict):
+        """
+            Creates Writer from profile texts.
 
-                # Website link data
-                try:
-                    website = user_profile_items.find_element_by_xpath(
-                        "//a[@target='_blank']").text
-                except NoSuchElementException:
-                    website = None
+                Returns:
+                    Writer instance, or UnreachableWriter if a needed field is
+                    missing
+        """
+        if profile['username'] is None or profile['following'] is None:
+            return UnreachableWriter(user_id, profile['status'])
+        if (profile['follower'] is None or profile['header'] is None or
+                profile['joined'] is None):
+            return UnreachableWriter(user_id, None)
 
-                # Born date data
-                try:
-                    born_text = user_profile_items.find_element_by_xpath(
-                        "//span[contains(text(), 'Born')]").text
-                    if born_text.find(',') > -1:
-                        born = time.strptime(born_text, "Born %B %d, %Y")
-                    else:
-                        born = time.strptime(born_text, "Born %B %d")
-                except NoSuchElementException:
-                    born_text = ""
-                    born = None
-                except ValueError:
-                    born = None
+        try:
+            joined = time.strptime(profile['joined'], "Joined %B %Y")
+        except ValueError:
+            return UnreachableWriter(user_id, None)
 
-                # Joined date data
-                try:
-                    joined_text = user_profile_items.find_element_by_xpath(
-                        "//span[contains(text(), 'Joined') and not(contains(text(), 'Twitter'))]").text
-                    joined = time.strptime(joined_text, "Joined %B %Y")
-                except:
-                    continue
+        born = None
+        if profile['born']:
+            try:
+                born = time.strptime(profile['born'], "Born %B %d, %Y"
+                                     if ',' in profile['born'] else "Born %B %d")
+            except ValueError:
+                born = None
 
-                # Location text data
-                location = user_profile_items.text.replace(born_text, '').replace(
-                    joined_text, '').replace(website if website else "", '')
-                if len(location) <= 0:
-                    location = None
+        try:
+            tweet_count = self.number_converter(
+                profile['tweet_count'].split(' ')[0])
+        except (AttributeError, ValueError):
+            tweet_count = 0
+
+        return Writer(user_id=user_id, username=profile['username'],
+                      following=int(profile['following'].replace(',', '')),
+                      follower=int(profile['follower'].replace(',', '')),
+                      tweet_count=tweet_count,
+                      bio_text=(profile['bio'].replace('\n', '')
+                                if profile['bio'] is not None else None),
+                      location=profile['location'], website=profile['website'],
+                      born=born, joined=joined)
+
+    def retrieve_writers_to_db(self, database: TweetDB, passed_writers=[],
+                               pacing='sleep', extraction='script'):
+        """
+            Collects profiles of writers of collected tweets one by one with
+            this collector (see `writerHarvester.WriterHarvester` to use
+            several sessions). Writers recorded as unreachable are skipped.
+            `pacing` and `extraction` are passed to `retrieve_writer`.
+
+                Returns:
+                    tuple of (bool, list) - false if collection is interrupted
+                    by an error and ids of passed writers
+        """
+        user_ids = database.get_missing_writers()
+        writers = list()
 
-                writers.append(Writer(user_id=user_id, username=username,
-                                      following=following, follower=follower,
-                                      tweet_count=tweet_count, bio_text=bio_text,
-                                      location=location, website=website, born=born,
-                                      joined=joined))
+        try:
+            for idx, user_id in enumerate(user_ids):
+                if user_id in passed_writers:
+                    log('writer_skip', f"instant passed writer: {user_id}",
+                        collector=self.name, user_id=user_id)
+                    continue
+
+                writer = self.retrieve_writer(user_id, pacing=pacing,
+                                              extraction=extraction)
+                if isinstance(writer, UnreachableWriter):
+                    passed_writers.append(user_id)
+                    if writer.status:
+                        database.insert_unreachable_writers([writer])
+                    log('writer_unreachable',
+                        f"passed writer:{user_id} - {writer.status}",
+                        collector=self.name, user_id=user_id, status=writer.status)
+                    continue
+                writers.append(writer)
 
                 # insertion operation
                 if len(writers) > 10:
-                    print("Inserting writers to database")
+                    log('writer_insert', "Inserting writers to database",
+                        collector=self.name, writers=len(writers))
                     database.insert_writers(writers)
                     writers = list()
-                print(f"{idx}/{len(user_ids)}, {user_id}")
-            print("writer collecting is finished")
+                log('writer', f"{idx}/{len(user_ids)}, {user_id}",
+                    collector=self.name, user_id=user_id, index=idx,
+                    total=len(user_ids))
+            log('writers_finished', "writer collecting is finished",
+                collector=self.name, total=len(user_ids))
             database.insert_writers(writers)
         except Exception as e:
-            print(e)
+            log('writers_error', str(e), collector=self.name, error=str(e))
             return False, passed_writers
         return True, passed_writers
 
+    @staticmethod
+    def _count_from_text(count_text) -> int:
+        """Converts reply/retweet/like text of a tweet to int (0 if not plain)"""
+        return count_from_text(count_text)
+
     @staticmethod
     def number_converter(number_string: str, return_type=int):
         number_string = number_string.replace(',', '')
         if number_string.find('K') > -1:
-            return return_type(float(number_string.replace('K', ''))*10e3)
+            return return_type(round(float(number_string.replace('K', ''))*1e3))
         if number_string.find('M') > -1:
-            return return_type(float(number_string.replace('M', ''))*10e6)
+            return return_type(round(float(number_string.replace('M', ''))*1e6))
         return return_type(number_string)
 
+    def stop(self):
+        """Stops running retrieve loop after current scroll"""
+        self._process = False
+
     def closeAll(self):
         self._driver.quit()
@@ -0,0 +1,262 @@
+import queue
+import sqlite3
+import time
+from threading import Event, Thread
+
+from metrics import log
+from writer import Writer
+from tweetDB import TweetDB, UnreachableWriter, WindowProgress
+
+_CLOSE = object()
+
+# Seconds between checks of writer thread while a caller waits on it
+_WAIT_SECONDS = 1.0
+
+
+class DBWriterError(Exception):
+    """Raised when queued rows could not be written to database"""
+
+
+class _Sync:
+    """Queue marker that is set when rows put before it are committed"""
+
+    def __init__(self):
+        self.done = Event()
+        self.error = None
+
+
+class DBWriter(Thread):
+    """
+    Database writer thread. Tweets are put into a bounded queue and inserted
+    by a single thread in batches, one transaction per batch. When queue is
+    full, `append` blocks until the writer catches up.
+
+    Can be used in place of a container list (see `append` and `extend`).
+    Writer profiles and unreachable writers can be put into the same queue
+    (see `put_writer` and `put_unreachable`).
+    Window progress put after tweets is committed after those tweets, so a
+    recorded progress never gets ahead of stored tweets.
+
+    A batch that cannot be written is retried `retry_count` times on
+    transient errors (e.g. locked database). If it is still not written its
+    rows are lost, so window progress is no longer recorded and `sync`,
+    `flush` and `close` raise DBWriterError from then on.
+    If the writer thread stops (e.g. database cannot be opened), waiting
+    calls raise DBWriterError instead of blocking forever.
+    """
+
+    def __init__(self, database_name: str, queue_size=10000, batch_size=500,
+                 flush_seconds=2.0, pragmas=None, retry_count=3):
+        """
+            Args:
+                `database_name` (str): name of TweetDB to write into, database
+                    connection is opened on the writer thread
+                `queue_size` (int): maximum number of waiting tweets
+                `batch_size` (int): number of tweets committed at once
+                `flush_seconds` (float): maximum seconds a tweet waits in a
+                    batch before commit
+                `pragmas` (dict): connection pragmas of TweetDB
+                `retry_count` (int): re-run number of a batch that fails with
+                    sqlite3.OperationalError
+        """
+        super().__init__(daemon=True)
+        self._database_name = database_name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self._flush_seconds = flush_seconds
+        self._pragmas = pragmas
+        self._retry_count = retry_count
+        self.error = None
+        self.inserted_count = 0
+        self.duplicate_count = 0
+        self.writer_count = 0
+
+    def append(self, tweet) -> None:
+        """Puts a tweet into write queue, blocks if queue is full"""
+        self._put(tweet)
+
+    def extend(self, tweets) -> None:
+        """Puts tweets into write queue, blocks if queue is full"""
+        for tweet in tweets:
+            self._put(tweet)
+
+    def put_progress(self, progress: WindowProgress) -> None:
+        """Puts a window progress into write queue, blocks if queue is full"""
+        self._put(progress)
+
+    def put_writer(self, writer) -> None:
+        """Puts a Writer into write queue, blocks if queue is full"""
+        self._put(writer)
+
+    def put_unreachable(self, unreachable: UnreachableWriter) -> None:
+        """Puts an UnreachableWriter into write queue, blocks if queue is full"""
+        self._put(unreachable)
+
+    def check(self) -> None:
+        """Raises DBWriterError if a batch could not be written"""
+        if self.error is not None:
+            raise DBWriterError(f"database writer failed: {self.error}") from self.error
+
+    def _check_running(self) -> None:
+        """Raises DBWriterError if writer thread is started and has stopped"""
+        if self.ident is not None and not self.is_alive():
+            self.check()
+            raise DBWriterError("database writer is not running")
+
+    def _put(self, item) -> None:
+        """Puts an item into write queue, waits while queue is full and
+        writer thread is running"""
+        while True:
+            self._check_running()
+            try:
+                self._queue.put(item, timeout=_WAIT_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    def sync(self) -> None:
+        """
+            Blocks until rows put by the calling thread so far are committed,
+            their batch is committed without waiting for `flush_seconds`.
+
+                Raises:
+                    DBWriterError if a batch could not be written or writer
+                    thread has stopped
+        """
+        marker = _Sync()
+        self._put(marker)
+        while not marker.done.wait(_WAIT_SECONDS):
+            self._check_running()
+        if marker.error is not None:
+            raise DBWriterError(f"database writer failed: {marker.error}") from marker.error
+
+    def flush(self) -> None:
+        """
+            Blocks until every queued tweet is committed.
+
+                Raises:
+                    DBWriterError if a batch could not be written or writer
+                    thread has stopped
+        """
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                self._check_running()
+                self._queue.all_tasks_done.wait(_WAIT_SECONDS)
+        self.check()
+
+    def close(self) -> None:
+        """
+            Commits queued tweets and stops the writer thread.
+
+                Raises:
+                    DBWriterError if a batch could not be written
+        """
+        if self.is_alive():
+            self._put(_CLOSE)
+        self.join()
+        self.check()
+
+    def _write(self, write, rows: list, table: str) -> bool:
+        """Runs `write`, retries transient errors. Returns false and records
+        the error if rows could not be written"""
+        for attempt in range(self._retry_count + 1):
+            try:
+                write()
+                return True
+            except sqlite3.OperationalError as e:
+                if attempt == self._retry_count:
+                    error = e
+                    break
+                log('db_retry', f"Retrying {len(rows)} {table} rows: {e}",
+                    table=table, rows=len(rows), attempt=attempt + 1, error=str(e))
+                time.sleep(0.5 * 2 ** attempt)
+            except Exception as e:
+                error = e
+                break
+        log('db_error', f"Failed to write {len(rows)} {table} rows: {error}",
+            table=table, rows=len(rows), error=str(error))
+        self.error = error
+        return False
+
+    def _commit(self, database: TweetDB, batch: list, progresses: list,
+                writers: list, unreachables: list) -> None:
+        def write_tweets():
+            inserted, duplicate = database.insert_tweets(batch)
+            self.inserted_count += inserted
+            self.duplicate_count += duplicate
+
+        def write_writers():
+            inserted, _ = database.insert_writers(writers)
+            self.writer_count += inserted
+
+        if batch:
+            self._write(write_tweets, batch, 'Tweet')
+        # progress is not recorded after tweets are lost, so their windows
+        # are not completed and are collected again
+        if progresses and self.error is None:
+            self._write(lambda: database.update_window_progress(progresses),
+                        progresses, 'WindowProgress')
+        if writers:
+            self._write(write_writers, writers, 'Writer')
+        if unreachables:
+            self._write(lambda: database.insert_unreachable_writers(unreachables),
+                        unreachables, 'UnreachableWriter')
+        for _ in range(len(batch) + len(progresses) + len(writers) +
+                       len(unreachables)):
+            self._queue.task_done()
+        batch.clear()
+        progresses.clear()
+        writers.clear()
+        unreachables.clear()
+
+    def run(self):
+        database = None
+        batch = []
+        progresses = []
+        writers = []
+        unreachables = []
+        deadline = None
+        try:
+            database = TweetDB(self._database_name, pragmas=self._pragmas)
+            while True:
+                timeout = (None if deadline is None
+                           else max(deadline - time.time(), 0))
+                try:
+                    tweet = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    self._commit(database, batch, progresses, writers, unreachables)
+                    deadline = None
+                    continue
+
+                if tweet is _CLOSE:
+                    self._commit(database, batch, progresses, writers, unreachables)
+                    self._queue.task_done()
+                    return
+
+                if isinstance(tweet, _Sync):
+                    self._commit(database, batch, progresses, writers, unreachables)
+                    deadline = None
+                    tweet.error = self.error
+                    tweet.done.set()
+                    self._queue.task_done()
+                    continue
+
+                if isinstance(tweet, WindowProgress):
+                    progresses.append(tweet)
+                elif isinstance(tweet, Writer):
+                    writers.append(tweet)
+                elif isinstance(tweet, UnreachableWriter):
+                    unreachables.append(tweet)
+                else:
+                    batch.append(tweet)
+                if deadline is None:
+                    deadline = time.time() + self._flush_seconds
+                if len(batch) + len(writers) >= self._batch_size:
+                    self._commit(database, batch, progresses, writers, unreachables)
+                    deadline = None
+        except Exception as e:
+            log('db_error', f"Database writer stopped: {e}", error=str(e))
+            self.error = e
+        finally:
+            if database is not None:
+                database.close_DB()
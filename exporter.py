@@ -0,0 +1,259 @@
+import argparse
+import datetime
+import gzip
+import io
+import json
+import os
+
+from tweetDB import SCHEMA_VERSION, TweetDB
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_FORMATS = ('parquet', 'jsonl')
+COMPRESSIONS = ('gzip', 'zstd', 'none')
+TABLES = ('Tweet', 'Writer', 'SearchKey_Tweet')
+
+# Column names and arrow types of exported tables
+_COLUMNS = {
+    'Tweet': [('tweet_id', 'int64'), ('writer', 'string'),
+              ('post_date', 'int64'), ('body', 'string'),
+              ('comment_num', 'int64'), ('retweet_num', 'int64'),
+              ('like_num', 'int64')],
+    'Writer': [('user_id', 'string'), ('username', 'string'),
+               ('following', 'int64'), ('followerer', 'int64'),
+               ('tweet_count', 'int64'), ('bio_text', 'string'),
+               ('location', 'string'), ('website', 'string'),
+               ('birthdate', 'int64'), ('joined', 'int64')],
+    'SearchKey_Tweet': [('tweet_id', 'int64'), ('searchKey', 'string')],
+}
+
+
+def _tweet_filter(since=None, until=None, searchKey=None, alias="Tweet") -> tuple:
+    """Returns SQL condition and parameters that filters tweets"""
+    conditions = []
+    params = []
+    if since is not None:
+        conditions.append(f"{alias}.post_date >= ?")
+        params.append(TweetDB.date_to_seconds(since))
+    if until is not None:
+        conditions.append(f"{alias}.post_date < ?")
+        params.append(TweetDB.date_to_seconds(until))
+    if searchKey is not None:
+        conditions.append(f"{alias}.tweet_id IN "
+                          "(SELECT tweet_id FROM SearchKey_Tweet WHERE searchKey = ?)")
+        params.append(searchKey)
+    return " AND ".join(conditions) or "1", params
+
+
+def _table_query(table: str, since=None, until=None, searchKey=None) -> tuple:
+    """Returns SELECT statement and parameters of filtered table"""
+    columns = ", ".join(f"{table}.{name}" for name, _ in _COLUMNS[table])
+    condition, params = _tweet_filter(since, until, searchKey)
+    if table == 'Tweet':
+        return f"SELECT {columns} FROM Tweet WHERE {condition}", params
+    if table == 'SearchKey_Tweet':
+        key_condition = ""
+        if searchKey is not None:
+            key_condition = " AND SearchKey_Tweet.searchKey = ?"
+            params.append(searchKey)
+        return (f"SELECT {columns} FROM SearchKey_Tweet "
+                f"JOIN Tweet USING (tweet_id) WHERE {condition}{key_condition}",
+                params)
+    if table == 'Writer':
+        if since is None and until is None and searchKey is None:
+            return f"SELECT {columns} FROM Writer", params
+        return (f"SELECT {columns} FROM Writer WHERE user_id IN "
+                f"(SELECT writer FROM Tweet WHERE {condition})", params)
+    raise ValueError(f"unknown table: {table}")
+
+
+def iter_chunks(database: TweetDB, table: str, chunk_size=50000, since=None,
+                until=None, searchKey=None):
+    """
+        Generator that reads a table in chunks with its own cursor.
+
+            Args:
+                `database` (TweetDB): database to read from
+                `table` (str): one of `TABLES`
+                `chunk_size` (int): number of rows per chunk
+                `since` (datetime.date): earliest post date of tweets
+                `until` (datetime.date): post date limit (exclusive)
+                `searchKey` (str): only tweets of the search key
+
+            Yields:
+                list of row tuples, at most `chunk_size` rows each
+    """
+    query, params = _table_query(table, since, until, searchKey)
+    cursor = database.conn.cursor()
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def _open_text(path: str, compression: str):
+    """Opens a text file for writing with given compression"""
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression requires zstandard package")
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw),
+                                encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+
+def _export_jsonl(chunks, table: str, path: str, compression: str) -> int:
+    names = [name for name, _ in _COLUMNS[table]]
+    row_count = 0
+    with _open_text(path, compression) as export_file:
+        for rows in chunks:
+            export_file.writelines(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n'
+                for row in rows)
+            row_count += len(rows)
+    return row_count
+
+
+def _export_parquet(chunks, table: str, path: str, compression: str) -> int:
+    if pyarrow is None:
+        raise ImportError("parquet export requires pyarrow package")
+    schema = pyarrow.schema([(name, getattr(pyarrow, arrow_type)())
+                             for name, arrow_type in _COLUMNS[table]])
+    row_count = 0
+    with pyarrow.parquet.ParquetWriter(
+            path, schema,
+            compression=None if compression == 'none' else compression) as writer:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_batch(pyarrow.record_batch(
+                [pyarrow.array(column, type=field.type)
+                 for column, field in zip(columns, schema)],
+                schema=schema))
+            row_count += len(rows)
+    return row_count
+
+
+def export_table(database: TweetDB, table: str, path: str, export_format='parquet',
+                 compression='zstd', chunk_size=50000, since=None, until=None,
+                 searchKey=None) -> int:
+    """
+        Streams a table into a Parquet or JSON lines file. At most
+        `chunk_size` rows are held in memory at once.
+
+            Args:
+                `database` (TweetDB): database to export
+                `table` (str): one of `TABLES`
+                `path` (str): output file path
+                `export_format` (str): one of `EXPORT_FORMATS`
+                `compression` (str): one of `COMPRESSIONS`
+                `chunk_size` (int): number of rows per chunk (row group)
+                `since` (datetime.date): earliest post date of tweets
+                `until` (datetime.date): post date limit (exclusive)
+                `searchKey` (str): only tweets of the search key (writers of
+                    them for Writer table)
+
+            Returns:
+                number of exported rows
+
+            Raises:
+                ValueError if format, compression or table is not supported,
+                    or dates of database are not migrated to UTC
+                ImportError if needed optional package is not installed
+    """
+    if database.get_schema_version() < SCHEMA_VERSION:
+        raise ValueError(f"{database.name} stores local time dates, "
+                         "run TweetDB.create_tables to migrate it first")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {export_format}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"unknown compression: {compression}")
+    if table not in TABLES:
+        raise ValueError(f"unknown table: {table}")
+
+    chunks = iter_chunks(database, table, chunk_size=chunk_size, since=since,
+                         until=until, searchKey=searchKey)
+    if export_format == 'parquet':
+        return _export_parquet(chunks, table, path, compression)
+    return _export_jsonl(chunks, table, path, compression)
+
+
+def export_database(database: TweetDB, directory: str, export_format='parquet',
+                    compression='zstd', chunk_size=50000, since=None, until=None,
+                    searchKey=None) -> dict:
+    """
+        Exports every table in `TABLES` into `directory` as
+        <table>.parquet or <table>.jsonl[.gz|.zst], see `export_table`.
+
+            Returns:
+                dict of <table, number of exported rows>
+    """
+    extension = {'parquet': '.parquet', 'jsonl': '.jsonl'}[export_format]
+    if export_format == 'jsonl':
+        extension += {'gzip': '.gz', 'zstd': '.zst', 'none': ''}[compression]
+
+    os.makedirs(directory, exist_ok=True)
+    return {table: export_table(database, table,
+                                os.path.join(directory, table + extension),
+                                export_format=export_format,
+                                compression=compression, chunk_size=chunk_size,
+                                since=since, until=until, searchKey=searchKey)
+            for table in TABLES}
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--database', type=str, required=True,
+                             help="database name (without .db) to export")
+    argv_parser.add_argument('-o', '--output_dir', type=str, required=True,
+                             help="directory of exported files")
+    argv_parser.add_argument('-f', '--format', type=str, default='parquet',
+                             choices=EXPORT_FORMATS,
+                             help="export file format")
+    argv_parser.add_argument('-c', '--compression', type=str, default='zstd',
+                             choices=COMPRESSIONS,
+                             help="compression of exported files")
+    argv_parser.add_argument('-n', '--chunk_size', type=int, default=50000,
+                             help="number of rows read and written at once")
+    argv_parser.add_argument('-s', '--start_date', type=str, default=None,
+                             help="earliest post date in YYYY-MM-DD format")
+    argv_parser.add_argument('-e', '--end_date', type=str, default=None,
+                             help="post date limit (exclusive) in YYYY-MM-DD format")
+    argv_parser.add_argument('-k', '--searchKey', type=str, default=None,
+                             help="export only tweets of the search key")
+    args = argv_parser.parse_args()
+
+    since = (datetime.datetime.strptime(args.start_date, "%Y-%m-%d").date()
+             if args.start_date else None)
+    until = (datetime.datetime.strptime(args.end_date, "%Y-%m-%d").date()
+             if args.end_date else None)
+
+    database = TweetDB(args.database)
+    try:
+        # migrates post dates of older databases to UTC
+        database.create_tables()
+        counts = export_database(database, args.output_dir,
+                                 export_format=args.format,
+                                 compression=args.compression,
+                                 chunk_size=args.chunk_size, since=since,
+                                 until=until, searchKey=args.searchKey)
+    finally:
+        database.close_DB()
+
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
@@ -0,0 +1,199 @@
+import json
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import NoSuchElementException
+
+from fakeWebDriver import FakeSearchPage, fake_profile
+from pageScripts import (STATUS_XPATH, WRITER_XPATH, TIME_XPATH, REPLY_XPATH,
+                         RETWEET_XPATH, LIKE_XPATH, PROFILE_XPATHS,
+                         WAIT_FOR_NODES_SCRIPT, EXTRACT_TWEETS_SCRIPT,
+                         NEW_TWEET_ELEMENTS_SCRIPT, UNTAG_TWEETS_SCRIPT,
+                         CAPTURE_TWEETS_SCRIPT, EXTRACT_PROFILE_SCRIPT)
+
+
+class FakeElement:
+    """Element of a fake page with a text, attributes and a click action"""
+
+    def __init__(self, text=None, attributes=None, on_click=None):
+        self.text = text
+        self._attributes = attributes or dict()
+        self._on_click = on_click
+
+    def get_attribute(self, name: str):
+        return self._attributes.get(name)
+
+    def click(self) -> None:
+        if self._on_click is not None:
+            self._on_click()
+
+
+class FakeTweetElement:
+    """Tweet element of a FakeSearchPage, answers field XPaths of collector"""
+
+    def __init__(self, tweet: dict, driver: 'FakeDriver'):
+        self.tweet = tweet
+        self._driver = driver
+
+    def find_element_by_xpath(self, xpath: str) -> FakeElement:
+        self._driver._command()
+        tweet = self.tweet
+        if xpath == STATUS_XPATH:
+            return FakeElement(attributes={'href': tweet['status']})
+        if xpath == WRITER_XPATH:
+            return FakeElement(text=tweet['writer'])
+        if xpath == TIME_XPATH:
+            return FakeElement(attributes={'datetime': tweet['datetime']})
+        if xpath.startswith(".//div[@lang="):
+            return FakeElement(text=tweet['body'])
+        fields = {REPLY_XPATH: 'reply', RETWEET_XPATH: 'retweet', LIKE_XPATH: 'like'}
+        if xpath in fields:
+            return FakeElement(text=tweet[fields[xpath]])
+        raise NoSuchElementException(xpath)
+
+
+class FakeDriver:
+    """
+    Pure-Python stand-in of a selenium Chrome driver for browserless runs
+    of Collector (see `Collector.with_driver`). Search pages are
+    FakeSearchPage instances and profile pages are `fake_profile` of the
+    visited user id. Scripts of `pageScripts` are answered, not run (they
+    run in a browser in `tests/test_pageScripts.py`), and every call can be
+    delayed by `latency` to model WebDriver round-trips.
+    """
+
+    def __init__(self, tweet_count=200, page_size=20, scroll_step=10,
+                 latency=0.0):
+        """
+            Args:
+                `tweet_count` (int): number of tweets of each search
+                `page_size` (int): number of tweets visible at once
+                `scroll_step` (int): number of tweets revealed by a scroll
+                `latency` (float): seconds each call takes
+        """
+        self._tweet_count = tweet_count
+        self._page_size = page_size
+        self._scroll_step = scroll_step
+        self._latency = latency
+        self._page = None
+        self._user_id = None
+        self._profile = None
+        self._revealed = False
+        self.command_count = 0
+
+    def _command(self) -> None:
+        self.command_count += 1
+        if self._latency:
+            time.sleep(self._latency)
+
+    def get(self, url: str) -> None:
+        self._command()
+        path = urlsplit(url).path.strip('/')
+        self._page = None
+        self._profile = None
+        if path == 'search':
+            self._page = FakeSearchPage(url, self._tweet_count,
+                                        self._page_size, self._scroll_step)
+        elif path and path != 'login':
+            self._user_id = path
+            self._profile = fake_profile(path)
+            self._revealed = self._profile['status'] != 'restricted'
+
+    def set_script_timeout(self, seconds: float) -> None:
+        pass
+
+    def quit(self) -> None:
+        self._page = None
+        self._profile = None
+
+    def get_log(self, log_type: str) -> list:
+        self._command()
+        return []
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        self._command()
+        return dict()
+
+    def _visible_profile(self) -> dict:
+        """Profile texts as EXTRACT_PROFILE_SCRIPT reads them"""
+        profile = dict(self._profile)
+        if profile['status'] == 'restricted':
+            if self._revealed:
+                profile['status'] = None
+            else:
+                profile = dict.fromkeys(profile, None)
+                profile.update(status='restricted',
+                               username=self._profile['username'])
+        return profile
+
+    def execute_script(self, script: str, *args):
+        self._command()
+        page = self._page
+        if script == EXTRACT_TWEETS_SCRIPT:
+            return json.dumps(page.extract(args[9]) if page else [])
+        if script == NEW_TWEET_ELEMENTS_SCRIPT:
+            return [FakeTweetElement(tweet, self)
+                    for tweet in (page.collect() if page else [])]
+        if script == CAPTURE_TWEETS_SCRIPT:
+            return [page.html(tweet) for tweet in page.collect()] if page else []
+        if script == UNTAG_TWEETS_SCRIPT:
+            if page is not None:
+                page.uncollect(args[0].tweet['status'] if args[0] else None)
+            return None
+        if script == EXTRACT_PROFILE_SCRIPT:
+            if self._profile is None:
+                return json.dumps(dict.fromkeys(fake_profile('deleted')))
+            return json.dumps(self._visible_profile())
+        if "scrollHeight" in script and script.startswith("return"):
+            return page.height() if page else 0
+        if "scrollTo" in script:
+            if page is not None:
+                page.scroll()
+            return None
+        if script == "return 1":
+            return 1
+        return None
+
+    def execute_async_script(self, script: str, *args):
+        self._command()
+        if script == WAIT_FOR_NODES_SCRIPT:
+            scroll = args[1]
+            if self._profile is not None:
+                return 'found'
+            if self._page is None or (scroll and not self._page.scroll()):
+                return 'idle'
+            return 'found'
+        return None
+
+    def _profile_element(self, xpath: str) -> FakeElement:
+        if self._profile is None:
+            raise NoSuchElementException(xpath)
+        names = {template.format(user_id=self._user_id): name
+                 for name, template in PROFILE_XPATHS.items()}
+        name = names.get(xpath)
+        status = self._profile['status']
+        if name == 'not_exist' and status == 'existance':
+            return FakeElement(text="This account doesn’t exist")
+        if name == 'suspended' and status == 'suspended':
+            return FakeElement(text="Account suspended")
+        if name == 'view_profile' and not self._revealed:
+            return FakeElement(text="Yes, view profile",
+                               on_click=lambda: setattr(self, '_revealed', True))
+
+        value = self._visible_profile().get(name)
+        if value is None:
+            raise NoSuchElementException(xpath)
+        if name in ('following', 'follower'):
+            return FakeElement(text=value, attributes={'title': value})
+        return FakeElement(text=value)
+
+    def find_element_by_xpath(self, xpath: str) -> FakeElement:
+        self._command()
+        return self._profile_element(xpath)
+
+    def find_elements_by_xpath(self, xpath: str) -> list:
+        self._command()
+        try:
+            return [self._profile_element(xpath)]
+        except NoSuchElementException:
+            return []
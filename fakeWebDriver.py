@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import datetime
+import html
+import itertools
+import json
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+from pageScripts import (EXTRACT_TWEETS_SCRIPT, SNOWFLAKE_EPOCH,
+                         WAIT_FOR_NODES_SCRIPT)
+
+W3C_ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+def _parse_search_date(text: str) -> datetime.datetime:
+    if text.endswith("_UTC"):
+        return datetime.datetime.strptime(text, "%Y-%m-%d_%H:%M:%S_UTC")
+    return datetime.datetime.strptime(text, "%Y-%m-%d")
+
+
+class FakeSearchPage:
+    """
+    Search result page of a fake session. Tweets are generated from the
+    search query, evenly spread between `since` and `until` operators of it
+    in descending order, and revealed `page_size` at a time by scrolls.
+    """
+
+    def __init__(self, url: str, tweet_count: int, page_size: int,
+                 scroll_step: int):
+        query = parse_qs(urlsplit(url).query).get('q', [''])[0]
+        terms = dict(term.split(':', 1) for term in query.split()
+                     if ':' in term)
+        key = " ".join(term for term in query.split() if ':' not in term)
+        until = _parse_search_date(terms['until']) if 'until' in terms else \
+            datetime.datetime(2020, 1, 2)
+        since = _parse_search_date(terms['since']) if 'since' in terms else \
+            until - datetime.timedelta(days=1)
+        lang = terms.get('lang', 'en')
+
+        until_seconds = int(until.replace(tzinfo=datetime.timezone.utc).timestamp())
+        span = max(int((until - since).total_seconds()), 1)
+        key_hash = zlib.crc32(key.encode())
+        self.tweets = []
+        for i in range(tweet_count if '/search' in url else 0):
+            timestamp = until_seconds - 1 - (span * i) // tweet_count
+            tweet_id = (((timestamp * 1000 - SNOWFLAKE_EPOCH) << 22) +
+                        ((key_hash + i) & 0x3FFFFF))
+            writer = f"user{(key_hash + i) % 997}"
+            self.tweets.append({
+                'status': f"https://twitter.com/{writer}/status/{tweet_id}",
+                'writer': f"@{writer}",
+                'datetime': datetime.datetime.utcfromtimestamp(timestamp)
+                .strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                'body': f"Fake tweet {i} about {key} ({lang})",
+                'reply': str(i % 7),
+                'retweet': str(i % 13),
+                'like': "1.2K" if i % 5 == 0 else str(i % 31),
+            })
+        self.lang = lang
+        self._page_size = page_size
+        self._scroll_step = scroll_step
+        self.position = 0
+        self._collected = set()
+        self._known = set()
+
+    def visible(self) -> list:
+        return self.tweets[self.position:self.position + self._page_size]
+
+    def collect(self) -> list:
+        """Returns visible tweets that are not collected yet and tags them
+        (like EXTRACT_TWEETS_SCRIPT)"""
+        tweets = [tweet for tweet in self.visible()
+                  if tweet['status'] not in self._collected]
+        self._collected.update(tweet['status'] for tweet in tweets)
+        return tweets
+
+    def extract(self, known_ids: list) -> list:
+        """Returns visible tweets that are not collected yet and tags them
+        like EXTRACT_TWEETS_SCRIPT, `known_ids` are added to known ids of the
+        page and known tweets are returned with their status only"""
+        self._known.update(known_ids)
+        return [{'status': tweet['status']}
+                if tweet['status'].rsplit('/', 1)[1] in self._known else tweet
+                for tweet in self.collect()]
+
+    def scroll(self) -> bool:
+        """Scrolls down, returns true if new tweets are revealed"""
+        position = min(self.position + self._scroll_step,
+                       max(len(self.tweets) - self._page_size, 0))
+        moved = position != self.position
+        self.position = position
+        return moved
+
+    def height(self) -> int:
+        return 1000 + self.position * 100
+
+    def uncollect(self, status: str = None) -> None:
+        """Marks a tweet (or every tweet if None) as not collected"""
+        if status is None:
+            self._collected.clear()
+        else:
+            self._collected.discard(status)
+
+    def html(self, tweet: dict) -> str:
+        """Returns markup of a tweet as rendered by twitter (the XPaths of
+        `pageScripts` match it)"""
+        path = urlsplit(tweet['status']).path
+        text = {name: html.escape(value) for name, value in tweet.items()}
+        return (f'<div data-testid="tweet"><a href="{path}"><time datetime="'
+                f'{text["datetime"]}">date</time></a><div dir="ltr"><span>'
+                f'{text["writer"]}</span></div><div lang="{self.lang}" dir="auto">'
+                f'{text["body"]}</div><div data-testid="reply">{text["reply"]}</div>'
+                f'<div data-testid="retweet">{text["retweet"]}</div>'
+                f'<div data-testid="like">{text["like"]}</div></div>')
+
+
+# Prefixes of user ids whose fake profiles are unreachable, with the status
+# collectors should report for them (restricted profiles are readable after
+# confirming the warning)
+UNREACHABLE_PREFIXES = {'suspended': 'suspended', 'deleted': 'existance',
+                        'restricted': 'restricted'}
+
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December")
+
+
+def fake_profile(user_id: str) -> dict:
+    """
+        Returns profile texts of a fake writer in the shape of
+        EXTRACT_PROFILE_SCRIPT result (of a profile behind no warning).
+        Fields are derived from the user id, `status` is set for user ids
+        starting with a key of UNREACHABLE_PREFIXES.
+    """
+    status = next((status for prefix, status in UNREACHABLE_PREFIXES.items()
+                   if user_id.startswith(prefix)), None)
+    profile = dict.fromkeys(('status', 'username', 'following', 'follower',
+                             'tweet_count', 'bio', 'header', 'website',
+                             'born', 'joined', 'location'))
+    profile['status'] = status
+    if status in ('suspended', 'existance'):
+        return profile
+
+    seed = zlib.crc32(user_id.encode())
+    profile['username'] = f"User {user_id}"
+    profile['following'] = f"{seed % 5000:,}"
+    profile['follower'] = f"{seed % 2000000:,}"
+    profile['tweet_count'] = f"{(seed % 900) / 10:.1f}K Tweets"
+    profile['bio'] = f"Bio of {user_id}\nabout markets"
+    profile['location'] = f"City {seed % 100}"
+    profile['website'] = f"{user_id}.example" if seed % 3 else None
+    profile['born'] = (f"Born {_MONTHS[seed % 12]} {seed % 28 + 1}, {1950 + seed % 50}"
+                       if seed % 4 == 0 else None)
+    profile['joined'] = f"Joined {_MONTHS[(seed >> 4) % 12]} {2007 + seed % 14}"
+    profile['header'] = "\n".join(item for item in (
+        profile['location'], profile['website'], profile['born'],
+        profile['joined']) if item)
+    return profile
+
+
+class FakeWebDriverServer:
+    """
+    In-process fake of a W3C WebDriver (chromedriver) HTTP endpoint for
+    testing collectors without a browser. Scripts of `pageScripts` are not
+    run (see `tests/test_pageScripts.py` for a browser run of them) but
+    answered from a FakeSearchPage, so a collector sees a search
+    that ends after `tweet_count` tweets. Connections are kept alive like
+    chromedriver does.
+    """
+
+    def __init__(self, tweet_count=200, page_size=20, scroll_step=10,
+                 latency=0.0):
+        """
+            Args:
+                `tweet_count` (int): number of tweets of each search
+                `page_size` (int): number of tweets visible at once
+                `scroll_step` (int): number of tweets revealed by a scroll
+                `latency` (float): seconds each command takes, to simulate
+                    browser work
+        """
+        self._tweet_count = tweet_count
+        self._page_size = page_size
+        self._scroll_step = scroll_step
+        self._latency = latency
+        self._sessions = dict()
+        self._session_ids = itertools.count(1)
+        self._server = None
+        self.command_count = 0
+        self.connection_count = 0
+
+    async def start(self, host='127.0.0.1', port=0) -> str:
+        """Starts listening, returns base url of the server"""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        self.connection_count += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode().split(' ', 2)
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode().split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                payload = json.loads(await reader.readexactly(length)) if length else {}
+
+                status, value = await self._handle(method, path, payload)
+                body = json.dumps({'value': value}).encode()
+                writer.write(f"HTTP/1.1 {status} OK\r\n"
+                             "Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             "Connection: keep-alive\r\n\r\n".encode() + body)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+    async def _handle(self, method: str, path: str, payload: dict) -> tuple:
+        """Returns HTTP status and `value` of a command"""
+        self.command_count += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+
+        parts = path.strip('/').split('/')
+        if parts == ['status']:
+            return 200, {'ready': True, 'message': "fake webdriver ready"}
+        if parts == ['session'] and method == 'POST':
+            session_id = f"fake{next(self._session_ids)}"
+            self._sessions[session_id] = None
+            return 200, {'sessionId': session_id, 'capabilities': {}}
+        if len(parts) < 2 or parts[0] != 'session' or parts[1] not in self._sessions:
+            return 404, {'error': "invalid session id", 'message': path}
+
+        session_id, command = parts[1], parts[2:]
+        page = self._sessions[session_id]
+        if not command and method == 'DELETE':
+            del self._sessions[session_id]
+            return 200, None
+        if command == ['url'] and method == 'POST':
+            self._sessions[session_id] = FakeSearchPage(
+                payload['url'], self._tweet_count, self._page_size,
+                self._scroll_step)
+            return 200, None
+        if command in (['timeouts'], ['goog', 'cdp', 'execute']):
+            return 200, None
+        if command == ['execute', 'sync']:
+            return 200, self._execute(page, payload['script'], payload['args'])
+        if command == ['execute', 'async']:
+            if payload['script'] == WAIT_FOR_NODES_SCRIPT:
+                scroll = payload['args'][1]
+                if page is None or (scroll and not page.scroll()):
+                    return 200, 'idle'
+                return 200, 'found'
+            return 200, None
+        if command == ['element']:
+            return 200, {W3C_ELEMENT_KEY: "fake-element"}
+        if len(command) == 3 and command[0] == 'element':
+            return 200, None
+        return 404, {'error': "unknown command", 'message': path}
+
+    @staticmethod
+    def _execute(page: FakeSearchPage, script: str, args: list):
+        if script == EXTRACT_TWEETS_SCRIPT:
+            return json.dumps(page.extract(args[9]) if page else [])
+        if "scrollHeight" in script and script.startswith("return"):
+            return page.height() if page else 0
+        if "scrollTo" in script:
+            if page is not None:
+                page.scroll()
+            return None
+        if script == "return 1":
+            return 1
+        return None
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-p', '--port', type=int, default=9515,
+                             help="port of fake webdriver")
+    argv_parser.add_argument('-n', '--tweet_count', type=int, default=200,
+                             help="number of tweets of each search")
+    argv_parser.add_argument('-l', '--latency', type=float, default=0.0,
+                             help="seconds each command takes")
+    args = argv_parser.parse_args()
+
+    async def serve():
+        server = FakeWebDriverServer(tweet_count=args.tweet_count,
+                                     latency=args.latency)
+        print(f"Fake webdriver is listening on {await server.start(port=args.port)}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
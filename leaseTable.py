@@ -0,0 +1,481 @@
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from metrics import LEASE_EVENTS, log
+from tweetDB import TweetDB
+
+# Search window of a key group that nodes claim from a lease table
+#   searchKey: name of the key group (see `searchKeys.KeyGroup.name`)
+#   since    : start of the window (datetime.date or datetime.datetime)
+#   until    : end of the window, exclusive
+WorkItem = namedtuple('WorkItem', ['searchKey', 'since', 'until'])
+
+# Status of work items
+#   pending: waiting to be claimed
+#   leased : claimed by a node until its lease expires (claimable again after)
+#   done   : collected by a node (completion marker)
+#   failed : not collected after `max_attempts` claims
+ITEM_STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+def _bound(value: str):
+    """Converts stored window bound to datetime.date or datetime.datetime"""
+    if len(value) > 10:
+        return datetime.datetime.fromisoformat(value)
+    return datetime.date.fromisoformat(value)
+
+
+def shard_name(database_name: str, node: str) -> str:
+    """Returns name of the TweetDB shard that a node writes into"""
+    return f"{database_name}_{re.sub(r'[^0-9A-Za-z_.-]+', '_', node)}"
+
+
+class LeaseTable:
+    """
+    Shared table of work items that collector processes (nodes) claim with
+    expiring leases. A node keeps its leases alive with heartbeats (see
+    LeaseKeeper), so items of a lost node are claimed by others after
+    `lease_seconds`. Lease times are wall clock times, clocks of hosts are
+    expected to be synchronized well within `lease_seconds`.
+
+    This class keeps items in memory and is the stand-in of a single
+    process (e.g. tests and benchmarks), SQLiteLeaseTable shares them
+    between hosts. Other backends implement the same methods.
+    """
+
+    def __init__(self, lease_seconds=120.0, max_attempts=3):
+        """
+            Args:
+                `lease_seconds` (float): seconds a claim or heartbeat keeps
+                    an item leased
+                `max_attempts` (int): number of claims after which an item
+                    that is not done is marked as failed
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._items = dict()
+        self._nodes = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(item: WorkItem) -> tuple:
+        return (item.searchKey, str(item.since), str(item.until))
+
+    def add(self, items) -> int:
+        """
+            Adds work items of search keys that have no items yet, so nodes
+            that plan the same run add its windows only once.
+
+                Args:
+                    `items` (iterable): WorkItem instances in claim order
+
+                Returns:
+                    number of added items
+        """
+        with self._lock:
+            planned = {key[0] for key in self._items}
+            added = 0
+            for item in items:
+                key = self._key(item)
+                if item.searchKey not in planned and key not in self._items:
+                    self._items[key] = {'status': 'pending', 'node': None,
+                                        'expires': None, 'attempts': 0}
+                    added += 1
+            return added
+
+    def claim(self, node: str, limit=1, searchKeys=None) -> list:
+        """
+            Leases pending items and items whose lease is expired to a node.
+            Expired items that used up their attempts are marked as failed.
+
+                Args:
+                    `node` (str): name of the claiming node
+                    `limit` (int): maximum number of claimed items
+                    `searchKeys` (iterable): only claim items of these keys
+                        (all if None)
+
+                Returns:
+                    list of claimed WorkItem
+        """
+        now = time.time()
+        claimed = []
+        with self._lock:
+            self._nodes[node] = now
+            for key, state in self._items.items():
+                if len(claimed) >= limit:
+                    break
+                if searchKeys is not None and key[0] not in searchKeys:
+                    continue
+                if state['status'] == 'leased' and state['expires'] < now:
+                    if state['attempts'] >= self.max_attempts:
+                        state['status'] = 'failed'
+                        continue
+                elif state['status'] != 'pending':
+                    continue
+                state.update(status='leased', node=node,
+                             expires=now + self.lease_seconds,
+                             attempts=state['attempts'] + 1)
+                claimed.append(WorkItem(key[0], _bound(key[1]), _bound(key[2])))
+        LEASE_EVENTS.inc(len(claimed), event='claimed')
+        return claimed
+
+    def heartbeat(self, node: str, items) -> list:
+        """
+            Extends leases of items held by a node.
+
+                Returns:
+                    list of items whose lease is lost (expired and claimed by
+                    another node, or no longer leased)
+        """
+        now = time.time()
+        lost = []
+        with self._lock:
+            self._nodes[node] = now
+            for item in items:
+                state = self._items.get(self._key(item))
+                if (state is None or state['status'] != 'leased' or
+                        state['node'] != node):
+                    lost.append(item)
+                else:
+                    state['expires'] = now + self.lease_seconds
+        return lost
+
+    def complete(self, node: str, item: WorkItem) -> bool:
+        """
+            Marks an item as done, even if its lease has passed to another
+            node (collected tweets of both nodes are merged without
+            duplicates, see `merge_shards`).
+
+                Returns:
+                    false if the node did not hold the lease
+        """
+        with self._lock:
+            state = self._items[self._key(item)]
+            held = state['status'] == 'leased' and state['node'] == node
+            if state['status'] != 'done':
+                state.update(status='done', node=node, expires=None)
+        LEASE_EVENTS.inc(event='completed' if held else 'completed_lost')
+        return held
+
+    def release(self, node: str, item: WorkItem, failed=False) -> None:
+        """
+            Gives back an item leased by a node (e.g. cancelled or failed
+            collection) to be claimed again. An item that failed on its last
+            attempt is marked as failed.
+        """
+        with self._lock:
+            state = self._items[self._key(item)]
+            if state['status'] != 'leased' or state['node'] != node:
+                return
+            if failed and state['attempts'] >= self.max_attempts:
+                state.update(status='failed', expires=None)
+            else:
+                state.update(status='pending', node=None, expires=None)
+        LEASE_EVENTS.inc(event='failed' if failed else 'released')
+
+    def counts(self) -> dict:
+        """Returns number of items per status, expired leases as `'expired'`"""
+        now = time.time()
+        counts = dict.fromkeys(ITEM_STATUSES + ('expired',), 0)
+        with self._lock:
+            for state in self._items.values():
+                expired = state['status'] == 'leased' and state['expires'] < now
+                counts['expired' if expired else state['status']] += 1
+        return counts
+
+    def nodes(self) -> dict:
+        """Returns <node, time of its last claim or heartbeat> of every node
+        that worked on the table"""
+        with self._lock:
+            return dict(self._nodes)
+
+    def finished(self) -> bool:
+        """Returns true if every item is done or failed"""
+        counts = self.counts()
+        return not (counts['pending'] or counts['leased'] or counts['expired'])
+
+
+class SQLiteLeaseTable(LeaseTable):
+    """
+    LeaseTable in a SQLite file that nodes on different hosts open from
+    shared storage. Every call uses its own connection and claims run in
+    an immediate transaction, so the file lock serializes nodes. Rollback
+    journal is used since WAL needs shared memory of a single host.
+    """
+
+    def __init__(self, path: str, lease_seconds=120.0, max_attempts=3,
+                 busy_timeout=30.0):
+        """
+            Args:
+                `path` (str): path of the table file
+                `lease_seconds` (float): see LeaseTable
+                `max_attempts` (int): see LeaseTable
+                `busy_timeout` (float): seconds to wait for the file lock
+        """
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.path = path
+        self._busy_timeout = busy_timeout
+        with self._connect() as conn:
+            conn.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS WorkItem (
+                        searchKey       TEXT        NOT NULL,
+                        since           TEXT        NOT NULL,
+                        until           TEXT        NOT NULL,
+                        status          TEXT        NOT NULL,
+                        node            TEXT,
+                        expires         REAL,
+                        attempts        INTEGER     NOT NULL,
+                        PRIMARY KEY (searchKey, since, until)
+                    )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS IX_status ON WorkItem (status, expires);")
+            conn.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS LeaseNode (
+                        node            TEXT        PRIMARY KEY,
+                        last_seen       REAL        NOT NULL
+                    )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self._busy_timeout,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+    def _transaction(self, work):
+        """Runs `work` with a connection in an immediate transaction"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _seen(conn, node: str, now: float) -> None:
+        conn.execute("INSERT INTO LeaseNode VALUES (?, ?) ON CONFLICT (node) "
+                     "DO UPDATE SET last_seen = excluded.last_seen", (node, now))
+
+    def add(self, items) -> int:
+        items = list(items)
+
+        def work(conn):
+            planned = {row[0] for row in conn.execute(
+                "SELECT DISTINCT searchKey FROM WorkItem")}
+            rows = [self._key(item) for item in items
+                    if item.searchKey not in planned]
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO WorkItem VALUES (?, ?, ?, 'pending', NULL, NULL, 0)",
+                rows)
+            return conn.total_changes - before
+
+        return self._transaction(work)
+
+    def claim(self, node: str, limit=1, searchKeys=None) -> list:
+        now = time.time()
+        searchKeys = None if searchKeys is None else set(searchKeys)
+
+        def work(conn):
+            self._seen(conn, node, now)
+            conn.execute("UPDATE WorkItem SET status = 'failed' WHERE status = 'leased' "
+                         "AND expires < ? AND attempts >= ?", (now, self.max_attempts))
+            rows = conn.execute(
+                "SELECT searchKey, since, until FROM WorkItem WHERE status = 'pending' "
+                "OR (status = 'leased' AND expires < ?) ORDER BY rowid", (now,))
+            keys = []
+            for row in rows:
+                if searchKeys is None or row[0] in searchKeys:
+                    keys.append(row)
+                    if len(keys) >= limit:
+                        break
+            conn.executemany(
+                "UPDATE WorkItem SET status = 'leased', node = ?, expires = ?, "
+                "attempts = attempts + 1 WHERE searchKey = ? AND since = ? AND until = ?",
+                [(node, now + self.lease_seconds) + key for key in keys])
+            return keys
+
+        claimed = [WorkItem(key[0], _bound(key[1]), _bound(key[2]))
+                   for key in self._transaction(work)]
+        LEASE_EVENTS.inc(len(claimed), event='claimed')
+        return claimed
+
+    def heartbeat(self, node: str, items) -> list:
+        now = time.time()
+        items = list(items)
+
+        def work(conn):
+            self._seen(conn, node, now)
+            lost = []
+            for item in items:
+                cursor = conn.execute(
+                    "UPDATE WorkItem SET expires = ? WHERE searchKey = ? AND since = ? "
+                    "AND until = ? AND status = 'leased' AND node = ?",
+                    (now + self.lease_seconds,) + self._key(item) + (node,))
+                if cursor.rowcount == 0:
+                    lost.append(item)
+            return lost
+
+        return self._transaction(work)
+
+    def complete(self, node: str, item: WorkItem) -> bool:
+        def work(conn):
+            row = conn.execute(
+                "SELECT status, node FROM WorkItem WHERE searchKey = ? AND since = ? "
+                "AND until = ?", self._key(item)).fetchone()
+            conn.execute(
+                "UPDATE WorkItem SET status = 'done', node = ?, expires = NULL "
+                "WHERE searchKey = ? AND since = ? AND until = ? AND status != 'done'",
+                (node,) + self._key(item))
+            return row is not None and row[0] == 'leased' and row[1] == node
+
+        held = self._transaction(work)
+        LEASE_EVENTS.inc(event='completed' if held else 'completed_lost')
+        return held
+
+    def release(self, node: str, item: WorkItem, failed=False) -> None:
+        def work(conn):
+            conn.execute(
+                "UPDATE WorkItem SET "
+                "status = CASE WHEN ? AND attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "node = CASE WHEN ? AND attempts >= ? THEN node ELSE NULL END, "
+                "expires = NULL WHERE searchKey = ? AND since = ? AND until = ? "
+                "AND status = 'leased' AND node = ?",
+                (int(failed), self.max_attempts) * 2 + self._key(item) + (node,))
+
+        self._transaction(work)
+        LEASE_EVENTS.inc(event='failed' if failed else 'released')
+
+    def counts(self) -> dict:
+        now = time.time()
+        counts = dict.fromkeys(ITEM_STATUSES + ('expired',), 0)
+        conn = self._connect()
+        try:
+            for status, count in conn.execute(
+                    "SELECT CASE WHEN status = 'leased' AND expires < ? THEN 'expired' "
+                    "ELSE status END, count(*) FROM WorkItem GROUP BY 1", (now,)):
+                counts[status] = count
+        finally:
+            conn.close()
+        return counts
+
+    def nodes(self) -> dict:
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT node, last_seen FROM LeaseNode ORDER BY node"))
+        finally:
+            conn.close()
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    Thread that sends heartbeats of the leases a node holds every third of
+    lease time. Leases that are lost (e.g. after a long pause of the node)
+    are logged and dropped, their windows are collected by another node.
+    """
+
+    def __init__(self, table: LeaseTable, node: str):
+        """
+            Args:
+                `table` (LeaseTable): lease table of the run
+                `node` (str): name of this node
+        """
+        super().__init__(daemon=True)
+        self._table = table
+        self._node = node
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def hold(self, items) -> None:
+        """Starts sending heartbeats of claimed items"""
+        with self._lock:
+            self._held.update(items)
+
+    def drop(self, item: WorkItem) -> None:
+        """Stops sending heartbeats of a completed or released item"""
+        with self._lock:
+            self._held.discard(item)
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def run(self):
+        while not self._stop_event.wait(self._table.lease_seconds / 3):
+            with self._lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                lost = self._table.heartbeat(self._node, held)
+            except sqlite3.Error as e:
+                log('lease_error', f"Heartbeat failed: {e}", error=str(e))
+                continue
+            for item in lost:
+                log('lease_lost',
+                    f"Lease of {item.searchKey}: {item.since} - {item.until} is lost",
+                    group=item.searchKey, since=item.since, until=item.until)
+                LEASE_EVENTS.inc(event='lost')
+                self.drop(item)
+
+
+def merge_shards(database_name: str, nodes) -> int:
+    """
+        Merges TweetDB shards of nodes (see `shard_name`) into a database.
+        Tweets collected by more than one node are inserted once.
+
+            Returns:
+                number of inserted tweets
+    """
+    database = TweetDB(database_name)
+    database.create_tables()
+    inserted = 0
+    try:
+        for node in nodes:
+            shard = shard_name(database_name, node)
+            if not os.path.exists(shard + '.db'):
+                continue
+            count = database.merge_database(shard)
+            log('merge', f"{shard}: {count} tweets", shard=shard, tweets=count)
+            inserted += count
+    finally:
+        database.close_DB()
+    return inserted
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-t', '--lease_table', type=str, required=True,
+                             help="path of SQLite lease table")
+    argv_parser.add_argument('-m', '--merge', type=str, default=None,
+                             help="database name (without .db) of the run to merge "
+                                  "shards of its nodes into")
+    args = argv_parser.parse_args()
+
+    lease_table = SQLiteLeaseTable(args.lease_table)
+    print("Work items:", ", ".join(f"{status}: {count}" for status, count
+                                   in lease_table.counts().items()))
+    for node, last_seen in lease_table.nodes().items():
+        print(f"  {node}: last seen {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_seen))}")
+    if args.merge:
+        print(f"Merged {merge_shards(args.merge, lease_table.nodes())} tweets "
+              f"into {args.merge}.db")
@@ -0,0 +1,419 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds of histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0)
+
+LOG_FORMATS = ('text', 'json', 'none')
+
+
+class _Metric:
+    """Base of metrics, values are kept per label values tuple"""
+
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = dict()
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} needs labels {self.labels}, "
+                             f"got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> list:
+        """Returns list of (label dict, value) of the metric"""
+        with self._lock:
+            return [(dict(zip(self.labels, key)), value)
+                    for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (e.g. collected tweets)"""
+
+    kind = 'counter'
+
+    def inc(self, value=1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. windows in flight)"""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, value=1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value=1, **labels) -> None:
+        self.inc(-value, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. latencies) in buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels=(),
+                 buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0,
+                    'count': 0}
+            state['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def time(self, **labels) -> '_Timer':
+        """Context manager that observes seconds spent in it"""
+        return _Timer(self, labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            return [(dict(zip(self.labels, key)),
+                     {'counts': list(state['counts']), 'sum': state['sum'],
+                      'count': state['count']})
+                    for key, state in self._values.items()]
+
+
+class _Timer:
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self._histogram = histogram
+        self._labels = labels
+        self._t0 = None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._t0, **self._labels)
+        return False
+
+
+def _format_labels(labels: dict, extra=None) -> str:
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in items) + "}"
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Named metrics of a process, renders them as Prometheus text or JSON"""
+
+    def __init__(self):
+        self._metrics = dict()
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, help_text: str, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels,
+                                                   **kwargs)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"metric {name} is already registered "
+                                 f"as {metric.kind} {metric.labels}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labels=()) -> Counter:
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels=()) -> Gauge:
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels=(),
+                  buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labels,
+                              buckets=buckets)
+
+    def metrics(self) -> list:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda m: m.name)
+
+    def prometheus_text(self) -> str:
+        """Returns metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in metric.samples():
+                if metric.kind != 'histogram':
+                    lines.append(f"{metric.name}{_format_labels(labels)} "
+                                 f"{_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,),
+                                        value['counts']):
+                    cumulative += count
+                    lines.append(f"{metric.name}_bucket"
+                                 f"{_format_labels(labels, ('le', _format_value(bound)))} "
+                                 f"{cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} "
+                             f"{_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} "
+                             f"{value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+            Returns current values as a JSON-serializable dict of
+            <metric name, {type, help, samples}>. Samples of histograms have
+            count, sum, mean and bucket counts.
+        """
+        result = dict()
+        for metric in self.metrics():
+            samples = []
+            for labels, value in metric.samples():
+                if metric.kind == 'histogram':
+                    value = {
+                        'count': value['count'], 'sum': value['sum'],
+                        'mean': value['sum'] / value['count'] if value['count'] else None,
+                        'buckets': {_format_value(bound): count for bound, count in
+                                    zip(metric.buckets + (math.inf,), value['counts'])}}
+                samples.append({'labels': labels, 'value': value})
+            result[metric.name] = {'type': metric.kind, 'help': metric.help,
+                                   'samples': samples}
+        return result
+
+
+# Registry of the process that collectors, database and schedulers report to
+REGISTRY = Registry()
+
+TWEETS_COLLECTED = REGISTRY.counter(
+    'collector_tweets_total', "Tweets passed out by collectors", ('worker',))
+TWEETS_CAPTURED = REGISTRY.counter(
+    'collector_captured_tweets_total', "Tweet html archived by capturing collectors",
+    ('worker',))
+DUPLICATES_SKIPPED = REGISTRY.counter(
+    'collector_duplicates_skipped_total',
+    "Tweets skipped since another collector already collected them", ('worker',))
+TWEET_RATE = REGISTRY.gauge(
+    'collector_tweets_per_second',
+    "Tweet rate of last search of a collector", ('worker',))
+PAGE_LOAD_SECONDS = REGISTRY.histogram(
+    'collector_page_load_seconds', "Search page load latency until tweets are rendered")
+SCROLL_EXTRACT_SECONDS = REGISTRY.histogram(
+    'collector_scroll_extract_seconds', "Tweet extraction time per scroll",
+    ('extraction',))
+BROWSER_RESTARTS = REGISTRY.counter(
+    'collector_browser_restarts_total', "Browser sessions restarted", ('reason',))
+DB_COMMIT_SECONDS = REGISTRY.histogram(
+    'db_commit_seconds', "Database write transaction latency", ('table',))
+DB_ROWS = REGISTRY.counter(
+    'db_rows_total', "Rows written to database", ('table', 'result'))
+WINDOWS = REGISTRY.counter(
+    'scheduler_windows_total', "Finished search windows", ('status',))
+WINDOW_RETRIES = REGISTRY.counter(
+    'scheduler_window_retries_total', "Failed window attempts that are re-run")
+WINDOW_SECONDS = REGISTRY.histogram(
+    'scheduler_window_seconds', "Worker time of finished windows",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600))
+WINDOWS_IN_FLIGHT = REGISTRY.gauge(
+    'scheduler_windows_in_flight', "Windows that are being collected")
+LEASE_EVENTS = REGISTRY.counter(
+    'lease_events_total', "Work item lease events of this node (see `leaseTable`)",
+    ('event',))
+
+
+_log_format = 'text'
+_log_lock = threading.Lock()
+
+
+def set_log_format(log_format: str) -> None:
+    """Switches `log` output between plain `'text'` and `'json'` lines, or
+    turns it off with `'none'`"""
+    global _log_format
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"unknown log format: {log_format}")
+    _log_format = log_format
+
+
+def log(event: str, message: str, **fields) -> None:
+    """
+        Prints a log line. In `'text'` format only `message` is printed, in
+        `'json'` format a JSON object of time, event, message and `fields`.
+
+            Args:
+                `event` (str): machine readable name of the event
+                    (e.g. 'scroll')
+                `message` (str): human readable text
+                `fields`: values of the event
+    """
+    if _log_format == 'text':
+        print(message)
+        return
+    if _log_format == 'none':
+        return
+    line = json.dumps(dict({'time': round(time.time(), 3), 'event': event,
+                            'message': message}, **fields), default=str)
+    with _log_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as metrics_file:
+        metrics_file.write(text)
+    os.replace(temp_path, path)
+
+
+class MetricsExporter:
+    """
+    Writes metrics of a registry to a Prometheus text file (`<path>.prom`)
+    and a JSON snapshot (`<path>.json`) every `interval` seconds and
+    optionally serves them over HTTP (`/metrics` and `/metrics.json`).
+    """
+
+    def __init__(self, path=None, interval=10.0, port=None, registry=REGISTRY):
+        """
+            Args:
+                `path` (str): path of metrics files without extension (None
+                    to not write files)
+                `interval` (float): seconds between file refreshes
+                `port` (int): port of HTTP endpoint on localhost (None to not
+                    serve, 0 for a free port)
+                `registry` (Registry): metrics to export
+        """
+        self._path = path
+        self._interval = interval
+        self._port = port
+        self._registry = registry
+        self._stopped = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def write(self) -> None:
+        """Writes metrics files now"""
+        if self._path is None:
+            return
+        _write_atomic(self._path + ".prom", self._registry.prometheus_text())
+        _write_atomic(self._path + ".json",
+                      json.dumps({'time': time.time(),
+                                  'metrics': self._registry.snapshot()}))
+
+    def _refresh(self) -> None:
+        while not self._stopped.wait(self._interval):
+            try:
+                self.write()
+            except OSError as e:
+                log('metrics_error', f"Failed to write metrics: {e}",
+                    error=str(e))
+
+    def _handler_class(self):
+        registry = self._registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry.prometheus_text().encode()
+                    content_type = 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(registry.snapshot()).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type + '; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Starts refreshing files and the HTTP endpoint, returns url of the
+        endpoint (None if not served)"""
+        url = None
+        if self._port is not None:
+            self._server = ThreadingHTTPServer(('127.0.0.1', self._port),
+                                               self._handler_class())
+            threading.Thread(target=self._server.serve_forever,
+                             daemon=True).start()
+            url = "http://127.0.0.1:{}/metrics".format(self._server.server_address[1])
+        if self._path is not None:
+            self._thread = threading.Thread(target=self._refresh, daemon=True)
+            self._thread.start()
+        return url
+
+    def close(self) -> None:
+        """Stops exporting, metrics files are written a last time"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.write()
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--input', type=str, required=True,
+                             help="JSON metrics snapshot written by a run")
+    args = argv_parser.parse_args()
+
+    with open(args.input, 'r') as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    print(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot['time'])))
+    for name, metric in sorted(snapshot['metrics'].items()):
+        for sample in metric['samples']:
+            labels = ",".join(f"{key}={value}" for key, value in sample['labels'].items())
+            value = sample['value']
+            if metric['type'] == 'histogram':
+                mean = value['mean'] if value['mean'] is not None else 0.0
+                value = f"count={value['count']} mean={mean:.4f}"
+            print(f"{name}{{{labels}}} {value}")
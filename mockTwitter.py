@@ -0,0 +1,240 @@
+import argparse
+import html
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from fakeWebDriver import FakeSearchPage, fake_profile
+
+# Search page with infinite scroll. Tweets are requested from the server,
+# `page_size` on load and `scroll_step` more on each scroll to the bottom,
+# with a progressbar while loading. Only last `max_rendered` tweets are kept
+# in the page (0 keeps every tweet) like the virtualized timeline of twitter.
+SEARCH_PAGE = """<html><head><style>article {{ display: block; height: 120px; }}</style></head>
+<body><main role="main"><div id="timeline"></div></main>
+<script>
+var query = {query}, lang = {lang}, pageSize = {page_size}, step = {scroll_step},
+    delay = {delay}, maxRendered = {max_rendered};
+var offset = 0, loading = false, done = false;
+var timeline = document.getElementById("timeline");
+function render(tweet) {{
+    var article = document.createElement("article");
+    var path = tweet.status.replace(/^https?:\\/\\/[^\\/]+/, "");
+    article.innerHTML =
+        '<div data-testid="tweet">' +
+        '<a href="' + path + '"><time datetime="' + tweet.datetime + '">date</time></a>' +
+        '<div dir="ltr"><span></span></div>' +
+        '<div lang="' + lang + '" dir="auto"></div>' +
+        '<div data-testid="reply">' + tweet.reply + '</div>' +
+        '<div data-testid="retweet">' + tweet.retweet + '</div>' +
+        '<div data-testid="like">' + tweet.like + '</div></div>';
+    article.querySelector('div[dir="ltr"] span').textContent = tweet.writer;
+    article.querySelector('div[dir="auto"]').textContent = tweet.body;
+    timeline.appendChild(article);
+    while (maxRendered && timeline.children.length > maxRendered) {{
+        timeline.removeChild(timeline.firstChild);
+    }}
+}}
+function load(count) {{
+    if (loading || done) return;
+    loading = true;
+    var progress = document.createElement("div");
+    progress.setAttribute("role", "progressbar");
+    document.body.appendChild(progress);
+    setTimeout(function () {{
+        fetch("/mock/timeline?q=" + encodeURIComponent(query) + "&offset=" + offset +
+              "&count=" + count)
+            .then(function (response) {{ return response.json(); }})
+            .then(function (tweets) {{
+                if (!tweets.length) {{
+                    done = true;
+                    if (!offset) {{
+                        timeline.innerHTML = '<div data-testid="emptyState">No results</div>';
+                    }}
+                }}
+                offset += tweets.length;
+                tweets.forEach(render);
+            }})
+            .finally(function () {{ progress.remove(); loading = false; }});
+    }}, delay);
+}}
+window.addEventListener("scroll", function () {{
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 10) load(step);
+}});
+load(pageSize);
+</script></body></html>
+"""
+
+PROFILE_PAGE = """<html><body><main role="main">{content}</main>
+<script>
+function viewProfile() {{
+    var template = document.getElementById("profile");
+    document.querySelector("main").appendChild(template.content.cloneNode(true));
+    document.getElementById("warning").remove();
+}}
+</script></body></html>
+"""
+
+
+def _profile_html(profile: dict, user_id: str) -> str:
+    """Returns profile content in the markup PROFILE_XPATHS expect"""
+    text = {name: html.escape(value) if value else value
+            for name, value in profile.items()}
+    items = [f"<span><span>{text['location']}</span></span>"]
+    if text['website']:
+        items.append(f'<a target="_blank" href="https://t.co/x" rel="noopener">{text["website"]}</a>')
+    if text['born']:
+        items.append(f"<span>{text['born']}</span>")
+    items.append(f"<span>{text['joined']}</span>")
+    bio = "".join(f"<span>{line}</span>" for line in text['bio'].split("\n"))
+    return (f"<div><div dir=\"auto\">{text['tweet_count']}</div></div>"
+            f"<div data-testid=\"UserDescription\">{bio}</div>"
+            f"<div data-testid=\"UserProfileHeader_Items\">{''.join(items)}</div>"
+            f"<div><a href=\"/{user_id}/following\" title=\"{text['following']}\">"
+            f"<span>{text['following']}</span> <span>Following</span></a>"
+            f"<a href=\"/{user_id}/followers\" title=\"{text['follower']}\">"
+            f"<span>{text['follower']}</span> <span>Followers</span></a></div>")
+
+
+def profile_page(user_id: str) -> str:
+    """Returns html of the profile page of a fake writer (see `fake_profile`)"""
+    profile = fake_profile(user_id)
+    if profile['status'] == 'suspended':
+        content = ('<div data-testid="emptyState"><div><span>Account suspended'
+                   '</span></div></div>')
+    elif profile['status'] == 'existance':
+        content = ('<div data-testid="emptyState"><div><span>This account '
+                   'doesn’t exist</span></div></div>')
+    else:
+        heading = (f'<h2 aria-level="2" role="heading" dir="ltr"><div><span>'
+                   f'{html.escape(profile["username"])}</span></div></h2>')
+        if profile['status'] == 'restricted':
+            content = (heading +
+                       '<div id="warning" data-testid="emptyState"><span>Caution: '
+                       'This profile may include potentially sensitive content'
+                       '</span><div role="button" onclick="viewProfile()"><span>'
+                       'Yes, view profile</span></div></div>'
+                       f'<template id="profile">{_profile_html(profile, user_id)}</template>')
+        else:
+            content = heading + _profile_html(profile, user_id)
+    return PROFILE_PAGE.format(content=content)
+
+
+class MockTwitterServer:
+    """
+    Local HTTP server of synthetic twitter pages that headless chrome can
+    load: search pages with infinite scroll (tweets of FakeSearchPage) and
+    profile pages of fake writers, including suspended, deleted and
+    restricted ones (see `fakeWebDriver.UNREACHABLE_PREFIXES`). Use its url
+    as `base_url` of Collector.
+    """
+
+    def __init__(self, tweet_count=200, page_size=20, scroll_step=10,
+                 delay=0.05, max_rendered=0, port=0):
+        """
+            Args:
+                `tweet_count` (int): number of tweets of each search
+                `page_size` (int): number of tweets loaded with the page
+                `scroll_step` (int): number of tweets loaded by a scroll
+                `delay` (float): seconds each tweet request takes
+                `max_rendered` (int): number of tweets kept in the page
+                    (0 for every loaded tweet)
+                `port` (int): port to listen on (0 for a free port)
+        """
+        self._tweet_count = tweet_count
+        self._page_size = page_size
+        self._scroll_step = scroll_step
+        self._delay = delay
+        self._max_rendered = max_rendered
+        self._tweets = dict()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port),
+                                           self._handler_class())
+        self.request_count = 0
+
+    def _search_tweets(self, query: str) -> list:
+        with self._lock:
+            tweets = self._tweets.get(query)
+            if tweets is None:
+                tweets = self._tweets[query] = FakeSearchPage(
+                    "/search?" + urlencode({'q': query}), self._tweet_count, 1, 1).tweets
+            return tweets
+
+    def _search_page(self, query: str) -> str:
+        lang = next((term.split(':', 1)[1] for term in query.split()
+                     if term.startswith('lang:')), 'en')
+        return SEARCH_PAGE.format(query=json.dumps(query), lang=json.dumps(lang),
+                                  page_size=self._page_size,
+                                  scroll_step=self._scroll_step,
+                                  delay=int(self._delay * 1000),
+                                  max_rendered=self._max_rendered)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.request_count += 1
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                path = url.path.strip('/')
+                if path == 'search':
+                    self._send('text/html',
+                               server._search_page(params.get('q', [''])[0]))
+                elif path == 'mock/timeline':
+                    offset = int(params['offset'][0])
+                    count = int(params['count'][0])
+                    tweets = server._search_tweets(params.get('q', [''])[0])
+                    self._send('application/json',
+                               json.dumps(tweets[offset:offset + count]))
+                elif path == 'login':
+                    self._send('text/html', "<html><body></body></html>")
+                elif path and '/' not in path:
+                    self._send('text/html', profile_page(path))
+                else:
+                    self.send_error(404)
+
+            def _send(self, content_type, text):
+                body = text.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type + '; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> str:
+        """Starts serving in a daemon thread, returns base url (with a
+        trailing slash)"""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-p', '--port', type=int, default=8000,
+                             help="port of mock twitter server")
+    argv_parser.add_argument('-n', '--tweet_count', type=int, default=200,
+                             help="number of tweets of each search")
+    argv_parser.add_argument('-m', '--max_rendered', type=int, default=0,
+                             help="number of tweets kept in page (0 for all)")
+    args = argv_parser.parse_args()
+
+    mock_server = MockTwitterServer(tweet_count=args.tweet_count,
+                                    max_rendered=args.max_rendered,
+                                    port=args.port)
+    print(f"Mock twitter is serving on {mock_server.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock_server.close()
@@ -0,0 +1,96 @@
+import datetime
+import gzip
+import json
+import os
+import re
+import time
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+
+
+def archive_path(archive_dir: str, searchKey: str, since, until) -> str:
+    """Returns path of the archive of a search window, named after its key
+    and bounds"""
+    def bound(value):
+        if isinstance(value, datetime.datetime):
+            return value.strftime("%Y-%m-%dT%H%M%S")
+        return str(value)
+
+    label = re.sub(r'[^0-9A-Za-z_.-]+', '_', searchKey).strip('_') or "search"
+    return os.path.join(archive_dir,
+                        f"{label}_{bound(since)}_{bound(until)}{ARCHIVE_SUFFIX}")
+
+
+class PageArchive:
+    """
+    Append-only archive of captured tweet html of a search window. Every
+    scroll is appended as a separate gzip member holding a JSON line, so a
+    snapshot is on disk as soon as it is captured and an interrupted capture
+    loses at most its last scroll. The first line is a header with the search
+    key, window and language needed to parse the archive later (see
+    `pageParser`).
+    """
+
+    def __init__(self, archive_dir: str, searchKey: str, since, until, lang='en',
+                 keys=None):
+        """
+            Args:
+                `archive_dir` (str): directory of archives, created if missing
+                `searchKey` (str): search key (or key group name) of the window
+                `since` (datetime.date): start of the window
+                `until` (datetime.date): end of the window
+                `lang` (str): language of tweet bodies
+                `keys` (list): SearchKey instances of the key group, tweets
+                    are attributed to the keys in their body on parse (None to
+                    attribute every tweet to `searchKey`)
+        """
+        os.makedirs(archive_dir, exist_ok=True)
+        self.path = archive_path(archive_dir, searchKey, since, until)
+        self.snapshot_count = 0
+        if not os.path.exists(self.path):
+            self._write({'searchKey': searchKey, 'since': str(since),
+                         'until': str(until), 'lang': lang,
+                         'keys': [list(key) for key in keys] if keys else None})
+
+    def _write(self, record: dict) -> None:
+        with gzip.open(self.path, 'ab') as archive_file:
+            archive_file.write(json.dumps(record).encode() + b"\n")
+
+    def append(self, nodes: list) -> None:
+        """Appends html of tweets captured by a scroll (see
+        `CAPTURE_TWEETS_SCRIPT`)"""
+        self._write({'time': round(time.time(), 3), 'nodes': nodes})
+        self.snapshot_count += 1
+
+
+def read_archive(path: str) -> tuple:
+    """
+        Reads an archive written by PageArchive. A truncated last snapshot
+        (e.g. of a killed capture) is skipped.
+
+            Returns:
+                tuple of (header dict, list of snapshots), each snapshot is a
+                list of tweet html
+    """
+    lines = []
+    with gzip.open(path, 'rb') as archive_file:
+        try:
+            for line in archive_file:
+                lines.append(line)
+        except (EOFError, OSError):
+            pass
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+    if not records or 'searchKey' not in records[0]:
+        raise ValueError(f"{path} is not a page archive")
+    return records[0], [record['nodes'] for record in records[1:]]
+
+
+def list_archives(archive_dir: str) -> list:
+    """Returns paths of archives in a directory in name order"""
+    return [os.path.join(archive_dir, name) for name in sorted(os.listdir(archive_dir))
+            if name.endswith(ARCHIVE_SUFFIX)]
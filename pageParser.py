@@ -0,0 +1,194 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import log
+from pageScripts import (TWEET_XPATH, STATUS_XPATH, WRITER_XPATH, TIME_XPATH,
+                         BODY_XPATH, REPLY_XPATH, RETWEET_XPATH, LIKE_XPATH,
+                         PROFILE_XPATHS, count_from_text)
+from tweet import Tweet, iso_to_timestamp
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+_parser_pool = None
+_parser_pool_lock = threading.Lock()
+
+
+def _first(element, xpath):
+    found = element.xpath(xpath)
+    return found[0] if found else None
+
+
+def _text(element, xpath):
+    node = _first(element, xpath)
+    return node.text_content() if node is not None else None
+
+
+def tweets_from_html(source: str, searchKey, lang='en', is_known=None) -> list:
+    """
+        Parses tweets of an html document or fragment with lxml, using the
+        XPath expressions of Collector. Fields are read the way
+        `EXTRACT_TWEETS_SCRIPT` reads them in the page.
+
+            Args:
+                `source` (str): html containing tweet elements (a page
+                    source or tweet html captured by `CAPTURE_TWEETS_SCRIPT`)
+                `searchKey` (str): search key of tweets
+                `lang` (str): language of tweet bodies
+                `is_known` (callable): called with tweet id, tweet is
+                    skipped if it returns true
+
+            Returns:
+                list of Tweet instances in document order
+
+            Raises:
+                ImportError if lxml is not installed
+    """
+    if lxml is None:
+        raise ImportError("html parsing requires lxml package")
+    if not source.strip():
+        return []
+    document = lxml.html.document_fromstring(source)
+    body_xpath = BODY_XPATH.format(lang=lang)
+
+    tweets = []
+    for element in document.xpath(TWEET_XPATH):
+        status = _first(element, STATUS_XPATH)
+        if status is None:
+            continue
+        tweet_id = int(status.get('href').rstrip('/').split('/')[-1])
+        # Check if tweet is already collected, if so continue to next one
+        if is_known is not None and is_known(tweet_id):
+            continue
+
+        writer = _text(element, WRITER_XPATH)
+        time_node = _first(element, TIME_XPATH)
+        if writer is None or time_node is None or not time_node.get('datetime'):
+            log('tweet_error', f"Exception during parsing of tweet: {tweet_id}",
+                tweet_id=tweet_id, error='missing_field')
+            continue
+        body = _text(element, body_xpath)
+        if body is None:
+            continue
+
+        tweets.append(Tweet(tweet_id=tweet_id,
+                            writer=writer.strip().replace('@', ''),
+                            post_date=iso_to_timestamp(time_node.get('datetime')),
+                            body=body.replace('\n', ''),
+                            searchKey=searchKey,
+                            comment_num=count_from_text(_text(element, REPLY_XPATH)),
+                            retweet_num=count_from_text(_text(element, RETWEET_XPATH)),
+                            like_num=count_from_text(_text(element, LIKE_XPATH))))
+    return tweets
+
+
+def _inner_text(node):
+    """Text of a node with collapsed whitespace, like innerText of inline
+    content in the page"""
+    return " ".join(node.text_content().split()) if node is not None else None
+
+
+def profile_from_html(source: str, user_id: str) -> dict:
+    """
+        Parses a profile page with lxml, the way `EXTRACT_PROFILE_SCRIPT`
+        reads it in the page (restricted profiles are not confirmed).
+
+            Args:
+                `source` (str): html of a profile page
+                `user_id` (str): id of the profile's user
+
+            Returns:
+                dict of profile texts, see `EXTRACT_PROFILE_SCRIPT`
+
+            Raises:
+                ImportError if lxml is not installed
+    """
+    if lxml is None:
+        raise ImportError("html parsing requires lxml package")
+    document = lxml.html.document_fromstring(source)
+    xpaths = {name: xpath.format(user_id=user_id)
+              for name, xpath in PROFILE_XPATHS.items()}
+
+    def title(xpath, index):
+        nodes = document.xpath(xpath)
+        return nodes[index].get('title') if len(nodes) > index else None
+
+    profile = dict.fromkeys(('status', 'username', 'following', 'follower',
+                             'tweet_count', 'bio', 'header', 'website',
+                             'born', 'joined', 'location'))
+    profile['username'] = _inner_text(_first(document, xpaths['username']))
+    profile['following'] = (title(xpaths['following'], 0) or
+                            title(xpaths['buttons'], 0))
+    if profile['username'] is None or profile['following'] is None:
+        if _first(document, xpaths['not_exist']) is not None:
+            profile['status'] = 'existance'
+        elif _first(document, xpaths['suspended']) is not None:
+            profile['status'] = 'suspended'
+        elif (profile['username'] is not None and
+              _first(document, xpaths['view_profile']) is not None):
+            profile['status'] = 'restricted'
+        return profile
+
+    profile['follower'] = (title(xpaths['follower'], 0) or
+                           title(xpaths['buttons'], 1))
+    profile['tweet_count'] = _inner_text(_first(document, xpaths['tweet_count']))
+    profile['bio'] = _inner_text(_first(document, xpaths['bio']))
+    header = _first(document, xpaths['header'])
+    if header is None:
+        return profile
+    profile['header'] = _inner_text(header)
+    items = {name: _first(document, xpaths[name])
+             for name in ('website', 'born', 'joined')}
+    for name, node in items.items():
+        profile[name] = _inner_text(node)
+
+    # Location is the rest of header items
+    remaining = []
+    for item in header:
+        if any(node is not None and (node is item or item in node.iterancestors())
+               for node in items.values()):
+            continue
+        text = _inner_text(item)
+        if text:
+            remaining.append(text)
+    profile['location'] = " ".join(remaining) or None
+    return profile
+
+
+def parser_pool(processes=None) -> ProcessPoolExecutor:
+    """
+        Returns the process pool that parses tweet html of `'lxml'`
+        extraction, shared by every collector of the process. The pool is
+        started on first call with forked workers where fork is available,
+        so call it before starting threads (e.g. at start of a run).
+
+            Args:
+                `processes` (int): number of parser processes of a new pool
+                    (cpu count if None)
+
+            Raises:
+                ImportError if lxml is not installed
+    """
+    global _parser_pool
+    if lxml is None:
+        raise ImportError("lxml extraction requires lxml package")
+    with _parser_pool_lock:
+        if _parser_pool is None:
+            context = (multiprocessing.get_context('fork')
+                       if 'fork' in multiprocessing.get_all_start_methods() else None)
+            _parser_pool = ProcessPoolExecutor(processes, mp_context=context)
+            # workers are started by the first task
+            _parser_pool.submit(int).result()
+        return _parser_pool
+
+
+def close_parser_pool() -> None:
+    """Stops processes of the parser pool (if started)"""
+    global _parser_pool
+    with _parser_pool_lock:
+        if _parser_pool is not None:
+            _parser_pool.shutdown()
+            _parser_pool = None
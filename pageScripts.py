@@ -0,0 +1,398 @@
+import datetime
+import json
+
+from metrics import log
+from tweet import Tweet, iso_to_timestamp
+
+BASE_URL = "https://www.twitter.com/"
+
+# Twitter epoch of snowflake tweet ids in milliseconds
+SNOWFLAKE_EPOCH = 1288834974657
+
+# XPath expressions of tweet fields, relative ones are evaluated on a tweet
+TWEET_XPATH = "//div[@data-testid='tweet']"
+STATUS_XPATH = ".//a[contains(@href, '/status/')]"
+WRITER_XPATH = ".//div[@dir='ltr']"
+TIME_XPATH = ".//time"
+BODY_XPATH = ".//div[@lang='{lang}' and @dir='auto']"
+REPLY_XPATH = ".//div[@data-testid='reply']"
+RETWEET_XPATH = ".//div[@data-testid='retweet']"
+LIKE_XPATH = ".//div[@data-testid='like']"
+
+# Tweet extraction modes (DOM modes read only tweets rendered since last call)
+#   element: a WebDriver call for each field of each new tweet
+#   script : a single execute_script call for all new tweets
+#   lxml   : a single execute_script call for html of all new tweets, which
+#            is parsed with lxml in a process pool (see `pageParser`)
+#   network: parses search timeline responses captured from performance log
+#            (collector must be started with `capture_network`)
+# Profiles can only be read from the page (DOM_EXTRACTION_MODES)
+DOM_EXTRACTION_MODES = ('element', 'script')
+EXTRACTION_MODES = DOM_EXTRACTION_MODES + ('lxml', 'network')
+# Html of new tweets is only archived, not parsed (see
+# `Collector.capture_to_archive` and `reparse`)
+CAPTURE_EXTRACTION = 'capture'
+
+# Page pacing modes
+#   sleep: fixed sleeps after navigation and scroll
+#   event: waits until new tweets are rendered (MutationObserver) or timeout
+PACING_MODES = ('sleep', 'event')
+
+TWEET_SELECTOR = "div[data-testid='tweet']"
+# Attribute that extraction scripts set on processed tweet nodes, its value is
+# the status link of the tweet so a node reused for another tweet is read again
+COLLECTED_ATTRIBUTE = "data-collected"
+EMPTY_SEARCH_SELECTOR = "div[data-testid='emptyState']"
+LOADING_SELECTOR = "div[role='progressbar']"
+PROFILE_SELECTOR = ("div[data-testid='UserProfileHeader_Items'], "
+                    "div[data-testid='emptyState']")
+
+# Async script that (optionally) scrolls to the bottom and waits until a node
+# matching the selector is added to the page. Arguments are selector, scroll
+# flag, timeout and settle milliseconds and progressbar selector. Calls back
+# with 'found', or on timeout with 'loading' if a progressbar is on the page
+# and 'idle' otherwise.
+WAIT_FOR_NODES_SCRIPT = """
+var selector = arguments[0], scroll = arguments[1], timeout = arguments[2],
+    settle = arguments[3], loading = arguments[4];
+var done = arguments[arguments.length - 1];
+var finished = false, settleTimer = null, timeoutTimer = null, observer = null;
+function finish(state) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    if (observer) {
+        observer.disconnect();
+    }
+    clearTimeout(settleTimer);
+    clearTimeout(timeoutTimer);
+    done(state);
+}
+if (!scroll && document.querySelector(selector)) {
+    finish('found');
+    return;
+}
+observer = new MutationObserver(function (mutations) {
+    for (var i = 0; i < mutations.length; i++) {
+        var added = mutations[i].addedNodes;
+        for (var j = 0; j < added.length; j++) {
+            var node = added[j];
+            if (node.nodeType === 1 &&
+                    (node.matches(selector) || node.querySelector(selector))) {
+                clearTimeout(settleTimer);
+                settleTimer = setTimeout(function () { finish('found'); }, settle);
+                return;
+            }
+        }
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timeoutTimer = setTimeout(function () {
+    finish(document.querySelector(loading) ? 'loading' : 'idle');
+}, timeout);
+if (scroll) {
+    window.scrollTo(0, document.body.scrollHeight);
+}
+"""
+
+# Evaluates field XPaths of tweets inside the page that are not tagged with
+# COLLECTED_ATTRIBUTE yet and returns them as a JSON array. Arguments are the
+# XPath expressions above in order, the attribute and ids (strings) to add to
+# known tweet ids of the page, which are kept until the page is left. Tweets
+# whose writer, time and body are read are tagged, so each scroll returns only
+# newly rendered tweets, and a tweet with a missing field (e.g. still rendering
+# or not in `lang`) is read again by the next call. Known tweets are tagged and
+# returned with their status link only, without reading other fields.
+EXTRACT_TWEETS_SCRIPT = """
+var xpaths = arguments, tag = arguments[8], added = arguments[9] || [];
+var known = window.knownTweetIds || (window.knownTweetIds = {});
+for (var k = 0; k < added.length; k++) {
+    known[added[k]] = true;
+}
+function first(context, xpath) {
+    return document.evaluate(xpath, context, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function text(context, xpath) {
+    var node = first(context, xpath);
+    return node ? node.innerText : null;
+}
+var tweets = document.evaluate(xpaths[0], document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var result = [];
+for (var i = 0; i < tweets.snapshotLength; i++) {
+    var tweet = tweets.snapshotItem(i);
+    var status = first(tweet, xpaths[1]);
+    if (!status || tweet.getAttribute(tag) === status.href) {
+        continue;
+    }
+    if (known[status.href.split('/').pop()]) {
+        tweet.setAttribute(tag, status.href);
+        result.push({status: status.href});
+        continue;
+    }
+    var time = first(tweet, xpaths[3]);
+    var fields = {
+        status: status.href,
+        writer: text(tweet, xpaths[2]),
+        datetime: time ? time.getAttribute('datetime') : null,
+        body: text(tweet, xpaths[4]),
+        reply: text(tweet, xpaths[5]),
+        retweet: text(tweet, xpaths[6]),
+        like: text(tweet, xpaths[7])
+    };
+    if (fields.writer !== null && fields.datetime !== null && fields.body !== null) {
+        tweet.setAttribute(tag, status.href);
+    }
+    result.push(fields);
+}
+return JSON.stringify(result);
+"""
+
+# Returns tweet elements that are not tagged with COLLECTED_ATTRIBUTE and tags
+# them. Arguments are TWEET_XPATH, STATUS_XPATH and the attribute.
+NEW_TWEET_ELEMENTS_SCRIPT = """
+var tag = arguments[2];
+var tweets = document.evaluate(arguments[0], document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var result = [];
+for (var i = 0; i < tweets.snapshotLength; i++) {
+    var tweet = tweets.snapshotItem(i);
+    var status = document.evaluate(arguments[1], tweet, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (status && tweet.getAttribute(tag) !== status.href) {
+        tweet.setAttribute(tag, status.href);
+        result.push(tweet);
+    }
+}
+return result;
+"""
+
+# Returns outerHTML of rendered (with a time) tweets that are not tagged with
+# COLLECTED_ATTRIBUTE and tags them, to be archived and parsed offline (see
+# `pageParser`). Arguments are TWEET_XPATH, STATUS_XPATH, TIME_XPATH and the
+# attribute.
+CAPTURE_TWEETS_SCRIPT = """
+var tag = arguments[3];
+function first(context, xpath) {
+    return document.evaluate(xpath, context, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+var tweets = document.evaluate(arguments[0], document, null,
+    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var result = [];
+for (var i = 0; i < tweets.snapshotLength; i++) {
+    var tweet = tweets.snapshotItem(i);
+    var status = first(tweet, arguments[1]);
+    if (!status || tweet.getAttribute(tag) === status.href ||
+            !first(tweet, arguments[2])) {
+        continue;
+    }
+    result.push(tweet.outerHTML);
+    tweet.setAttribute(tag, status.href);
+}
+return result;
+"""
+
+# Removes COLLECTED_ATTRIBUTE of a tweet element (argument 0) so it is read
+# again, or of every tweet if no element is given. Argument 1 is the attribute.
+UNTAG_TWEETS_SCRIPT = """
+var nodes = arguments[0] ? [arguments[0]] :
+    document.querySelectorAll('[' + arguments[1] + ']');
+for (var i = 0; i < nodes.length; i++) {
+    nodes[i].removeAttribute(arguments[1]);
+}
+"""
+
+
+# XPath expressions of profile fields, `{user_id}` is formatted with id of
+# the writer. `buttons` are count buttons of restricted accounts (following,
+# follower).
+PROFILE_XPATHS = {
+    'username': "//h2[@aria-level='2' and @role='heading' and @dir='ltr']",
+    'following': "//a[contains(@href, '{user_id}/following')]",
+    'follower': "//a[contains(@href, '{user_id}/follower')]",
+    'buttons': "//div[@dir='auto' and @role='button']",
+    'view_profile': "//span[contains(text(), 'Yes, view profile')]",
+    'tweet_count': "//div[@dir='auto' and contains(text(), ' Tweets')]",
+    'bio': "//div[@data-testid='UserDescription']",
+    'header': "//div[@data-testid='UserProfileHeader_Items']",
+    'website': "//div[@data-testid='UserProfileHeader_Items']//a[@target='_blank']",
+    'born': "//span[contains(text(), 'Born')]",
+    'joined': "//span[contains(text(), 'Joined') and not(contains(text(), 'Twitter'))]",
+    'not_exist': "//*[contains(text(), 'This account doesn')]",
+    'suspended': "//*[contains(text(), 'Account suspended')]",
+}
+
+# Reads every field of a profile page, argument is PROFILE_XPATHS formatted
+# with user id. Returns a JSON object of texts (null if missing) with keys
+# status, username, following, follower, tweet_count, bio, header, website,
+# born, joined and location. Status is 'existance' or 'suspended' for
+# unreachable accounts, 'restricted' if profile is behind a warning and null
+# otherwise. Location is the header item that is none of website, born and
+# joined.
+EXTRACT_PROFILE_SCRIPT = """
+var xpaths = arguments[0];
+function first(xpath) {
+    return document.evaluate(xpath, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+function text(xpath) {
+    var node = first(xpath);
+    return node ? node.innerText : null;
+}
+function title(xpath, index) {
+    var nodes = document.evaluate(xpath, document, null,
+        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var node = nodes.snapshotLength > index ? nodes.snapshotItem(index) : null;
+    return node ? node.getAttribute('title') : null;
+}
+var profile = {status: null, username: null, following: null, follower: null,
+               tweet_count: null, bio: null, header: null, website: null,
+               born: null, joined: null, location: null};
+profile.username = text(xpaths.username);
+profile.following = title(xpaths.following, 0) || title(xpaths.buttons, 0);
+if (profile.username === null || profile.following === null) {
+    if (first(xpaths.not_exist)) {
+        profile.status = 'existance';
+    } else if (first(xpaths.suspended)) {
+        profile.status = 'suspended';
+    } else if (profile.username !== null && first(xpaths.view_profile)) {
+        profile.status = 'restricted';
+    }
+    return JSON.stringify(profile);
+}
+profile.follower = title(xpaths.follower, 0) || title(xpaths.buttons, 1);
+profile.tweet_count = text(xpaths.tweet_count);
+profile.bio = text(xpaths.bio);
+var header = first(xpaths.header);
+if (header === null) {
+    return JSON.stringify(profile);
+}
+profile.header = header.innerText;
+var website = first(xpaths.website), born = first(xpaths.born),
+    joined = first(xpaths.joined);
+profile.website = website ? website.innerText : null;
+profile.born = born ? born.innerText : null;
+profile.joined = joined ? joined.innerText : null;
+var remaining = [];
+for (var i = 0; i < header.children.length; i++) {
+    var item = header.children[i];
+    if ((website && item.contains(website)) || (born && item.contains(born)) ||
+            (joined && item.contains(joined))) {
+        continue;
+    }
+    if (item.innerText.trim()) {
+        remaining.push(item.innerText.trim());
+    }
+}
+profile.location = remaining.length ? remaining.join(' ') : null;
+return JSON.stringify(profile);
+"""
+
+
+def search_date(value) -> str:
+    """Formats date or datetime for since/until search operators"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d_%H:%M:%S_UTC")
+    return str(value)
+
+
+def search_url(searchKey: str, tabName="top", from_=None, to_=None, lang=None,
+               base_url=BASE_URL) -> str:
+    """Returns twitter search page url, see `Collector.search` for arguments"""
+    tab_str = f"&f={tabName}" if tabName != "top" else ""
+    from_str = f"%20since%3A{search_date(from_)}" if from_ is not None else ""
+    to_str = f"%20until%3A{search_date(to_)}" if to_ is not None else ""
+    lang_str = f"%20lang%3A{str(lang)}" if lang is not None else ""
+    searchKey = searchKey.replace(' ', '%20')
+
+    return base_url + "search?q=" + searchKey + \
+        to_str + from_str + lang_str + "&src=typed_query" + tab_str
+
+
+def extract_tweets_args(lang: str, known_ids=()) -> tuple:
+    """Returns arguments of EXTRACT_TWEETS_SCRIPT for tweets in `lang`,
+    `known_ids` are added to known tweet ids of the page"""
+    return (TWEET_XPATH, STATUS_XPATH, WRITER_XPATH, TIME_XPATH,
+            BODY_XPATH.format(lang=lang), REPLY_XPATH, RETWEET_XPATH,
+            LIKE_XPATH, COLLECTED_ATTRIBUTE,
+            [str(tweet_id) for tweet_id in known_ids])
+
+
+def _epoch_milliseconds(value) -> int:
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def window_tweet_ids(seen, since, until) -> list:
+    """
+        Returns ids of `seen` that can be tweets of a search window, to be
+        passed to EXTRACT_TWEETS_SCRIPT as known ids. Tweet ids hold their
+        post time in milliseconds since SNOWFLAKE_EPOCH, shifted by 22 bits.
+
+            Args:
+                `seen` (SeenIDs): ids of collected tweets (None for none)
+                `since` (datetime.date): start of the window (None for an
+                    unbounded search, no id is returned then)
+                `until` (datetime.date): end of the window
+
+            Returns:
+                list of tweet ids
+    """
+    if seen is None or since is None or until is None:
+        return []
+    # a day wider, search dates may be read in another time zone
+    day = 24 * 3600 * 1000
+    low = max(_epoch_milliseconds(since) - day - SNOWFLAKE_EPOCH, 0) << 22
+    high = max(_epoch_milliseconds(until) + day - SNOWFLAKE_EPOCH, 0) << 22
+    return seen.in_range(low, high)
+
+
+def count_from_text(count_text) -> int:
+    """Converts reply/retweet/like text of a tweet to int (0 if not plain)"""
+    try:
+        return int(count_text)
+    except (TypeError, ValueError):
+        return 0
+
+
+def tweets_from_script(result: str, searchKey, is_known):
+    """
+        Generator that creates tweets from result of EXTRACT_TWEETS_SCRIPT.
+
+            Args:
+                `result` (str): JSON array returned by the script
+                `searchKey` (str): search key of tweets
+                `is_known` (callable): called with tweet id, tweet is
+                    skipped if it returns true
+
+            Yields:
+                Tweet instances that are not known
+    """
+    for raw in json.loads(result):
+        tweet_id = int(raw['status'].split('/')[-1])
+        # Check if tweet is already collected, if so continue to next one.
+        # Tweets known to the page are returned with their id only
+        if is_known(tweet_id) or 'writer' not in raw:
+            continue
+
+        if raw['writer'] is None or raw['datetime'] is None:
+            log('tweet_error', f"Exception during collection of tweet: {tweet_id}",
+                tweet_id=tweet_id, error='missing_field')
+            continue
+        if raw['body'] is None:
+            continue
+
+        yield Tweet(tweet_id=tweet_id,
+                    writer=raw['writer'].replace('@', ''),
+                    post_date=iso_to_timestamp(raw['datetime']),
+                    body=raw['body'].replace('\n', ''),
+                    searchKey=searchKey,
+                    comment_num=count_from_text(raw['reply']),
+                    retweet_num=count_from_text(raw['retweet']),
+                    like_num=count_from_text(raw['like']))
@@ -0,0 +1,85 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
+
+from metrics import log
+from pageArchive import list_archives, read_archive
+from pageParser import tweets_from_html
+from searchKeys import KeyGroup, SearchKey
+from tweetDB import TweetDB
+
+
+def reparse_archive(path: str) -> tuple:
+    """
+        Parses every snapshot of an archive (see `pageArchive.PageArchive`),
+        runs in worker processes. A tweet captured more than once is kept
+        with its latest counts.
+
+            Returns:
+                tuple of (path, list of Tweet)
+    """
+    header, snapshots = read_archive(path)
+    group = (KeyGroup([SearchKey(*key) for key in header['keys']])
+             if header.get('keys') else None)
+    tweets = dict()
+    for nodes in snapshots:
+        for tweet in tweets_from_html("".join(nodes), header['searchKey'],
+                                      header['lang']):
+            tweet.searchKey = (group.match(tweet.body) if group is not None
+                               else header['searchKey'])
+            tweets[tweet.tweet_id] = tweet
+    return path, list(tweets.values())
+
+
+def reparse_archives(paths: list, database_name: str, processes=None,
+                     batch_size=5000) -> tuple:
+    """
+        Parses archives in a process pool and inserts their tweets into a
+        database from the calling process.
+
+            Args:
+                `paths` (list): archive paths
+                `database_name` (str): name of TweetDB (without .db)
+                `processes` (int): number of parser processes (cpu count if
+                    None)
+                `batch_size` (int): number of tweets committed at once
+
+            Returns:
+                tuple of (inserted, duplicate) tweet counts
+    """
+    database = TweetDB(database_name)
+    database.create_tables()
+    inserted_count = 0
+    duplicate_count = 0
+    try:
+        with ProcessPoolExecutor(processes or cpu_count()) as executor:
+            for path, tweets in executor.map(reparse_archive, paths):
+                for i in range(0, len(tweets), batch_size):
+                    inserted, duplicate = database.insert_tweets(
+                        tweets[i:i + batch_size])
+                    inserted_count += inserted
+                    duplicate_count += duplicate
+                log('reparse', f"{path}: {len(tweets)} tweets", path=path,
+                    tweets=len(tweets))
+    finally:
+        database.close_DB()
+    return inserted_count, duplicate_count
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--archive_dir', type=str, required=True,
+                             help="directory of captured page archives")
+    argv_parser.add_argument('-o', '--database', type=str, required=True,
+                             help="database name (without .db) to insert tweets into")
+    argv_parser.add_argument('-p', '--processes', type=int, default=0,
+                             help="number of parser processes (0 for cpu count)")
+    args = argv_parser.parse_args()
+
+    archives = list_archives(args.archive_dir)
+    t0 = time.time()
+    inserted, duplicate = reparse_archives(archives, args.database,
+                                           processes=args.processes or None)
+    print(f"Reparsed {len(archives)} archives in {time.time() - t0:.1f}s: "
+          f"{inserted} tweets inserted, {duplicate} duplicates")
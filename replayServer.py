@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from timelineParser import parse_timeline
+
+TIMELINE_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "fixtures", "timeline")
+PROFILE_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "fixtures", "profiles")
+
+# Search page that requests recorded responses in order, one on load and one
+# more on each scroll to the bottom, and renders their tweets with markup
+# matching the XPaths of `pageScripts` (counts are rounded like twitter does)
+REPLAY_PAGE = """<html><head><style>article { display: block; height: 300px; }</style></head>
+<body><div id="timeline"></div>
+<script>
+var nextPage = 0, loading = false, done = false;
+function rounded(count) {
+    if (count >= 1000000) return (count / 1000000).toFixed(1) + "M";
+    if (count >= 10000) return Math.floor(count / 1000) + "K";
+    if (count >= 1000) return (count / 1000).toFixed(1) + "K";
+    return String(count);
+}
+function render(tweet) {
+    var article = document.createElement("article");
+    article.innerHTML =
+        '<div data-testid="tweet">' +
+        '<a href="/' + tweet.writer + '/status/' + tweet.tweet_id + '">' +
+        '<time datetime="' + tweet.datetime + '">date</time></a>' +
+        '<div dir="ltr"><span>@' + tweet.writer + '</span></div>' +
+        '<div lang="' + tweet.lang + '" dir="auto"></div>' +
+        '<div data-testid="reply">' + rounded(tweet.reply) + '</div>' +
+        '<div data-testid="retweet">' + rounded(tweet.retweet) + '</div>' +
+        '<div data-testid="like">' + rounded(tweet.like) + '</div></div>';
+    article.querySelector('div[dir="auto"]').textContent = tweet.body;
+    document.getElementById("timeline").appendChild(article);
+}
+function load() {
+    if (loading || done) return;
+    loading = true;
+    fetch("/i/api/2/search/adaptive.json?page=" + nextPage)
+        .then(function (response) {
+            if (response.status !== 200) { done = true; return null; }
+            return response.json();
+        })
+        .then(function (page) {
+            if (page === null) return;
+            nextPage += 1;
+            return fetch("/rendered?page=" + (nextPage - 1))
+                .then(function (response) { return response.json(); })
+                .then(function (tweets) { tweets.forEach(render); });
+        })
+        .finally(function () { loading = false; });
+}
+window.addEventListener("scroll", function () {
+    if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 10) load();
+});
+load();
+</script></body></html>
+"""
+
+
+class ReplayServer:
+    """
+    Local HTTP server of a fake search page that replays recorded search
+    timeline responses (`*.json` files of a fixture directory, in name order)
+    as the page is scrolled. Both the DOM and the network extraction can
+    be run against it with a real browser. Recorded profile pages
+    (`<user_id>.html` files of a profile directory) are served at
+    `/<user_id>`.
+    """
+
+    def __init__(self, fixture_dir=TIMELINE_FIXTURES, port=0,
+                 profile_dir=PROFILE_FIXTURES):
+        """
+            Args:
+                `fixture_dir` (str): directory of recorded responses
+                `port` (int): port to listen on (0 for a free port)
+                `profile_dir` (str): directory of recorded profile pages
+        """
+        self._profile_dir = profile_dir
+        self._responses = []
+        for name in sorted(os.listdir(fixture_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(fixture_dir, name), 'rb') as response_file:
+                    self._responses.append(response_file.read())
+        self._server = ThreadingHTTPServer(('127.0.0.1', port),
+                                           self._handler_class())
+        self._thread = None
+
+    @property
+    def response_count(self) -> int:
+        return len(self._responses)
+
+    def _rendered(self, page: int) -> bytes:
+        """Returns tweets of a response in the shape the page renders them"""
+        tweets, _ = parse_timeline(self._responses[page])
+        english_ids = {tweet.tweet_id for tweet in
+                       parse_timeline(self._responses[page], lang='en')[0]}
+        return json.dumps([{
+            'tweet_id': str(tweet.tweet_id),
+            'writer': tweet.writer,
+            'datetime': time.strftime("%Y-%m-%dT%H:%M:%S.000Z", tweet.post_date),
+            'lang': 'en' if tweet.tweet_id in english_ids else 'und',
+            'body': tweet.body,
+            'reply': tweet.comment_num,
+            'retweet': tweet.retweet_num,
+            'like': tweet.like_num,
+        } for tweet in tweets]).encode()
+
+    def _profile(self, user_id: str):
+        """Returns recorded profile page of a user, None if not recorded"""
+        if not self._profile_dir or not user_id.isidentifier():
+            return None
+        path = os.path.join(self._profile_dir, user_id + ".html")
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as profile_file:
+            return profile_file.read()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                page = int(parse_qs(url.query).get('page', ['0'])[0])
+                profile = server._profile(url.path.strip('/'))
+                if url.path == '/search':
+                    self._send(200, 'text/html', REPLAY_PAGE.encode())
+                elif profile is not None:
+                    self._send(200, 'text/html', profile)
+                elif page >= len(server._responses):
+                    self._send(404, 'application/json', b'{}')
+                elif url.path == '/i/api/2/search/adaptive.json':
+                    self._send(200, 'application/json', server._responses[page])
+                elif url.path == '/rendered':
+                    self._send(200, 'application/json', server._rendered(page))
+                else:
+                    self._send(404, 'text/plain', b'not found')
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type + '; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> str:
+        """Starts serving in a daemon thread, returns url of the search page"""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--fixtures', type=str,
+                             default=TIMELINE_FIXTURES,
+                             help="directory of recorded timeline responses")
+    argv_parser.add_argument('-p', '--port', type=int, default=8000,
+                             help="port of replay server")
+    args = argv_parser.parse_args()
+
+    replay_server = ReplayServer(args.fixtures, port=args.port)
+    print(f"Replaying {replay_server.response_count} responses on {replay_server.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        replay_server.close()
@@ -0,0 +1,180 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import (WINDOW_RETRIES, WINDOW_SECONDS, WINDOWS,
+                     WINDOWS_IN_FLIGHT, log)
+
+# Search window, `until` is exclusive
+Window = namedtuple('Window', ['since', 'until'])
+
+# Final state of a window
+#   status : 'done', 'failed' or 'cancelled'
+#   attempts: number of times task is run for the window
+#   value  : return value of the task (None if not done)
+#   error  : last exception raised by the task (None if done)
+#   elapsed: total seconds spent on the window by workers
+WindowResult = namedtuple('WindowResult', ['window', 'status', 'attempts',
+                                           'value', 'error', 'elapsed'])
+
+
+class Scheduler:
+    """
+    Runs a task over search windows on a fixed-size thread pool. Windows are
+    kept in a work queue and taken by the next free worker, failed windows
+    are queued again until their retry budget is spent.
+    """
+
+    _task = None
+    _worker_count = None
+    _retry_count = None
+
+    def __init__(self, task, worker_count: int, retry_count=2, on_cancel=None):
+        """
+            Args:
+                `task` (callable): called with a Window, its return value is
+                    reported in WindowResult. Raising an exception is
+                    considered as a failed attempt.
+                `worker_count` (int): number of worker threads
+                `retry_count` (int): number of re-runs of a failed window
+                `on_cancel` (callable): called once on cancellation to stop
+                    running tasks (e.g. `SessionPool.stop_leased`)
+        """
+        self._task = task
+        self._worker_count = worker_count
+        self._retry_count = retry_count
+        self._on_cancel = on_cancel
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stops dispatching windows, queued windows are reported as cancelled"""
+        if self._cancelled.is_set():
+            return
+        self._cancelled.set()
+        if self._on_cancel is not None:
+            self._on_cancel()
+
+    def _work(self, work: queue.Queue, results: queue.Queue) -> None:
+        """Worker loop, runs until a None is taken from `work`"""
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            window, attempt, elapsed = item
+
+            if self._cancelled.is_set():
+                results.put(WindowResult(window, 'cancelled', attempt - 1,
+                                         None, None, elapsed))
+                continue
+
+            t0 = time.time()
+            WINDOWS_IN_FLIGHT.inc()
+            try:
+                value = self._task(window)
+            except Exception as e:
+                elapsed += time.time() - t0
+                if attempt <= self._retry_count and not self._cancelled.is_set():
+                    log('window_retry',
+                        f"Window {window.since} - {window.until} failed "
+                        f"({attempt}/{self._retry_count + 1}): {e}",
+                        since=window.since, until=window.until,
+                        attempt=attempt, error=str(e))
+                    WINDOW_RETRIES.inc()
+                    work.put((window, attempt + 1, elapsed))
+                else:
+                    results.put(WindowResult(window, 'failed', attempt,
+                                             None, e, elapsed))
+                continue
+            finally:
+                WINDOWS_IN_FLIGHT.dec()
+            elapsed += time.time() - t0
+
+            status = 'cancelled' if self._cancelled.is_set() else 'done'
+            results.put(WindowResult(window, status, attempt,
+                                     value, None, elapsed))
+
+    def run(self, windows, on_result=None, source=None, poll_seconds=5.0) -> list:
+        """
+            Runs task over given windows and blocks until every window is
+            done, failed or cancelled. KeyboardInterrupt cancels the run.
+            If `source` or `on_result` raises, the run is cancelled and the
+            exception is raised after workers stop.
+
+                Args:
+                    `windows` (iterable): Window instances in dispatch order
+                    `on_result` (callable): called on the calling thread with
+                        each WindowResult as soon as it is ready
+                    `source` (callable): called on the calling thread with
+                        the number of free workers whenever a worker is free,
+                        returns a list of windows to run next (empty if none
+                        is available yet) or None when it has no more windows
+                        (e.g. claims of `leaseTable`)
+                    `poll_seconds` (float): seconds to wait before calling
+                        `source` again after it returned no windows
+
+                Returns:
+                    list of WindowResult in completion order
+        """
+        work = queue.Queue()
+        results = queue.Queue()
+        window_count = 0
+        for window in windows:
+            work.put((window, 1, 0.0))
+            window_count += 1
+
+        collected = []
+        with ThreadPoolExecutor(max_workers=self._worker_count) as executor:
+            for _ in range(self._worker_count):
+                executor.submit(self._work, work, results)
+
+            try:
+                while True:
+                    timeout = None
+                    if source is not None and not self._cancelled.is_set():
+                        free = self._worker_count - (window_count - len(collected))
+                        new_windows = source(free) if free > 0 else []
+                        if new_windows is None:
+                            source = None
+                        else:
+                            for window in new_windows:
+                                work.put((window, 1, 0.0))
+                                window_count += 1
+                            if free > len(new_windows):
+                                timeout = poll_seconds
+                    if len(collected) >= window_count and (
+                            source is None or self._cancelled.is_set()):
+                        break
+                    try:
+                        result = results.get(timeout=timeout)
+                    except queue.Empty:
+                        continue
+                    except KeyboardInterrupt:
+                        log('cancel', "Cancelling collection...")
+                        self.cancel()
+                        continue
+                    WINDOWS.inc(status=result.status)
+                    WINDOW_SECONDS.observe(result.elapsed)
+                    collected.append(result)
+                    if on_result is not None:
+                        on_result(result)
+            except BaseException:
+                # e.g. source or on_result raised, or KeyboardInterrupt
+                # outside of waiting for a result
+                self.cancel()
+                raise
+            finally:
+                for _ in range(self._worker_count):
+                    work.put(None)
+
+        return collected
+
+    @staticmethod
+    def summary(results) -> str:
+        """Returns count of results per status as text"""
+        counts = dict()
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return ", ".join(f"{count} {status}"
+                         for status, count in sorted(counts.items()))
@@ -0,0 +1,264 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+# URL encoded search prefix of each key type
+SEARCH_PREFIXES = {'tag': '%23', 'stock': '%24', 'word': ''}
+_TEXT_PREFIXES = {'tag': '#', 'stock': '$', 'word': ''}
+
+# Characters of a key that are kept in a label (see `keys_label`), a label
+# part is cut to MAX_LABEL_LENGTH characters
+_UNSAFE_NAME = re.compile(r'[^\w .-]+')
+MAX_LABEL_LENGTH = 48
+
+# Search key without its prefix and the way it is searched
+#   key      : key text without '#' or '$' (e.g. 'AAPL')
+#   search_as: 'tag', 'stock' or 'word'
+SearchKey = namedtuple('SearchKey', ['key', 'search_as'])
+
+# Search task of a key group in a window, `until` is exclusive
+KeyWindow = namedtuple('KeyWindow', ['group', 'since', 'until'])
+
+
+def parse_key(text: str, search_as='tag') -> SearchKey:
+    """
+        Creates SearchKey from key text. Key type is taken from its prefix,
+        `search_as` is used for keys without prefix.
+
+            Args:
+                `text` (str): key text (e.g. '$AAPL', '#apple' or 'apple')
+                `search_as` (str): type of keys without prefix
+
+            Returns:
+                SearchKey instance
+    """
+    text = text.strip()
+    if text.startswith('$'):
+        return SearchKey(text[1:], 'stock')
+    if text.startswith('#'):
+        return SearchKey(text[1:], 'tag')
+    return SearchKey(text, search_as)
+
+
+def read_keys_file(path: str, search_as='tag') -> list:
+    """
+        Reads search keys from a text file, one key per line (or comma
+        separated). Empty lines are skipped.
+
+            Returns:
+                list of SearchKey in file order without duplicates
+    """
+    keys = []
+    with open(path, 'r') as keys_file:
+        for line in keys_file:
+            for text in line.split(','):
+                if text.strip():
+                    key = parse_key(text, search_as)
+                    if key not in keys:
+                        keys.append(key)
+    return keys
+
+
+def keys_label(keys: list, keys_file=None) -> str:
+    """
+        Returns a short name for a key list to be used in database names: the
+        key of a single key, name of the keys file, or else the first key with
+        the number of other keys and a short hash of all keys (e.g.
+        'AAPL+2-1f3a9c0e'). Characters that are not safe in file names are
+        replaced with '-'.
+    """
+    if len(keys) == 1:
+        label = keys[0].key
+    elif keys_file is not None:
+        label = os.path.splitext(os.path.basename(keys_file))[0]
+    else:
+        digest = hashlib.sha1("\n".join(
+            _TEXT_PREFIXES[key.search_as] + key.key for key in keys).encode())
+        return (f"{_safe_name(keys[0].key)}+{len(keys) - 1}-"
+                f"{digest.hexdigest()[:8]}")
+    return _safe_name(label)
+
+
+def _safe_name(text: str) -> str:
+    """Replaces characters that are not safe in file names, limits length"""
+    name = _UNSAFE_NAME.sub('-', text).strip('-. ')
+    return name[:MAX_LABEL_LENGTH] or 'keys'
+
+
+class KeyGroup:
+    """
+    Keys that are searched together with a single OR-query. Tweets found by
+    the query are attributed to the keys that occur in their body.
+    """
+
+    def __init__(self, keys: list):
+        """
+            Args:
+                `keys` (list): SearchKey instances of the group
+        """
+        self.keys = tuple(keys)
+        self._patterns = [
+            [re.compile((r'\b' if key.search_as == 'word' else '') +
+                        re.escape(_TEXT_PREFIXES[key.search_as] + word) + r'\b',
+                        re.IGNORECASE)
+             for word in key.key.split()]
+            for key in self.keys]
+
+    @property
+    def name(self) -> str:
+        """Name of the group that its window progress is recorded with"""
+        return "|".join(key.key for key in self.keys)
+
+    @property
+    def query(self) -> str:
+        """Search query of the group"""
+        terms = [SEARCH_PREFIXES[key.search_as] + key.key for key in self.keys]
+        if len(terms) == 1:
+            return terms[0]
+        # words of a multi-word key must occur together
+        terms = [f"({term})" if ' ' in term else term for term in terms]
+        return "(" + " OR ".join(terms) + ")"
+
+    def match(self, body: str) -> tuple:
+        """
+            Returns keys of the group that occur in `body`, every key of the
+            group if none occurs (e.g. key is matched in a link or username)
+        """
+        if len(self.keys) == 1:
+            return (self.keys[0].key,)
+        matched = tuple(key.key for key, patterns in zip(self.keys, self._patterns)
+                        if all(pattern.search(body) for pattern in patterns))
+        return matched or tuple(key.key for key in self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class GroupContainer:
+    """
+    Container adapter that attributes tweets to keys of a KeyGroup before
+    passing them to wrapped container (e.g. DBWriter).
+    """
+
+    def __init__(self, group: KeyGroup, container):
+        self._group = group
+        self._container = container
+
+    def append(self, tweet) -> None:
+        tweet.searchKey = self._group.match(tweet.body)
+        self._container.append(tweet)
+
+    def extend(self, tweets) -> None:
+        for tweet in tweets:
+            tweet.searchKey = self._group.match(tweet.body)
+        self._container.extend(tweets)
+
+    def put_writer(self, writer) -> None:
+        put_writer = getattr(self._container, 'put_writer', None)
+        if put_writer is not None:
+            put_writer(writer)
+
+
+def group_keys(keys: list, daily_counts: dict, max_tweets: int,
+               max_keys=10) -> list:
+    """
+        Groups keys so that combined tweet count of each group stays within
+        `max_tweets` on every day. Keys are placed with first-fit from the
+        busiest one. Keys without any count are not grouped since their
+        result size is unknown.
+
+            Args:
+                `keys` (list): SearchKey instances
+                `daily_counts` (dict): <key text, <datetime.date, tweet count>>
+                    observed earlier (e.g. `TweetDB.get_daily_counts`)
+                `max_tweets` (int): maximum expected tweets of a group per
+                    day, 0 disables grouping
+                `max_keys` (int): maximum number of keys in a group
+
+            Returns:
+                list of KeyGroup
+    """
+    if not max_tweets or max_keys <= 1:
+        return [KeyGroup([key]) for key in keys]
+
+    groups = []
+    known = []
+    for key in keys:
+        counts = daily_counts.get(key.key)
+        if counts:
+            known.append((key, counts))
+        else:
+            groups.append(([key], None))
+    known.sort(key=lambda item: max(item[1].values()), reverse=True)
+
+    packed = []
+    for key, counts in known:
+        for members, group_counts in packed:
+            if len(members) >= max_keys:
+                continue
+            if all(group_counts.get(day, 0) + count <= max_tweets
+                   for day, count in counts.items()):
+                members.append(key)
+                for day, count in counts.items():
+                    group_counts[day] = group_counts.get(day, 0) + count
+                break
+        else:
+            packed.append(([key], dict(counts)))
+
+    return [KeyGroup(group) for group, _ in packed + groups]
+
+
+def recorded_groups(keys: list, names) -> list:
+    """
+        Rebuilds key groups from their names (see `KeyGroup.name`), e.g.
+        groups whose window progress is recorded by an earlier run.
+
+            Args:
+                `keys` (list): SearchKey instances of the run
+                `names` (iterable): group names
+
+            Returns:
+                list of KeyGroup of names whose keys are all in `keys`, a key
+                is placed in one group at most
+    """
+    by_text = {key.key: key for key in keys}
+    grouped = set()
+    groups = []
+    for name in names:
+        members = [by_text.get(text) for text in name.split("|")]
+        if all(key is not None and key not in grouped for key in members):
+            groups.append(KeyGroup(members))
+            grouped.update(members)
+    return groups
+
+
+def interleave_windows(group_windows: list) -> list:
+    """
+        Interleaves planned windows of groups so that first windows of every
+        group are dispatched first.
+
+            Args:
+                `group_windows` (list): (KeyGroup, list of Window) tuples
+
+            Returns:
+                list of KeyWindow
+    """
+    key_windows = []
+    depth = max((len(windows) for _, windows in group_windows), default=0)
+    for i in range(depth):
+        for group, windows in group_windows:
+            if i < len(windows):
+                key_windows.append(KeyWindow(group, windows[i].since,
+                                             windows[i].until))
+    return key_windows
+
+
+def merge_counts(counts_list) -> dict:
+    """Sums <bucket, count> dicts (e.g. hourly counts of group keys)"""
+    merged = dict()
+    for counts in counts_list:
+        for bucket, count in counts.items():
+            merged[bucket] = merged.get(bucket, 0) + count
+    return merged
+
@@ -0,0 +1,178 @@
+import heapq
+import queue
+import threading
+from contextlib import contextmanager
+
+from collector import Collector, WebDriverException
+from metrics import BROWSER_RESTARTS, log
+
+
+class SessionPool:
+    """
+    Pool of logged-in Collector instances. Collectors are started lazily up
+    to pool size, leased to searches, health-checked before every lease and
+    recycled after a number of page loads. A collector takes the lowest
+    free slot of the pool (`Collector.slot`) that its replacement takes
+    again, so metrics are labelled by a fixed set of workers.
+    """
+
+    _size = None
+    _idle = None
+    _created = 0
+    _closed = False
+
+    def __init__(self, size: int, username: str, password: str, chromePath=None,
+                 recycle_pages=50, capture_network=False, lean_profile=None,
+                 collector_factory=None):
+        """
+            Args:
+                `size` (int): maximum number of alive collectors
+                `username` (str): Twitter account's username
+                `password` (str): Twitter account's password
+                `chromePath` (str): File path of executable chromedriver
+                `recycle_pages` (int): number of page loads after which a
+                    collector is closed and replaced (0 to never recycle)
+                `capture_network` (bool): start collectors that capture
+                    search timeline responses (`'network'` extraction)
+                `lean_profile` (LeanProfile): browser profile of collectors,
+                    see `browserProfile`
+                `collector_factory` (callable): called without arguments to
+                    start a collector instead of a logged-in chrome (e.g. a
+                    Collector over `fakeDriver.FakeDriver` in benchmarks)
+        """
+        self._size = size
+        self._username = username
+        self._password = password
+        self._chromePath = chromePath
+        self._recycle_pages = recycle_pages
+        self._capture_network = capture_network
+        self._lean_profile = lean_profile
+        self._collector_factory = collector_factory
+        self._idle = queue.Queue()
+        self._leased = set()
+        self._free_slots = list(range(size))
+        self._lock = threading.Lock()
+
+    def _start_session(self, slot: int) -> Collector:
+        """Starts and logs in a new collector in `slot`, raises
+        WebDriverException on failure"""
+        try:
+            if self._collector_factory is not None:
+                collector = self._collector_factory()
+            else:
+                collector = Collector(self._username, self._password,
+                                      chromePath=self._chromePath,
+                                      capture_network=self._capture_network,
+                                      lean_profile=self._lean_profile)
+        except Exception:
+            self._forget_session(slot)
+            raise
+        if not collector.is_alive():
+            self._forget_session(slot)
+            raise WebDriverException("Failed to start and login.")
+        collector.slot = slot
+        return collector
+
+    def _forget_session(self, slot: int) -> None:
+        with self._lock:
+            self._created -= 1
+            heapq.heappush(self._free_slots, slot)
+
+    def _discard(self, collector: Collector) -> None:
+        """Closes the collector and frees its slot in the pool"""
+        try:
+            collector.closeAll()
+        except Exception:
+            pass
+        self._forget_session(collector.slot)
+
+    def acquire(self, timeout=None) -> Collector:
+        """
+            Returns a healthy collector. If no idle collector exists and pool
+            is not full a new one is started, otherwise waits for a release.
+
+                Args:
+                    `timeout` (float): seconds to wait for a release
+
+                Raises:
+                    queue.Empty if no collector is released in `timeout`
+                    WebDriverException if a new collector cannot be started
+        """
+        while True:
+            try:
+                collector = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_start = self._created < self._size
+                    if can_start:
+                        self._created += 1
+                        slot = heapq.heappop(self._free_slots)
+                if can_start:
+                    collector = self._start_session(slot)
+                    with self._lock:
+                        self._leased.add(collector)
+                    return collector
+                collector = self._idle.get(timeout=timeout)
+
+            if collector.is_alive():
+                with self._lock:
+                    self._leased.add(collector)
+                return collector
+            log('browser_restart', "Collector is not responding, restarting...",
+                collector=collector.name, reason='unresponsive')
+            BROWSER_RESTARTS.inc(reason='unresponsive')
+            self._discard(collector)
+
+    def release(self, collector: Collector, broken=False) -> None:
+        """
+            Gives the collector back to the pool. Broken, worn out (see
+            `recycle_pages`) collectors and collectors released after the pool
+            is closed are closed instead.
+        """
+        with self._lock:
+            self._leased.discard(collector)
+        worn_out = (self._recycle_pages and
+                    collector.page_count >= self._recycle_pages)
+        if broken or worn_out or self._closed:
+            if not self._closed:
+                BROWSER_RESTARTS.inc(reason='broken' if broken else 'recycle')
+            self._discard(collector)
+        else:
+            self._idle.put(collector)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+            Context manager version of `acquire`/`release`. Collector is
+            released as broken if a WebDriverException is raised in the block.
+        """
+        collector = self.acquire(timeout=timeout)
+        try:
+            yield collector
+        except WebDriverException:
+            self.release(collector, broken=True)
+            raise
+        except BaseException:
+            self.release(collector)
+            raise
+        self.release(collector)
+
+    def stop_leased(self) -> None:
+        """Stops retrieve loops of leased collectors"""
+        with self._lock:
+            leased = list(self._leased)
+        for collector in leased:
+            collector.stop()
+
+    def close(self) -> None:
+        """Closes idle collectors, leased ones are closed on release"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __len__(self):
+        """Returns number of alive collectors"""
+        return self._created
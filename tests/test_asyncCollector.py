@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import os
+import time
+
+from asyncCollector import AsyncCollector, AsyncEngine
+from dbWriter import DBWriter
+from fakeWebDriver import FakeWebDriverServer
+from searchKeys import KeyGroup, KeyWindow, parse_key
+from tweetDB import TweetDB
+
+SINCE = datetime.date(2020, 1, 1)
+UNTIL = datetime.date(2020, 1, 2)
+
+
+def _fast(collector: AsyncCollector) -> AsyncCollector:
+    collector._event_timeout_seconds = 0.01
+    collector._event_settle_seconds = 0
+    return collector
+
+
+async def _collect(server: FakeWebDriverServer, container, checkpoint=None) -> int:
+    url = await server.start()
+    collector = _fast(await AsyncCollector.start(None, None, url=url))
+    try:
+        await collector.search("%24AAPL", tabName='live', from_=SINCE, to_=UNTIL,
+                               pacing='event')
+        return await collector.retrieve_tweets_to_container(
+            "AAPL", container, pacing='event', checkpoint=checkpoint)
+    finally:
+        await collector.closeAll()
+        await server.close()
+
+
+def test_retrieve_tweets_to_container():
+    tweets = []
+    checkpoints = []
+    count = asyncio.run(_collect(FakeWebDriverServer(tweet_count=120),
+                                 tweets, lambda *args: checkpoints.append(args)))
+
+    assert count == 120
+    assert len({tweet.tweet_id for tweet in tweets}) == 120
+    assert all(tweet.searchKey == "AAPL" for tweet in tweets)
+    oldest, completed = checkpoints[-1]
+    assert completed
+    assert oldest.timestamp == min(tweet.timestamp for tweet in tweets)
+
+
+class _SlowContainer(list):
+    """List whose extend blocks like a DBWriter with a full queue"""
+
+    def extend(self, tweets) -> None:
+        time.sleep(0.05)
+        super().extend(tweets)
+
+
+def test_blocking_container_does_not_block_loop():
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        tweets = _SlowContainer()
+        t0 = time.perf_counter()
+        count = await _collect(FakeWebDriverServer(tweet_count=200), tweets)
+        elapsed = time.perf_counter() - t0
+        ticker.cancel()
+        return count, tweets, ticks, elapsed
+
+    count, tweets, ticks, elapsed = asyncio.run(run())
+    assert count == len(tweets) == 200
+    # the ticker keeps running while extend blocks
+    assert ticks > elapsed / 0.005 / 4
+
+
+def test_engine_writes_windows_to_database(tmp_path):
+    database_name = os.path.join(tmp_path, "engine")
+    TweetDB(database_name).create_tables()
+    # a small queue blocks extend of collectors until the writer catches up
+    db_writer = DBWriter(database_name, queue_size=10, batch_size=5,
+                         flush_seconds=0.05)
+    db_writer.start()
+    group = KeyGroup([parse_key("$AAPL")])
+    windows = [KeyWindow(group, SINCE + datetime.timedelta(days=i),
+                         SINCE + datetime.timedelta(days=i + 1)) for i in range(6)]
+
+    async def run():
+        server = FakeWebDriverServer(tweet_count=50)
+        url = await server.start()
+
+        async def start():
+            return _fast(await AsyncCollector.start(None, None, url=url))
+
+        async def task(collector, window):
+            await collector.search(group.query, tabName='live', from_=window.since,
+                                   to_=window.until, pacing='event')
+            return await collector.retrieve_tweets_to_container(
+                group.name, db_writer, pacing='event')
+
+        try:
+            engine = AsyncEngine(start, 3, retry_count=0,
+                                 recycle_pages=0)
+            return await engine.run(windows, task)
+        finally:
+            await server.close()
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        db_writer.close()
+
+    assert [result.status for result in results] == ['done'] * len(windows)
+    assert db_writer.inserted_count == 50 * len(windows)
+    database = TweetDB(database_name)
+    assert sum(1 for _ in database.iter_tweet_ids("AAPL")) == 50 * len(windows)
+    database.close_DB()
@@ -0,0 +1,52 @@
+import shutil
+
+import pytest
+
+from benchmarkSuite import Suite
+from metrics import set_log_format
+from pageParser import close_parser_pool, lxml
+
+CHROMEDRIVER = shutil.which('chromedriver')
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    set_log_format('none')
+    yield
+    close_parser_pool()
+
+
+def _check(results: dict, suite: Suite) -> None:
+    tweets = {name: result['count'] for name, result in results.items()
+              if name.startswith('retrieve_tweets.')}
+    assert set(tweets) >= {'retrieve_tweets.element', 'retrieve_tweets.script'}
+    assert set(tweets.values()) == {suite.tweet_count}
+    assert results['capture']['count'] == suite.tweet_count
+    if lxml is not None:
+        assert results['reparse']['count'] == suite.tweet_count
+
+    assert results['retrieve_writers.element']['count'] == suite.writer_count
+    assert results['retrieve_writers.script']['count'] == suite.writer_count
+    for name in ('scheduler.thread', 'scheduler.async'):
+        assert results[name]['count'] == suite.window_count * suite.tweet_count
+    for result in results.values():
+        assert result['count'] > 0 and result['value'] > 0
+
+
+def test_suite_runs_on_fake_driver():
+    with Suite(tweet_count=60, writer_count=20, db_tweets=500, window_count=4,
+               worker_count=2) as suite:
+        results = suite.run(repeat=1)
+    _check(results, suite)
+    assert results['db.iter_tweets']['count'] == suite.db_tweets
+
+
+@pytest.mark.skipif(CHROMEDRIVER is None, reason="chromedriver is not installed")
+def test_suite_runs_on_chrome():
+    # scripts of `pageScripts` run in the browser on mock twitter pages
+    with Suite(tweet_count=60, writer_count=20, db_tweets=500, window_count=2,
+               worker_count=2, chromePath=CHROMEDRIVER) as suite:
+        results = suite.run(repeat=1, only=['retrieve_', 'capture', 'scheduler.thread'])
+    assert results['retrieve_tweets.script']['count'] == suite.tweet_count
+    assert results['retrieve_writers.script']['count'] == suite.writer_count
+    assert results['scheduler.thread']['count'] == suite.window_count * suite.tweet_count
@@ -0,0 +1,17 @@
+import argparse
+
+import pytest
+
+from browserProfile import DEFAULT_LEAN_PROFILE, lean_profile_from_settings
+from cliArgs import bool_argument
+
+
+def test_lean_profile_on_command_line():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-L', '--lean_profile', type=bool_argument, default=False)
+
+    assert parser.parse_args(['-L', 'False']).lean_profile is False
+    assert lean_profile_from_settings(parser.parse_args(['-L', 'True']).lean_profile) == \
+        DEFAULT_LEAN_PROFILE
+    with pytest.raises(SystemExit):
+        parser.parse_args(['-L', 'maybe'])
@@ -0,0 +1,85 @@
+import random
+import threading
+
+import pytest
+
+from bufferedQue import BufferedQue, SeenIDs
+
+
+def test_buffered_que_returns_oldest_item_when_full():
+    que = BufferedQue(buffer_size=3)
+
+    assert [que.add(i, f"item{i}") for i in range(3)] == [None] * 3
+    # a known id does not move or evict anything
+    assert que.add(0, "again") is None
+    assert que.add(3, "item3") == "item0"
+    assert que.add(4, "item4") == "item1"
+
+    assert que.toList() == ["item2", "item3", "item4"]
+    assert len(que) == que.size() == 3
+    assert que.contains(2) and not que.contains(0)
+    assert que.get(3) == "item3" and que.get(0) is None
+
+
+def test_buffered_que_evicts_in_insertion_order():
+    que = BufferedQue(buffer_size=1000)
+    evicted = [que.add(i, i) for i in range(100000)]
+
+    assert evicted[:1000] == [None] * 1000
+    assert evicted[1000:] == list(range(99000))
+    assert que.toList() == list(range(99000, 100000))
+
+
+def test_seen_ids():
+    seen = SeenIDs([5, 1, 5])
+
+    assert len(seen) == 2
+    assert seen.add(3)
+    assert not seen.add(3)
+    seen.update([1, 7, 9])
+    assert len(seen) == 5
+    assert 7 in seen and seen.contains(9) and 2 not in seen
+
+
+@pytest.mark.parametrize('bucket_bits', [0, 4, 44])
+def test_seen_ids_in_range(bucket_bits):
+    rng = random.Random(bucket_bits)
+    ids = rng.sample(range(1 << 20), 5000)
+    seen = SeenIDs(ids[:2500], bucket_bits=bucket_bits)
+    # ids added out of order after earlier range queries
+    seen.in_range(0, 1 << 20)
+    for item_id in ids[2500:]:
+        seen.add(item_id)
+
+    for _ in range(50):
+        low = rng.randrange(1 << 20)
+        high = low + rng.randrange(1 << 16)
+        assert seen.in_range(low, high) == sorted(i for i in ids if low <= i < high)
+    assert seen.in_range(0, 1 << 20) == sorted(ids)
+    assert seen.in_range(10, 10) == [] and seen.in_range(10, 5) == []
+
+
+def test_seen_ids_range_bounds_between_buckets():
+    seen = SeenIDs([15, 16, 31, 32, 1000], bucket_bits=4)
+
+    assert seen.in_range(16, 32) == [16, 31]
+    assert seen.in_range(15, 33) == [15, 16, 31, 32]
+    # a range much wider than stored buckets
+    assert seen.in_range(0, 1 << 60) == [15, 16, 31, 32, 1000]
+
+
+def test_seen_ids_shared_by_threads():
+    seen = SeenIDs()
+    added = []
+
+    def add(start):
+        added.append(sum(seen.add(i) for i in range(start, start + 2000)))
+
+    threads = [threading.Thread(target=add, args=(start,)) for start in (0, 1000, 2000)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(added) == len(seen) == 4000
+    assert seen.in_range(0, 4000) == list(range(4000))
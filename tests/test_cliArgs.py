@@ -0,0 +1,18 @@
+import argparse
+
+import pytest
+
+from cliArgs import bool_argument
+
+
+@pytest.mark.parametrize('text, value', [('True', True), ('true', True), ('1', True),
+                                         (' yes ', True), ('False', False),
+                                         ('false', False), ('0', False), ('off', False)])
+def test_bool_argument(text, value):
+    assert bool_argument(text) is value
+
+
+@pytest.mark.parametrize('text', ['', 'maybe', '2'])
+def test_bool_argument_rejects_other_values(text):
+    with pytest.raises(argparse.ArgumentTypeError):
+        bool_argument(text)
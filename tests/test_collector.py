@@ -0,0 +1,93 @@
+import datetime
+
+import pytest
+
+from bufferedQue import SeenIDs
+from collector import Collector
+from fakeDriver import FakeDriver
+from fakeWebDriver import FakeSearchPage
+from metrics import set_log_format
+from pageArchive import PageArchive, read_archive
+from pageParser import lxml, tweets_from_html
+from pageScripts import window_tweet_ids
+
+SINCE = datetime.date(2020, 1, 1)
+UNTIL = datetime.date(2020, 1, 2)
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    set_log_format('none')
+
+
+def _collector() -> Collector:
+    collector = Collector.with_driver(FakeDriver(tweet_count=75))
+    collector._Ssleep_seconds = 0
+    collector.search("$AAPL", tabName='live', from_=SINCE, to_=UNTIL, pacing='event')
+    return collector
+
+
+@pytest.mark.parametrize('pacing', ['event', 'sleep'])
+def test_capture_to_archive(tmp_path, pacing):
+    archive = PageArchive(str(tmp_path), "$AAPL", SINCE, UNTIL)
+    checkpoints = []
+    count = _collector().capture_to_archive(
+        archive, pacing=pacing,
+        checkpoint=lambda oldest, finished: checkpoints.append((oldest, finished)))
+
+    _, snapshots = read_archive(archive.path)
+    assert count == 75
+    assert sum(len(nodes) for nodes in snapshots) == 75
+    assert archive.snapshot_count == len(snapshots)
+    assert checkpoints == [(None, True)]
+
+    if lxml is not None:
+        tweets = []
+        _collector().retrieve_tweets_to_container("$AAPL", tweets,
+                                                  extraction='script', pacing='event')
+        parsed = [tweet for nodes in snapshots
+                  for tweet in tweets_from_html("".join(nodes), "$AAPL", 'en')]
+        assert sorted(tweet.tweet_id for tweet in parsed) == sorted(
+            tweet.tweet_id for tweet in tweets)
+
+
+def test_capture_needs_html_callback():
+    with pytest.raises(ValueError):
+        _collector()._retrieve_tweets("$AAPL", None, None, extraction='capture')
+
+
+def test_known_tweets_are_returned_by_id(monkeypatch):
+    seen = SeenIDs()
+    tweets = []
+    _collector().retrieve_tweets_to_container("$AAPL", tweets, extraction='script',
+                                              pacing='event', seen=seen)
+    assert len(seen) == 75
+
+    extracted = []
+    extract = FakeSearchPage.extract
+
+    def recorded_extract(page, known_ids):
+        result = extract(page, known_ids)
+        extracted.extend(result)
+        return result
+
+    monkeypatch.setattr(FakeSearchPage, 'extract', recorded_extract)
+    again = []
+    count = _collector().retrieve_tweets_to_container(
+        "$AAPL", again, extraction='script', pacing='event', seen=seen)
+
+    assert count == 0 and again == []
+    # seen tweets of the window are known to the page, their fields are not read
+    assert len(extracted) == 75
+    assert all(set(raw) == {'status'} for raw in extracted)
+
+
+def test_window_tweet_ids():
+    tweets = FakeSearchPage(f"/search?q=$AAPL since:{SINCE} until:{UNTIL}", 20, 20, 1).tweets
+    later = FakeSearchPage("/search?q=$AAPL since:2020-01-05 until:2020-01-06", 20, 20, 1).tweets
+    ids = [int(tweet['status'].rsplit('/', 1)[1]) for tweet in tweets + later]
+    seen = SeenIDs(ids)
+
+    assert sorted(window_tweet_ids(seen, SINCE, UNTIL)) == sorted(ids[:20])
+    assert window_tweet_ids(seen, None, None) == []
+    assert window_tweet_ids(None, SINCE, UNTIL) == []
@@ -0,0 +1,142 @@
+import datetime
+import os
+import sqlite3
+import time
+
+import pytest
+
+from dbWriter import DBWriter, DBWriterError
+from metrics import set_log_format
+from tweet import Tweet
+from tweetDB import TweetDB, WindowProgress
+
+SINCE = datetime.date(2020, 1, 1)
+UNTIL = datetime.date(2020, 1, 2)
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    set_log_format('none')
+
+
+@pytest.fixture
+def database_name(tmp_path):
+    database_name = os.path.join(tmp_path, "writer")
+    TweetDB(database_name).create_tables()
+    return database_name
+
+
+def _tweets(count: int, start=0) -> list:
+    return [Tweet(tweet_id, 'writer', 1577836800 + tweet_id, 'body', searchKey="$AAPL")
+            for tweet_id in range(start, start + count)]
+
+
+def _wait_for(condition, seconds=5.0) -> bool:
+    deadline = time.time() + seconds
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _stored_ids(database_name: str) -> list:
+    database = TweetDB(database_name)
+    try:
+        return sorted(database.iter_tweet_ids())
+    finally:
+        database.close_DB()
+
+
+def test_tweets_are_committed_in_batches(database_name):
+    db_writer = DBWriter(database_name, batch_size=10, flush_seconds=60)
+    db_writer.start()
+    db_writer.extend(_tweets(25))
+
+    assert _wait_for(lambda: db_writer.inserted_count == 20)
+    # the last partial batch waits for `flush_seconds`
+    time.sleep(0.1)
+    assert db_writer.inserted_count == 20
+
+    db_writer.sync()
+    assert db_writer.inserted_count == 25
+    db_writer.extend(_tweets(10, start=20))
+    db_writer.close()
+    assert (db_writer.inserted_count, db_writer.duplicate_count) == (30, 5)
+    assert _stored_ids(database_name) == list(range(30))
+
+
+def test_partial_batch_is_committed_after_flush_seconds(database_name):
+    db_writer = DBWriter(database_name, batch_size=1000, flush_seconds=0.1)
+    db_writer.start()
+    db_writer.extend(_tweets(5))
+
+    assert _wait_for(lambda: db_writer.inserted_count == 5)
+    assert _stored_ids(database_name) == list(range(5))
+    db_writer.close()
+
+
+def test_locked_database_is_retried(database_name, monkeypatch):
+    insert_tweets = TweetDB.insert_tweets
+    calls = []
+
+    def locked_once(database, tweets):
+        calls.append(len(tweets))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return insert_tweets(database, tweets)
+
+    monkeypatch.setattr(TweetDB, 'insert_tweets', locked_once)
+    db_writer = DBWriter(database_name, retry_count=1)
+    db_writer.start()
+    db_writer.extend(_tweets(5))
+    db_writer.put_progress(WindowProgress("$AAPL", SINCE, UNTIL, 1577836800, 0, True))
+    db_writer.close()
+
+    assert calls == [5, 5]
+    assert db_writer.inserted_count == 5
+    database = TweetDB(database_name)
+    assert database.get_window_progress("$AAPL", SINCE, UNTIL).completed
+    database.close_DB()
+
+
+def test_sync_raises_when_tweets_are_lost(database_name, monkeypatch):
+    def locked(database, tweets):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(TweetDB, 'insert_tweets', locked)
+    db_writer = DBWriter(database_name, retry_count=0)
+    db_writer.start()
+    db_writer.extend(_tweets(5))
+    db_writer.put_progress(WindowProgress("$AAPL", SINCE, UNTIL, 1577836800, 0, True))
+
+    with pytest.raises(DBWriterError) as error:
+        db_writer.sync()
+    assert isinstance(error.value.__cause__, sqlite3.OperationalError)
+    with pytest.raises(DBWriterError):
+        db_writer.flush()
+    with pytest.raises(DBWriterError):
+        db_writer.close()
+
+    # progress of lost tweets is not recorded
+    database = TweetDB(database_name)
+    assert database.get_window_progress("$AAPL", SINCE, UNTIL) is None
+    database.close_DB()
+
+
+def test_waits_fail_when_database_cannot_be_opened(tmp_path):
+    db_writer = DBWriter(os.path.join(tmp_path, "missing", "writer"), queue_size=2)
+    db_writer.start()
+    db_writer.join(5)
+    assert not db_writer.is_alive()
+
+    # a full queue of a stopped writer does not block callers
+    with pytest.raises(DBWriterError):
+        db_writer.extend(_tweets(5))
+    with pytest.raises(DBWriterError):
+        db_writer.sync()
+    with pytest.raises(DBWriterError):
+        db_writer.flush()
+    with pytest.raises(DBWriterError) as error:
+        db_writer.close()
+    assert isinstance(error.value.__cause__, sqlite3.OperationalError)
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from exporter import export_table
+from tweet import Tweet
+from tweetDB import TweetDB
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POST_DATE = 1596016790
+
+
+def _version_0_database(path: str) -> None:
+    """Creates a database as version 0 stored it on a machine at UTC+3"""
+    database = TweetDB(path)
+    database.create_tables()
+    database.insert_tweets([Tweet(1, "mwatcher", POST_DATE, "$AAPL up", ("AAPL",))])
+    with database.conn:
+        database.c.execute("UPDATE Tweet SET post_date = post_date - 3 * 3600")
+        database.c.execute("PRAGMA user_version=0")
+    database.close_DB()
+
+
+def test_export_refuses_local_time_database(tmp_path):
+    _version_0_database(str(tmp_path / "old"))
+    database = TweetDB(str(tmp_path / "old"))
+    try:
+        with pytest.raises(ValueError):
+            export_table(database, 'Tweet', str(tmp_path / "Tweet.jsonl"),
+                         export_format='jsonl', compression='none')
+    finally:
+        database.close_DB()
+
+
+def test_exporter_migrates_database(tmp_path):
+    _version_0_database(str(tmp_path / "old"))
+    subprocess.run([sys.executable, os.path.join(REPO, "exporter.py"), '-i', "old",
+                    '-o', "export", '-f', 'jsonl', '-c', 'none'],
+                   cwd=str(tmp_path), env=dict(os.environ, TZ='Etc/GMT-3'),
+                   check=True, capture_output=True)
+
+    with open(tmp_path / "export" / "Tweet.jsonl") as export_file:
+        tweets = [json.loads(line) for line in export_file]
+    assert [tweet['post_date'] for tweet in tweets] == [POST_DATE]
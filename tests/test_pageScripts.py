@@ -0,0 +1,167 @@
+import datetime
+import glob
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import pageScripts
+from bufferedQue import SeenIDs
+from collector import Collector
+from pageParser import profile_from_html
+from replayServer import PROFILE_FIXTURES, TIMELINE_FIXTURES, ReplayServer
+from timelineParser import parse_timeline
+from tweetDB import UnreachableWriter
+
+NODE = shutil.which('node')
+CHROMEDRIVER = shutil.which('chromedriver')
+
+SCRIPTS = sorted(name for name in dir(pageScripts) if name.endswith('_SCRIPT'))
+PROFILES = sorted(os.path.basename(path)[:-len(".html")] for path in
+                  glob.glob(os.path.join(PROFILE_FIXTURES, "*.html")))
+
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+@pytest.mark.parametrize('name', SCRIPTS)
+def test_script_compiles(name):
+    # scripts are run as bodies of a function by execute_script
+    compiled = subprocess.run(
+        [NODE, '-e', "new Function(require('fs').readFileSync(0, 'utf8'))"],
+        input=getattr(pageScripts, name), capture_output=True, text=True)
+    assert compiled.returncode == 0, compiled.stderr
+
+
+# Minimal document of tweet nodes for EXTRACT_TWEETS_SCRIPT: a tweet is an
+# object of <relative xpath, field node>, nodes are read with `evaluate`
+_FAKE_DOCUMENT = """
+var XPathResult = {FIRST_ORDERED_NODE_TYPE: 9, ORDERED_NODE_SNAPSHOT_TYPE: 7};
+function Node(text, attributes) {
+    this.innerText = text;
+    this.attributes = attributes || {};
+}
+Node.prototype.getAttribute = function (name) {
+    return name in this.attributes ? this.attributes[name] : null;
+};
+Node.prototype.setAttribute = function (name, value) {
+    this.attributes[name] = value;
+};
+var window = {}, tweets = [];
+var document = {evaluate: function (xpath, context, resolver, type) {
+    if (context === document) {
+        return {snapshotLength: tweets.length,
+                snapshotItem: function (i) { return tweets[i]; }};
+    }
+    return {singleNodeValue: context.fields[xpath] || null};
+}};
+function tweet(id, fields) {
+    var node = new Node(null);
+    node.fields = {};
+    node.fields[STATUS] = new Node(null, {});
+    node.fields[STATUS].href = 'https://twitter.com/user/status/' + id;
+    for (var xpath in fields) {
+        node.fields[xpath] = fields[xpath];
+    }
+    return node;
+}
+"""
+
+
+def _run_extract(steps: str) -> list:
+    """Runs EXTRACT_TWEETS_SCRIPT on the fake document after each step of
+    `steps` (javascript statements separated by ';;'), returns results"""
+    args = json.dumps(list(pageScripts.extract_tweets_args('en')))
+    program = (f"var STATUS = {json.dumps(pageScripts.STATUS_XPATH)};" + _FAKE_DOCUMENT +
+               f"var extract = new Function({json.dumps(pageScripts.EXTRACT_TWEETS_SCRIPT)});"
+               "var results = [];" +
+               "".join(f"{step}; results.push(JSON.parse(extract.apply(null, {args})));"
+                       for step in steps.split(";;")) +
+               "console.log(JSON.stringify(results));")
+    run = subprocess.run([NODE, '-e', program], capture_output=True, text=True)
+    assert run.returncode == 0, run.stderr
+    return json.loads(run.stdout)
+
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+def test_extract_script_reads_incomplete_tweets_again():
+    writer, time, body = (json.dumps(xpath) for xpath in (
+        pageScripts.WRITER_XPATH, pageScripts.TIME_XPATH,
+        pageScripts.BODY_XPATH.format(lang='en')))
+    complete = (f"{{[{writer}]: new Node('@user'), [{time}]: new Node(null, "
+                f"{{datetime: '2020-01-01T00:00:00.000Z'}}), [{body}]: new Node('text')}}")
+    results = _run_extract(
+        # body of the second tweet is not rendered yet
+        f"tweets.push(tweet(1, {complete}), tweet(2, {complete}));"
+        f"delete tweets[1].fields[{body}] ;;"
+        # body is rendered by the next call
+        f"tweets[1].fields[{body}] = new Node('late text') ;;"
+        # a new tweet without writer and time
+        f"tweets.push(tweet(3, {{[{body}]: new Node('text')}}))")
+
+    assert [[tweet['status'][-1] for tweet in result] for result in results] == [
+        ['1', '2'], ['2'], ['3']]
+    assert results[0][1]['body'] is None
+    assert results[1][0]['body'] == 'late text'
+    assert results[2][0]['writer'] is None and results[2][0]['datetime'] is None
+
+
+def _fixture_ids(lang=None) -> set:
+    tweet_ids = set()
+    for path in glob.glob(os.path.join(TIMELINE_FIXTURES, "*.json")):
+        with open(path) as response_file:
+            tweet_ids.update(tweet.tweet_id for tweet in
+                             parse_timeline(response_file.read(), lang=lang)[0])
+    return tweet_ids
+
+
+@pytest.fixture(scope='module')
+def replay_collector():
+    server = ReplayServer()
+    base_url = server.start()[:-len("search")]
+    collector = Collector(None, None, chromePath=CHROMEDRIVER, base_url=base_url)
+    yield collector
+    collector.closeAll()
+    server.close()
+
+
+@pytest.mark.skipif(CHROMEDRIVER is None, reason="chromedriver is not installed")
+@pytest.mark.parametrize('extraction', ['element', 'script', 'lxml'])
+def test_tweet_scripts_on_replayed_search(replay_collector, extraction):
+    replay_collector.search("$AAPL", tabName='live', pacing='event')
+    tweets = []
+    replay_collector.retrieve_tweets_to_container("$AAPL", tweets,
+                                                  extraction=extraction,
+                                                  pacing='event')
+    tweet_ids = [tweet.tweet_id for tweet in tweets]
+
+    assert len(tweet_ids) == len(set(tweet_ids))
+    assert _fixture_ids(lang='en') <= set(tweet_ids) <= _fixture_ids()
+
+
+@pytest.mark.skipif(CHROMEDRIVER is None, reason="chromedriver is not installed")
+def test_known_tweets_on_replayed_search(replay_collector):
+    replay_collector.search("$AAPL", tabName='live', from_=datetime.date(2020, 7, 29),
+                            to_=datetime.date(2020, 7, 30), pacing='event')
+    tweets = []
+    replay_collector.retrieve_tweets_to_container(
+        "$AAPL", tweets, extraction='script', pacing='event',
+        seen=SeenIDs(_fixture_ids()))
+
+    assert tweets == []
+
+
+@pytest.mark.skipif(CHROMEDRIVER is None, reason="chromedriver is not installed")
+@pytest.mark.parametrize('user_id', PROFILES)
+def test_profile_script_on_replayed_profiles(replay_collector, user_id):
+    with open(os.path.join(PROFILE_FIXTURES, user_id + ".html")) as profile_file:
+        expected = replay_collector._writer_from_profile(
+            user_id, profile_from_html(profile_file.read(), user_id))
+
+    writer = replay_collector.retrieve_writer(user_id, pacing='event',
+                                              extraction='script')
+    if isinstance(expected, UnreachableWriter):
+        assert writer == expected
+    else:
+        assert ([getattr(writer, name) for name in writer.__slots__] ==
+                [getattr(expected, name) for name in expected.__slots__])
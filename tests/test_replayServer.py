@@ -0,0 +1,122 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from collector import Collector
+from pageParser import profile_from_html
+from replayServer import ReplayServer
+from timelineParser import parse_timeline
+from tweetDB import UnreachableWriter
+
+
+@pytest.fixture(scope='module')
+def server_url():
+    server = ReplayServer()
+    url = server.start()
+    yield url.rsplit('/', 1)[0]
+    server.close()
+
+
+def _get(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=10) as response:
+        return response.read()
+
+
+def _timeline(server_url: str, page: int, lang=None) -> tuple:
+    return parse_timeline(
+        _get(f"{server_url}/i/api/2/search/adaptive.json?page={page}"), lang=lang)
+
+
+def _writer(server_url: str, user_id: str):
+    profile = profile_from_html(_get(f"{server_url}/{user_id}").decode(), user_id)
+    return Collector.with_driver(None)._writer_from_profile(user_id, profile)
+
+
+def test_adaptive_timeline(server_url):
+    tweets, writers = _timeline(server_url, 0)
+
+    assert [tweet.tweet_id for tweet in tweets] == [
+        1288400000000000009, 1288400000000000008,
+        1288400000000000007, 1288400000000000006]
+    tweet = tweets[0]
+    assert tweet.writer == 'mwatcher'
+    assert tweet.timestamp == 1596016790
+    assert tweet.body == '$AAPL breaking out above resistancewatching 400'
+    assert (tweet.comment_num, tweet.retweet_num, tweet.like_num) == (12, 1234, 45678)
+    assert len(_timeline(server_url, 0, lang='en')[0]) == 3
+
+    assert [writer.user_id for writer in writers] == ['mwatcher', 'quiettrader', 'Twitter']
+    writer = writers[0]
+    assert writer.username == 'Market Watcher'
+    assert (writer.following, writer.follower, writer.tweet_count) == (611, 12873, 40213)
+    assert writer.bio_text == 'Charts.Not advice.'
+    assert writer.location == 'New York, NY'
+    assert writer.website is None
+    assert (writer.joined.tm_year, writer.joined.tm_mon) == (2012, 3)
+
+
+def test_later_pages(server_url):
+    tweets, writers = _timeline(server_url, 1)
+    assert [tweet.tweet_id for tweet in tweets] == [1288400000000000005,
+                                                    1288400000000000004]
+    assert [writer.user_id for writer in writers] == ['quiettrader', 'Twitter']
+    assert writers[1].website == 'about.twitter.com'
+
+    # graphql response of the same search
+    tweets, writers = _timeline(server_url, 2)
+    assert [tweet.tweet_id for tweet in tweets] == [
+        1288400000000000009, 1288400000000000008, 1288400000000000005]
+    assert [writer.user_id for writer in writers] == ['mwatcher', 'quiettrader']
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(f"{server_url}/i/api/2/search/adaptive.json?page=3")
+    assert error.value.code == 404
+
+
+def test_rendered_tweets_match_timeline(server_url):
+    rendered = json.loads(_get(f"{server_url}/rendered?page=0"))
+    tweets, _ = _timeline(server_url, 0)
+
+    assert [int(tweet['tweet_id']) for tweet in rendered] == [
+        tweet.tweet_id for tweet in tweets]
+    assert rendered[0]['datetime'] == time.strftime(
+        "%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(1596016790))
+    assert [tweet['lang'] for tweet in rendered] == ['en', 'en', 'en', 'und']
+    assert (rendered[0]['reply'], rendered[0]['retweet'], rendered[0]['like']) == (
+        12, 1234, 45678)
+
+
+def test_profiles(server_url):
+    writer = _writer(server_url, 'jack')
+    assert writer.username == 'jack'
+    assert (writer.following, writer.follower, writer.tweet_count) == (4541, 6447163, 28100)
+    assert writer.bio_text == '#setmyrefundsfree Bitcoin'
+    assert writer.location == 'California, USA'
+    assert writer.website == 'primal.net'
+    assert (writer.born.tm_year, writer.born.tm_mon, writer.born.tm_mday) == (1976, 11, 19)
+    assert (writer.joined.tm_year, writer.joined.tm_mon) == (2006, 3)
+
+    writer = _writer(server_url, 'stocknews')
+    assert writer.username == 'Stock News'
+    assert (writer.following, writer.follower, writer.tweet_count) == (1024, 250311, 1500000)
+    assert writer.location == 'New York'
+    assert writer.website == 'stocknews.example'
+    assert (writer.born.tm_mon, writer.born.tm_mday) == (5, 4)
+
+    writer = _writer(server_url, 'quiettrader')
+    assert writer.username == 'Quiet Trader'
+    assert (writer.following, writer.follower, writer.tweet_count) == (87, 12, 312)
+    assert writer.bio_text is None and writer.location is None and writer.website is None
+    assert (writer.joined.tm_year, writer.joined.tm_mon) == (2019, 7)
+
+
+def test_unreachable_profiles(server_url):
+    assert _writer(server_url, 'deleteduser') == UnreachableWriter('deleteduser', 'existance')
+    assert _writer(server_url, 'suspendeduser').status == 'suspended'
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        _get(f"{server_url}/unknownuser")
+    assert error.value.code == 404
@@ -0,0 +1,118 @@
+import datetime
+import threading
+import time
+
+import pytest
+
+from leaseTable import LeaseTable, WorkItem
+from scheduler import Scheduler, Window
+
+SINCE = datetime.date(2020, 1, 1)
+
+
+def _items(count: int) -> list:
+    return [WorkItem("AAPL", SINCE + datetime.timedelta(days=i),
+                     SINCE + datetime.timedelta(days=i + 1)) for i in range(count)]
+
+
+def test_run_windows():
+    windows = [Window(item.since, item.until) for item in _items(10)]
+    results = Scheduler(lambda window: window.since.day, 3).run(windows)
+
+    assert sorted(result.value for result in results) == list(range(1, 11))
+    assert {result.status for result in results} == {'done'}
+
+
+def test_source_is_claimed_while_a_window_is_running():
+    table = LeaseTable(lease_seconds=60)
+    table.add(_items(20))
+    slow = _items(1)[0]
+    release_slow = threading.Event()
+    claimed_during_slow = []
+
+    def task(window):
+        if window.since == slow.since:
+            release_slow.wait(5)
+        return 1
+
+    def source(count):
+        items = table.claim("node", count)
+        if not release_slow.is_set() and items:
+            claimed_during_slow.extend(items)
+            if table.counts()['pending'] == 0:
+                release_slow.set()
+        if items:
+            return [Window(item.since, item.until) for item in items]
+        return None if table.finished() else []
+
+    def on_result(result):
+        table.complete("node", WorkItem("AAPL", result.window.since,
+                                        result.window.until))
+
+    t0 = time.time()
+    results = Scheduler(task, 2).run([], on_result=on_result, source=source,
+                                     poll_seconds=0.01)
+
+    assert len(results) == 20
+    assert table.finished()
+    assert table.counts()['done'] == 20
+    # the other worker collected every window while the slow one was running
+    assert len(claimed_during_slow) == 20
+    assert time.time() - t0 < 5
+
+
+def test_expired_lease_is_claimed_by_another_node():
+    table = LeaseTable(lease_seconds=0.05, max_attempts=2)
+    table.add(_items(2))
+    lost = table.claim("lost", 2)
+    assert table.claim("node", 2) == []
+
+    time.sleep(0.1)
+    claimed = table.claim("node", 2)
+    assert claimed == lost
+    assert table.heartbeat("lost", lost) == lost
+    assert not table.complete("lost", lost[0])
+    assert table.complete("node", lost[1])
+    assert table.counts()['done'] == 2
+
+
+def test_failing_source_cancels_run():
+    started = threading.Event()
+    cancelled = []
+
+    def task(window):
+        started.set()
+        time.sleep(0.05)
+        return 1
+
+    def source(count):
+        started.wait(5)
+        raise RuntimeError("database is locked")
+
+    windows = [Window(item.since, item.until) for item in _items(10)]
+    scheduler = Scheduler(task, 2, on_cancel=lambda: cancelled.append(True))
+    t0 = time.time()
+    with pytest.raises(RuntimeError):
+        scheduler.run(windows, source=source)
+
+    # workers stopped instead of running queued windows
+    assert cancelled == [True]
+    assert time.time() - t0 < 0.5
+
+
+def test_failing_on_result_cancels_run():
+    ran = []
+
+    def task(window):
+        ran.append(window)
+        time.sleep(0.02)
+        return 1
+
+    def on_result(result):
+        raise ValueError(result.window)
+
+    windows = [Window(item.since, item.until) for item in _items(10)]
+    scheduler = Scheduler(task, 1)
+    with pytest.raises(ValueError):
+        scheduler.run(windows, on_result=on_result)
+    assert len(ran) < 10
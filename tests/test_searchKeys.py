@@ -0,0 +1,85 @@
+import datetime
+
+import pytest
+
+from searchKeys import (MAX_LABEL_LENGTH, KeyGroup, group_keys, keys_label,
+                        merge_counts, parse_key, recorded_groups)
+
+DAY_1 = datetime.date(2020, 1, 1)
+DAY_2 = datetime.date(2020, 1, 2)
+
+
+def _keys(*texts) -> list:
+    return [parse_key(text) for text in texts]
+
+
+@pytest.mark.parametrize('keys, keys_file, expected', [
+    (_keys("$AAPL"), None, "AAPL"),
+    (_keys("tesla motors"), None, "tesla motors"),
+    (_keys("http://a.b/c:d"), None, "http-a.b-c-d"),
+    (_keys("$AAPL", "$MSFT"), "/data/bist 30.txt", "bist 30"),
+])
+def test_keys_label(keys, keys_file, expected):
+    assert keys_label(keys, keys_file) == expected
+
+
+def test_label_of_many_keys_is_short_and_safe():
+    keys = _keys(*[f"$KEY{i}" for i in range(500)], "a/b:c")
+    label = keys_label(keys)
+
+    assert label.startswith("KEY0+500-")
+    assert len(label.encode()) < 255 and '/' not in label and ':' not in label
+    # same keys have the same label, other keys another one
+    assert keys_label(_keys(*[f"$KEY{i}" for i in range(500)], "a/b:c")) == label
+    assert keys_label(keys[:-1] + _keys("$a/b:c")) != label
+    assert len(keys_label(_keys("x" * 300))) == MAX_LABEL_LENGTH
+
+
+def test_group_keys_first_fit_from_busiest_key():
+    keys = _keys("$A", "$B", "$C", "$D", "$NEW")
+    counts = {"A": {DAY_1: 60}, "B": {DAY_1: 50}, "C": {DAY_1: 30}, "D": {DAY_1: 45}}
+    groups = group_keys(keys, counts, 100)
+
+    assert [group.name for group in groups] == ["A|C", "B|D", "NEW"]
+
+
+@pytest.mark.parametrize('counts, max_tweets, max_keys, expected', [
+    # busy days of keys do not overlap
+    ({"A": {DAY_1: 80}, "B": {DAY_2: 80}}, 100, 10, ["A|B"]),
+    ({"A": {DAY_1: 80}, "B": {DAY_1: 80}}, 100, 10, ["A", "B"]),
+    ({"A": {DAY_1: 1}, "B": {DAY_1: 1}, "C": {DAY_1: 1}}, 100, 2, ["A|B", "C"]),
+    # grouping is disabled
+    ({"A": {DAY_1: 1}, "B": {DAY_1: 1}}, 0, 10, ["A", "B"]),
+    ({"A": {DAY_1: 1}, "B": {DAY_1: 1}}, 100, 1, ["A", "B"]),
+])
+def test_group_keys_limits(counts, max_tweets, max_keys, expected):
+    groups = group_keys(_keys(*counts), counts, max_tweets, max_keys=max_keys)
+    assert [group.name for group in groups] == expected
+
+
+@pytest.mark.parametrize('body, expected', [
+    ("$AAPL breaking out", ("AAPL",)),
+    ("$aapl and #Apple", ("AAPL", "apple")),
+    ("Tim said Cook is $AAPL", ("AAPL", "tim cook")),
+    # key text inside another word is not a match, every key is attributed
+    ("$AAPLX pineapple #apples timcook", ("AAPL", "apple", "tim cook")),
+])
+def test_group_match(body, expected):
+    group = KeyGroup([parse_key("$AAPL"), parse_key("#apple"),
+                      parse_key("tim cook", search_as='word')])
+
+    assert group.match(body) == expected
+    assert group.query == "(%24AAPL OR %23apple OR (tim cook))"
+    assert KeyGroup([parse_key("$AAPL")]).match(body) == ("AAPL",)
+
+
+def test_recorded_groups():
+    keys = _keys("$A", "$B", "$C")
+    groups = recorded_groups(keys, ["A|B", "B|C", "C", "D|A"])
+
+    assert [group.name for group in groups] == ["A|B", "C"]
+
+
+def test_merge_counts():
+    assert merge_counts([{DAY_1: 1, DAY_2: 2}, {DAY_2: 3}, {}]) == {DAY_1: 1, DAY_2: 5}
+    assert merge_counts([]) == {}
@@ -0,0 +1,109 @@
+import datetime
+import functools
+import threading
+import time
+
+import pytest
+
+from collector import Collector
+from fakeDriver import FakeDriver
+from metrics import BROWSER_RESTARTS, TWEETS_COLLECTED, set_log_format
+from sessionPool import SessionPool
+
+SINCE = datetime.date(2020, 1, 1)
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    set_log_format('none')
+
+
+def _collector(**driver_options) -> Collector:
+    collector = Collector.with_driver(FakeDriver(**{'tweet_count': 20, **driver_options}))
+    collector._Ssleep_seconds = 0
+    return collector
+
+
+def _search(collector: Collector) -> int:
+    collector.search("$AAPL", tabName='live', from_=SINCE,
+                     to_=SINCE + datetime.timedelta(days=1), pacing='event')
+    return collector.retrieve_tweets_to_container("$AAPL", [], pacing='event')
+
+
+def test_recycled_collectors_keep_worker_slots():
+    pool = SessionPool(2, None, None, recycle_pages=1, collector_factory=_collector)
+    names = set()
+    collected = TWEETS_COLLECTED.value(worker=1)
+    for _ in range(3):
+        first = pool.acquire()
+        second = pool.acquire()
+        names.update((first.name, second.name))
+        assert (first.slot, second.slot) == (0, 1)
+        _search(second)
+        pool.release(first)
+        pool.release(second)
+
+    # every recycle started a new collector, metrics stay on two workers
+    assert len(names) == 4
+    assert TWEETS_COLLECTED.value(worker=1) - collected == 60
+    pool.close()
+
+
+def test_unresponsive_collector_is_replaced_on_acquire(monkeypatch):
+    pool = SessionPool(1, None, None, collector_factory=_collector)
+    collector = pool.acquire()
+    pool.release(collector)
+    restarts = BROWSER_RESTARTS.value(reason='unresponsive')
+
+    def hang(script, *args):
+        raise TimeoutError(script)
+    monkeypatch.setattr(collector._driver, 'execute_script', hang)
+    replacement = pool.acquire()
+
+    assert replacement is not collector and replacement.slot == collector.slot
+    assert replacement.is_alive() and len(pool) == 1
+    assert BROWSER_RESTARTS.value(reason='unresponsive') - restarts == 1
+    pool.release(replacement)
+    pool.close()
+
+
+def test_collectors_are_recycled_after_page_loads():
+    pool = SessionPool(1, None, None, recycle_pages=2, collector_factory=_collector)
+    recycles = BROWSER_RESTARTS.value(reason='recycle')
+    collector = pool.acquire()
+    _search(collector)
+    pool.release(collector)
+
+    # still below recycle_pages
+    assert pool.acquire() is collector
+    _search(collector)
+    pool.release(collector)
+
+    replacement = pool.acquire()
+    assert replacement is not collector and replacement.page_count == 0
+    assert BROWSER_RESTARTS.value(reason='recycle') - recycles == 1
+    assert len(pool) == 1
+    pool.release(replacement)
+    pool.close()
+
+
+def test_stop_leased_stops_running_retrieve():
+    pool = SessionPool(2, None, None, collector_factory=functools.partial(
+        _collector, tweet_count=100000, latency=0.001))
+    collector = pool.acquire()
+    collector.search("$AAPL", tabName='live', from_=SINCE,
+                     to_=SINCE + datetime.timedelta(days=1), pacing='event')
+    counts = []
+    thread = threading.Thread(target=lambda: counts.append(
+        collector.retrieve_tweets_to_container("$AAPL", [], pacing='event')))
+    thread.start()
+    while not collector._process:
+        time.sleep(0.001)
+
+    pool.stop_leased()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert counts and counts[0] < 100000
+    pool.release(collector)
+    pool.close()
@@ -0,0 +1,69 @@
+import calendar
+import datetime
+import time
+
+import pytest
+
+from tweet import Tweet, iso_to_timestamp
+from writer import Writer
+
+
+def _strptime_seconds(text: str) -> int:
+    return calendar.timegm(time.strptime(text[:19], "%Y-%m-%dT%H:%M:%S"))
+
+
+@pytest.mark.parametrize('text', [
+    "1970-01-01T00:00:00.000Z",
+    "1969-12-31T23:59:59.000Z",
+    "2000-02-29T12:00:00.000Z",
+    "2020-03-01T00:00:00.000Z",
+    "2020-07-29T09:59:50.000Z",
+    "2100-03-01T00:00:00.000Z",
+    "2023-12-31T23:59:59Z",
+])
+def test_iso_to_timestamp(text):
+    assert iso_to_timestamp(text) == _strptime_seconds(text)
+
+
+def test_iso_to_timestamp_of_every_day():
+    day = datetime.datetime(1999, 12, 25, 13, 14, 15)
+    for _ in range(3 * 366):
+        text = day.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        assert iso_to_timestamp(text) == _strptime_seconds(text), text
+        day += datetime.timedelta(days=1)
+
+
+def test_tweet_post_date():
+    post_date = time.gmtime(1596016790)
+    tweet = Tweet(1, "writer", post_date, "body")
+
+    assert tweet.timestamp == 1596016790
+    assert tweet.post_date == post_date
+    assert Tweet(1, "writer", 1596016790, "body").post_date == post_date
+    with pytest.raises(TypeError):
+        Tweet(1, "writer", "2020-07-29", "body")
+
+
+@pytest.mark.parametrize('record', [
+    Tweet(1, "writer", 0, "body"),
+    Writer("writer", "Writer", 1, 2, joined=time.gmtime(0)),
+])
+def test_records_are_slotted(record):
+    assert not hasattr(record, '__dict__')
+    with pytest.raises(AttributeError):
+        record.unknown = 1
+
+
+def test_record_equality():
+    assert Tweet(1, "a", 0, "x") == Tweet(1, "b", 10, "y")
+    assert len({Tweet(1, "a", 0, "x"), Tweet(1, "b", 10, "y"), Tweet(2, "a", 0, "x")}) == 2
+    assert Tweet(1, "a", 0, "x") != 1
+    assert Writer("a", "A", 1, 2) == Writer("a", "B", 3, 4)
+    assert len({Writer("a", "A", 1, 2), Writer("b", "B", 1, 2)}) == 2
+
+
+def test_writer_dates_must_be_struct_time():
+    writer = Writer("a", "A", 1, 2, born="1990", joined="2010")
+
+    assert writer.born is None and writer.joined is None
+    assert Writer("a", "A", 1, 2, born=time.gmtime(0)).born == time.gmtime(0)
@@ -0,0 +1,254 @@
+import datetime
+import time
+
+import pytest
+
+from tweet import Tweet
+from tweetDB import HOUR_BUCKET, SCHEMA_VERSION, TweetDB
+from writer import Writer
+
+# 2020-01-01 00:00:00 UTC
+EPOCH_2020 = 1577836800
+
+
+@pytest.fixture
+def database():
+    database = TweetDB(':memory:')
+    database.create_tables()
+    yield database
+    database.close_DB()
+
+
+def _tweet(tweet_id: int, post_date=EPOCH_2020, writer='writer', searchKey="$AAPL") -> Tweet:
+    return Tweet(tweet_id, writer, post_date, f"body {tweet_id}", searchKey=searchKey,
+                 comment_num=1, retweet_num=2, like_num=3)
+
+
+def _writer(user_id: str, follower=10) -> Writer:
+    return Writer(user_id, user_id.title(), 5, follower, tweet_count=100,
+                  joined=time.gmtime(EPOCH_2020))
+
+
+def _rows(database: TweetDB, query: str) -> list:
+    database.c.execute(query)
+    return database.c.fetchall()
+
+
+def test_insert_tweets_skips_existing_rows(database):
+    assert database.insert_tweets([_tweet(i) for i in range(5)]) == (5, 0)
+    # overlapping batch, duplicates are skipped without an exception
+    assert database.insert_tweets([_tweet(i) for i in range(3, 8)]) == (3, 2)
+    assert database.insert_tweets([]) == (0, 0)
+
+    assert _rows(database, "SELECT * FROM Tweet WHERE tweet_id = 4") == [
+        (4, 'writer', EPOCH_2020, 'body 4', 1, 2, 3)]
+    assert sorted(database.iter_tweet_ids()) == list(range(8))
+
+
+def test_insert_tweets_records_each_search_key(database):
+    database.insert_tweets([_tweet(1), _tweet(2, searchKey=("$AAPL", "$MSFT"))])
+    # a known tweet found by another key only adds the key
+    assert database.insert_tweets([_tweet(1, searchKey="$MSFT"), _tweet(2)]) == (0, 2)
+
+    assert _rows(database, "SELECT * FROM SearchKey_Tweet ORDER BY tweet_id, searchKey") == [
+        (1, "$AAPL"), (1, "$MSFT"), (2, "$AAPL"), (2, "$MSFT")]
+
+
+def test_insert_tweets_rejects_other_objects(database):
+    with pytest.raises(ValueError):
+        database.insert_tweets([_tweet(1), "tweet"])
+    assert _rows(database, "SELECT COUNT(*) FROM Tweet") == [(0,)]
+
+
+def test_insert_writers_skips_existing_rows(database):
+    assert database.insert_writers([_writer('a'), _writer('b')]) == (2, 0)
+    assert database.insert_writers([_writer('b', follower=20), _writer('c')]) == (1, 1)
+
+    rows = _rows(database, "SELECT user_id, username, following, followerer, tweet_count "
+                           "FROM Writer ORDER BY user_id")
+    # existing writer keeps its first row
+    assert rows == [('a', 'A', 5, 10, 100), ('b', 'B', 5, 10, 100), ('c', 'C', 5, 10, 100)]
+
+
+
+def _coverage_tweets() -> list:
+    # tweets over a few days, some of them found by two keys
+    tweets = []
+    for i in range(60):
+        searchKey = ("$AAPL", "$MSFT") if i % 4 == 0 else ("$AAPL" if i % 2 else "$MSFT")
+        tweets.append(_tweet(i, EPOCH_2020 + i * 5437, searchKey=searchKey))
+    return tweets
+
+
+def _scanned_counts(database: TweetDB, searchKey: str, bucket: str) -> dict:
+    # coverage as it was computed before TweetCoverage, by scanning tweets
+    return dict(_rows(
+        database,
+        f"""
+            SELECT {bucket} AS bucket, COUNT(*)
+            FROM Tweet JOIN SearchKey_Tweet USING (tweet_id)
+            WHERE searchKey = '{searchKey}'
+            GROUP BY bucket
+        """))
+
+
+def _check_coverage(database: TweetDB) -> None:
+    for searchKey in ("$AAPL", "$MSFT"):
+        assert database.get_daily_counts(searchKey) == {
+            datetime.date.fromisoformat(day): count for day, count in _scanned_counts(
+                database, searchKey, "date(post_date, 'unixepoch')").items()}
+        assert database.get_hourly_counts(searchKey) == {
+            datetime.datetime.strptime(hour, "%Y-%m-%d %H"): count
+            for hour, count in _scanned_counts(database, searchKey, HOUR_BUCKET).items()}
+
+
+def test_coverage_matches_scanned_dates(database):
+    tweets = _coverage_tweets()
+    database.insert_tweets(tweets[:30])
+    # overlapping batch and a known tweet found by a new key
+    database.insert_tweets(tweets[20:] + [_tweet(1, EPOCH_2020 + 5437, searchKey="$MSFT")])
+
+    _check_coverage(database)
+    days = set(database.get_daily_counts("$AAPL")) | set(database.get_daily_counts("$MSFT"))
+    assert database.get_daily_counts() == {
+        day: (database.get_daily_counts("$AAPL").get(day, 0) +
+              database.get_daily_counts("$MSFT").get(day, 0)) for day in days}
+
+
+def test_coverage_is_backfilled_on_existing_database(tmp_path, monkeypatch):
+    # a database of version 0 stored at UTC+3, before TweetCoverage existed
+    monkeypatch.setenv('TZ', 'Etc/GMT-3')
+    time.tzset()
+    try:
+        database = TweetDB(str(tmp_path / "old"))
+        database.create_tables()
+        database.insert_tweets(_coverage_tweets())
+        with database.conn:
+            database.c.execute("DROP TRIGGER TR_tweet_coverage")
+            database.c.execute("DROP TABLE TweetCoverage")
+            database.c.execute("UPDATE Tweet SET post_date = post_date - 3 * 3600")
+            database.c.execute("PRAGMA user_version=0")
+        database.close_DB()
+
+        database = TweetDB(str(tmp_path / "old"))
+        database.create_tables()
+        assert database.get_schema_version() == SCHEMA_VERSION
+        assert [row[2] for row in database.iter_tweets(raw=True)] == [
+            tweet.timestamp for tweet in _coverage_tweets()]
+        _check_coverage(database)
+        assert sum(database.get_daily_counts().values()) == 75
+
+        # trigger keeps backfilled coverage up to date
+        database.insert_tweets([_tweet(100, EPOCH_2020, searchKey="$AAPL")])
+        _check_coverage(database)
+        database.close_DB()
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
+
+
+@pytest.fixture
+def query_database(database):
+    # tweet i is posted at 2020-01-01 + i * 10 hours by writer i % 3
+    database.insert_tweets(
+        [_tweet(i, EPOCH_2020 + i * 36000, writer=f"writer{i % 3}",
+                searchKey="$AAPL" if i < 8 else ("$AAPL", "$MSFT"))
+         for i in range(12)])
+    return database
+
+
+@pytest.mark.parametrize('filters, expected', [
+    (dict(), list(range(12))),
+    (dict(since=datetime.date(2020, 1, 2)), list(range(3, 12))),
+    (dict(until=datetime.date(2020, 1, 2)), [0, 1, 2]),
+    (dict(since=datetime.datetime(2020, 1, 1, 10), until=EPOCH_2020 + 5 * 36000),
+     [1, 2, 3, 4]),
+    (dict(writer="writer1"), [1, 4, 7, 10]),
+    (dict(searchKey="$MSFT"), [8, 9, 10, 11]),
+    (dict(searchKey="$AAPL", writer="writer2", since=datetime.date(2020, 1, 2)),
+     [5, 8, 11]),
+    (dict(searchKey="$TSLA"), []),
+])
+def test_iter_tweets_filters(query_database, filters, expected):
+    tweets = list(query_database.iter_tweets(**filters))
+
+    assert [tweet.tweet_id for tweet in tweets] == expected
+    assert all(isinstance(tweet, Tweet) for tweet in tweets)
+    assert {tweet.searchKey for tweet in tweets} <= {filters.get('searchKey')}
+    assert [row[0] for row in query_database.iter_tweets(raw=True, **filters)] == expected
+
+
+def test_iter_tweets_raw_rows(query_database):
+    rows = list(query_database.iter_tweets(writer="writer0", raw=True))
+
+    assert rows[1] == (3, "writer0", EPOCH_2020 + 3 * 36000, "body 3", 1, 2, 3)
+    tweet = next(query_database.iter_tweets(since=EPOCH_2020 + 3 * 36000))
+    assert (tweet.tweet_id, tweet.writer, tweet.timestamp, tweet.body) == rows[1][:4]
+    assert (tweet.comment_num, tweet.retweet_num, tweet.like_num) == rows[1][4:]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 1000])
+def test_chunked_iteration(query_database, chunk_size):
+    tweets = query_database.iter_tweets(chunk_size=chunk_size)
+    ids = query_database.iter_tweet_ids(chunk_size=chunk_size)
+
+    # generators run on their own cursors, so they can be interleaved
+    # with each other and with other queries
+    pairs = [(next(tweets).tweet_id, next(ids)) for _ in range(6)]
+    assert query_database.get_daily_counts("$MSFT") == {
+        datetime.date(2020, 1, 4): 2, datetime.date(2020, 1, 5): 2}
+    pairs += list(zip((tweet.tweet_id for tweet in tweets), ids))
+
+    assert sorted(tweet_id for tweet_id, _ in pairs) == list(range(12))
+    assert sorted(tweet_id for _, tweet_id in pairs) == list(range(12))
+
+
+def test_iter_tweet_ids(query_database):
+    assert sorted(query_database.iter_tweet_ids()) == list(range(12))
+    assert sorted(query_database.iter_tweet_ids("$AAPL", chunk_size=2)) == list(range(12))
+    assert sorted(query_database.iter_tweet_ids("$MSFT", chunk_size=3)) == [8, 9, 10, 11]
+    assert list(query_database.iter_tweet_ids("$TSLA")) == []
+
+
+def test_hourly_and_daily_counts(query_database):
+    query_database.insert_tweets([_tweet(20, EPOCH_2020 + 1800, searchKey="$AAPL")])
+
+    assert query_database.get_hourly_counts("$MSFT") == {
+        datetime.datetime(2020, 1, 4, 8): 1, datetime.datetime(2020, 1, 4, 18): 1,
+        datetime.datetime(2020, 1, 5, 4): 1, datetime.datetime(2020, 1, 5, 14): 1}
+    assert query_database.get_hourly_counts("$AAPL")[datetime.datetime(2020, 1, 1)] == 2
+    # a tweet of two keys is counted for each key
+    assert query_database.get_hourly_counts()[datetime.datetime(2020, 1, 4, 8)] == 2
+
+    assert query_database.get_daily_counts("$AAPL") == {
+        datetime.date(2020, 1, 1): 4, datetime.date(2020, 1, 2): 2,
+        datetime.date(2020, 1, 3): 3, datetime.date(2020, 1, 4): 2,
+        datetime.date(2020, 1, 5): 2}
+    assert query_database.get_daily_counts() == {
+        datetime.date(2020, 1, 1): 4, datetime.date(2020, 1, 2): 2,
+        datetime.date(2020, 1, 3): 3, datetime.date(2020, 1, 4): 4,
+        datetime.date(2020, 1, 5): 4}
+    assert query_database.get_daily_counts("$TSLA") == {}
+
+
+def test_writer_join_dates_are_utc(tmp_path, monkeypatch):
+    monkeypatch.setenv('TZ', 'Etc/GMT-3')
+    time.tzset()
+    try:
+        database = TweetDB(str(tmp_path / "writers"))
+        database.create_tables()
+        database.insert_writers([_writer('a'), Writer('b', 'B', 1, 2)])
+        assert _rows(database, "SELECT user_id, joined FROM Writer ORDER BY user_id") == [
+            ('a', EPOCH_2020), ('b', None)]
+
+        # a version 1 database stored join dates in local time
+        with database.conn:
+            database.c.execute("UPDATE Writer SET joined = joined - 3 * 3600")
+            database.c.execute("PRAGMA user_version=1")
+        database.create_tables()
+        assert _rows(database, "SELECT user_id, joined FROM Writer ORDER BY user_id") == [
+            ('a', EPOCH_2020), ('b', None)]
+        database.close_DB()
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
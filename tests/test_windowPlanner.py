@@ -0,0 +1,145 @@
+import calendar
+import datetime
+import os
+
+import pytest
+
+from scheduler import Window
+from tweetDB import TweetDB, WindowProgress
+from windowPlanner import _day_windows, plan_windows, resume_bound, retry_windows
+
+DAY = datetime.timedelta(days=1)
+SINCE = datetime.date(2020, 1, 1)
+
+
+def _at(day: int, hour=0) -> datetime.datetime:
+    return datetime.datetime.combine(SINCE + DAY * day, datetime.time(hour))
+
+
+def _hourly(day: int, counts: dict) -> dict:
+    return {_at(day, hour): count for hour, count in counts.items()}
+
+
+def _daily(days: int, counts: dict) -> dict:
+    return {hour: count for day in range(days)
+            for hour, count in _hourly(day, counts).items()}
+
+
+def _bound(bound) -> datetime.datetime:
+    if isinstance(bound, datetime.datetime):
+        return bound
+    return datetime.datetime.combine(bound, datetime.time())
+
+
+FLAT = {hour: 100 for hour in range(24)}
+
+
+@pytest.mark.parametrize('hourly, target_tweets, min_hours, expected', [
+    # even day is split into equal windows
+    (FLAT, 600, 1, [(0, 6, 600), (6, 12, 600), (12, 18, 600), (18, 24, 600)]),
+    # windows are not shorter than min_hours
+    (FLAT, 600, 8, [(0, 8, 800), (8, 16, 800), (16, 24, 800)]),
+    # a burst closes its window, rest of the day is the last window
+    ({10: 1000}, 100, 1, [(0, 11, 1000), (11, 24, 0)]),
+    ({0: 500, 23: 500}, 400, 1, [(0, 1, 500), (1, 24, 500)]),
+])
+def test_day_windows(hourly, target_tweets, min_hours, expected):
+    windows = _day_windows(SINCE, hourly, target_tweets, min_hours)
+
+    assert [(window, count) for window, count in windows] == [
+        (Window(_at(0, since), _at(0) + datetime.timedelta(hours=until)), count)
+        for since, until, count in expected]
+
+
+@pytest.mark.parametrize('days, hourly_counts, target_tweets, max_days, expected', [
+    # sparse days are merged into one window
+    (5, _daily(5, {12: 10}), 100, 7, [(SINCE, SINCE + DAY * 5)]),
+    # a merged window is at most max_days long
+    (5, _daily(5, {12: 10}), 100, 2,
+     [(SINCE, SINCE + DAY * 2), (SINCE + DAY * 2, SINCE + DAY * 4),
+      (SINCE + DAY * 4, SINCE + DAY * 5)]),
+    # a day without counts is a single day window and ends a merge
+    (3, {**_hourly(0, {1: 10}), **_hourly(2, {1: 10})}, 100, 7,
+     [(SINCE + DAY, SINCE + DAY * 2), (SINCE, SINCE + DAY),
+      (SINCE + DAY * 2, SINCE + DAY * 3)]),
+    # a hot day is split between merged sparse days
+    (3, {**_hourly(0, {1: 10}), **_hourly(1, FLAT), **_hourly(2, {1: 10})}, 1200, 7,
+     [(_at(1), _at(1, 12)), (_at(1, 12), _at(2)), (SINCE, SINCE + DAY),
+      (SINCE + DAY * 2, SINCE + DAY * 3)]),
+])
+def test_plan_windows(days, hourly_counts, target_tweets, max_days, expected):
+    windows = plan_windows(SINCE, SINCE + DAY * days, hourly_counts, target_tweets,
+                           max_days=max_days)
+
+    assert windows == [Window(since, until) for since, until in expected]
+
+
+@pytest.mark.parametrize('min_hours', [1, 3])
+def test_planned_windows_are_contiguous(min_hours):
+    hourly_counts = dict()
+    for day in range(20):
+        # bursts, quiet days and days without counts
+        if day % 5 == 4:
+            continue
+        counts = {hour: (day * 37 + hour * 11) % 200 for hour in range(24)}
+        if day % 3 == 0:
+            counts = {hour: count // 50 for hour, count in counts.items()}
+        hourly_counts.update(_hourly(day, counts))
+
+    windows = plan_windows(SINCE, SINCE + DAY * 20, hourly_counts, 500,
+                           min_hours=min_hours, max_days=4)
+    bounds = sorted((_bound(window.since), _bound(window.until)) for window in windows)
+
+    assert bounds[0][0] == _at(0) and bounds[-1][1] == _at(20)
+    # windows cover the range without gaps or overlaps
+    assert all(until == next_since for (_, until), (next_since, _)
+               in zip(bounds, bounds[1:]))
+    assert all(until - since >= datetime.timedelta(hours=min_hours)
+               for since, until in bounds)
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = TweetDB(os.path.join(tmp_path, "progress"))
+    database.create_tables()
+    oldest = calendar.timegm((2020, 1, 1, 13, 30, 5))
+    database.update_window_progress([
+        WindowProgress("AAPL", SINCE, SINCE + DAY, oldest, 10, False),
+        WindowProgress("AAPL", SINCE + DAY, SINCE + DAY * 2, None, None, False),
+        WindowProgress("AAPL", SINCE + DAY * 2, SINCE + DAY * 3, oldest, 5, True),
+        WindowProgress("AAPL", _at(3), _at(3, 12), None, None, True),
+    ])
+    return database
+
+
+def test_resume_bound_of_recorded_windows(database):
+    def bound(since, until):
+        window = Window(since, until)
+        return resume_bound(window, database.get_window_progress("AAPL", since, until))
+
+    # a second after the oldest recorded tweet, in UTC
+    assert bound(SINCE, SINCE + DAY) == datetime.datetime(2020, 1, 1, 13, 30, 6)
+    # started windows without tweets and windows not started run whole
+    assert bound(SINCE + DAY, SINCE + DAY * 2) == SINCE + DAY * 2
+    assert bound(SINCE + DAY * 5, SINCE + DAY * 6) == SINCE + DAY * 6
+    # completed windows are skipped
+    assert bound(SINCE + DAY * 2, SINCE + DAY * 3) is None
+    assert bound(_at(3), _at(3, 12)) is None
+
+
+def test_retry_windows_of_recorded_windows(database):
+    progresses = database.get_window_progresses("AAPL")
+    missing_dates = [SINCE + DAY * day for day in (1, 2, 3, 4, 6)]
+
+    windows = retry_windows(progresses, missing_dates)
+
+    # incomplete windows run again, missing days only if no window overlaps them
+    assert sorted(windows, key=lambda window: _bound(window.since)) == [
+        Window(SINCE, SINCE + DAY),
+        Window(SINCE + DAY, SINCE + DAY * 2),
+        Window(SINCE + DAY * 4, SINCE + DAY * 5),
+        Window(SINCE + DAY * 6, SINCE + DAY * 7),
+    ]
+    assert retry_windows(progresses, [SINCE + DAY * 4], step_days=2) == [
+        Window(SINCE, SINCE + DAY), Window(SINCE + DAY, SINCE + DAY * 2),
+        Window(SINCE + DAY * 4, SINCE + DAY * 6)]
@@ -0,0 +1,142 @@
+import queue
+
+import pytest
+
+from collector import Collector, WebDriverException
+from fakeDriver import FakeDriver
+from metrics import set_log_format
+from sessionPool import SessionPool
+from writer import Writer
+from writerHarvester import WriterHarvester
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    set_log_format('none')
+
+
+class FlakyDriver(FakeDriver):
+    """FakeDriver whose profiles of 'flaky' writers miss their join date
+    for the first `failures` visits and whose 'crash' profiles fail to load"""
+
+    def __init__(self, failures: dict, on_visit=None):
+        super().__init__()
+        self._failures = failures
+        self._on_visit = on_visit
+
+    def get(self, url: str) -> None:
+        super().get(url)
+        if self._profile is None:
+            return
+        if self._on_visit is not None:
+            self._on_visit(self._user_id)
+        if self._user_id.startswith('crash'):
+            raise WebDriverException(f"Failed to load {url}")
+        if self._failures.get(self._user_id, 0) > 0:
+            self._failures[self._user_id] -= 1
+            self._profile = dict(self._profile, joined=None)
+
+
+class RecordingWriter:
+    """Stand-in of DBWriter keeping what is put into it"""
+
+    def __init__(self):
+        self.writers = []
+        self.unreachable = []
+
+    def put_writer(self, writer) -> None:
+        self.writers.append(writer)
+
+    def put_unreachable(self, unreachable) -> None:
+        self.unreachable.append(unreachable)
+
+    def flush(self) -> None:
+        pass
+
+
+def _harvester(failures=None, on_visit=None, retry_count=2, shard_size=20):
+    def start_collector():
+        return Collector.with_driver(FlakyDriver(failures or {}, on_visit))
+
+    pool = SessionPool(2, None, None, collector_factory=start_collector)
+    db_writer = RecordingWriter()
+    harvester = WriterHarvester(pool, db_writer, 2, retry_count=retry_count,
+                                shard_size=shard_size)
+    return harvester, pool, db_writer
+
+
+def _results(results: queue.Queue) -> dict:
+    statuses = dict()
+    while not results.empty():
+        user_id, status = results.get_nowait()
+        statuses[user_id] = status
+    return statuses
+
+
+def test_harvest_retries_unknown_failures():
+    harvester, pool, db_writer = _harvester(
+        failures={'flaky1': 1, 'flaky2': 10}, shard_size=2)
+    counts = harvester.harvest(['alice', 'flaky1', 'suspended1', 'deleted1',
+                                'flaky2', 'bob'])
+    pool.close()
+
+    assert counts == {'collected': 3, 'unreachable': 3}
+    assert sorted(writer.user_id for writer in db_writer.writers) == ['alice', 'bob', 'flaky1']
+    assert all(isinstance(writer, Writer) for writer in db_writer.writers)
+    # writers failing more than retry_count times are recorded as 'unknown'
+    assert sorted(db_writer.unreachable) == [('deleted1', 'existance'),
+                                             ('flaky2', 'unknown'),
+                                             ('suspended1', 'suspended')]
+
+
+@pytest.mark.parametrize('retry_count, failures, expected', [
+    (2, 2, {'flaky': 'collected'}),
+    (2, 3, {'flaky': 'unreachable'}),
+    (0, 1, {'flaky': 'unreachable'}),
+])
+def test_harvest_shard_queues_retries(retry_count, failures, expected):
+    harvester, pool, db_writer = _harvester(failures={'flaky': failures},
+                                            retry_count=retry_count)
+    work, results = queue.Queue(), queue.Queue()
+    work.put([('flaky', 1)])
+    while not work.empty():
+        harvester._harvest_shard(work.get(), work, results)
+    pool.close()
+
+    assert _results(results) == expected
+
+
+def test_failed_shard_is_retried_from_failed_writer():
+    harvester, pool, db_writer = _harvester(retry_count=1)
+    work, results = queue.Queue(), queue.Queue()
+
+    harvester._harvest_shard([('alice', 1), ('crash', 1), ('bob', 1)], work, results)
+
+    # writers after the failure are retried with another lease
+    assert _results(results) == {'alice': 'collected'}
+    assert work.get_nowait() == [('crash', 2), ('bob', 2)]
+    harvester._harvest_shard([('crash', 2), ('bob', 2)], work, results)
+    assert _results(results) == {'crash': 'failed', 'bob': 'failed'}
+    assert work.empty()
+    # broken collectors are not given back to the pool
+    assert len(pool) == 0
+    pool.close()
+
+
+def test_cancel_stops_shard_after_current_writer():
+    def on_visit(user_id):
+        if user_id == 'bob':
+            harvester.cancel()
+
+    harvester, pool, db_writer = _harvester(failures={'flaky': 1}, on_visit=on_visit)
+    work, results = queue.Queue(), queue.Queue()
+    harvester._harvest_shard([('flaky', 1), ('bob', 1), ('carol', 1)], work, results)
+
+    # retries of a cancelled shard are not queued
+    assert _results(results) == {'bob': 'collected', 'flaky': 'cancelled',
+                                 'carol': 'cancelled'}
+    assert work.empty()
+    harvester._harvest_shard([('dave', 1)], work, results)
+    assert _results(results) == {'dave': 'cancelled'}
+    assert [writer.user_id for writer in db_writer.writers] == ['bob']
+    pool.close()
@@ -0,0 +1,165 @@
+import argparse
+import calendar
+import json
+import os
+import time
+
+from metrics import log
+from tweet import Tweet
+from writer import Writer
+
+# Path parts of search timeline responses (legacy REST and GraphQL APIs)
+TIMELINE_URL_PARTS = ('/search/adaptive.json', '/SearchTimeline')
+
+_CREATED_AT_FORMAT = "%a %b %d %H:%M:%S +0000 %Y"
+
+
+def is_timeline_url(url: str) -> bool:
+    """Returns true if `url` is a search timeline request"""
+    path = url.split('?', 1)[0]
+    return any(part in path for part in TIMELINE_URL_PARTS)
+
+
+def _writer_from_user(user: dict) -> Writer:
+    """Creates Writer from `legacy` user object of twitter API"""
+    website = None
+    urls = user.get('entities', {}).get('url', {}).get('urls')
+    if urls:
+        website = urls[0].get('display_url') or urls[0].get('expanded_url')
+    elif user.get('url'):
+        website = user['url']
+    return Writer(user_id=user['screen_name'],
+                  username=user.get('name'),
+                  following=user.get('friends_count', 0),
+                  follower=user.get('followers_count', 0),
+                  tweet_count=user.get('statuses_count'),
+                  bio_text=(user.get('description') or '').replace('\n', '') or None,
+                  location=user.get('location') or None,
+                  website=website,
+                  born=None,
+                  joined=time.strptime(user['created_at'], _CREATED_AT_FORMAT))
+
+
+def _tweet_from_status(status: dict, screen_name: str, searchKey) -> Tweet:
+    """Creates Tweet from `legacy` tweet object of twitter API"""
+    post_date = calendar.timegm(time.strptime(status['created_at'],
+                                              _CREATED_AT_FORMAT))
+    return Tweet(tweet_id=int(status['id_str']),
+                 writer=screen_name,
+                 post_date=post_date,
+                 body=status.get('full_text', status.get('text', '')).replace('\n', ''),
+                 searchKey=searchKey,
+                 comment_num=status.get('reply_count', 0),
+                 retweet_num=status.get('retweet_count', 0),
+                 like_num=status.get('favorite_count', 0))
+
+
+def _parse_adaptive(response: dict) -> list:
+    """Parses legacy `adaptive.json` response, tweets in timeline order"""
+    objects = response.get('globalObjects', {})
+    statuses = objects.get('tweets', {})
+    users = objects.get('users', {})
+
+    # only entries of timeline are search results (others are e.g. quoted)
+    tweet_ids = []
+    for instruction in response.get('timeline', {}).get('instructions', []):
+        for entry in instruction.get('addEntries', {}).get('entries', []):
+            tweet = (entry.get('content', {}).get('item', {})
+                     .get('content', {}).get('tweet'))
+            if tweet is not None:
+                tweet_ids.append(tweet['id'])
+    if not tweet_ids and 'timeline' not in response:
+        tweet_ids = list(statuses)
+
+    pairs = []
+    for tweet_id in tweet_ids:
+        status = statuses.get(tweet_id)
+        user = users.get(status.get('user_id_str')) if status else None
+        if status is not None and user is not None:
+            pairs.append((status, user))
+    return pairs
+
+
+def _parse_graphql(response: dict) -> list:
+    """Parses GraphQL `SearchTimeline` response, tweets in timeline order"""
+    timeline = (response.get('data', {}).get('search_by_raw_query', {})
+                .get('search_timeline', {}).get('timeline', {}))
+    results = []
+    for instruction in timeline.get('instructions', []):
+        entries = instruction.get('entries', [])
+        if 'entry' in instruction:
+            entries = [instruction['entry']]
+        for entry in entries:
+            content = entry.get('content', {})
+            items = [content] + [item.get('item', {}) for item in content.get('items', [])]
+            for item in items:
+                result = (item.get('itemContent', {}).get('tweet_results', {})
+                          .get('result'))
+                if result is not None:
+                    results.append(result.get('tweet', result))
+
+    pairs = []
+    for result in results:
+        status = result.get('legacy')
+        user = (result.get('core', {}).get('user_results', {})
+                .get('result', {}).get('legacy'))
+        if status is None or user is None:
+            continue
+        status = dict(status, id_str=status.get('id_str', result.get('rest_id')))
+        pairs.append((status, user))
+    return pairs
+
+
+def parse_timeline(response, searchKey=None, lang=None) -> tuple:
+    """
+        Parses a search timeline response of twitter web client.
+
+            Args:
+                `response` (str|dict): JSON body of the response
+                `searchKey` (str): search key of tweets
+                `lang` (str): skip tweets in other languages (None for all)
+
+            Returns:
+                tuple of (list of Tweet in timeline order, list of Writer of
+                those tweets)
+    """
+    if isinstance(response, (str, bytes)):
+        response = json.loads(response)
+
+    if 'globalObjects' in response:
+        pairs = _parse_adaptive(response)
+    else:
+        pairs = _parse_graphql(response)
+
+    tweets = []
+    writers = dict()
+    for status, user in pairs:
+        if lang is not None and status.get('lang', lang) != lang:
+            continue
+        try:
+            tweets.append(_tweet_from_status(status, user['screen_name'],
+                                             searchKey))
+            if user['screen_name'] not in writers:
+                writers[user['screen_name']] = _writer_from_user(user)
+        except (KeyError, ValueError) as e:
+            log('tweet_error',
+                f"Exception during parsing of tweet: {status.get('id_str')} {e}",
+                tweet_id=status.get('id_str'), error=repr(e))
+    return tweets, list(writers.values())
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--input', type=str, required=True,
+                             help="recorded response file or directory of them")
+    argv_parser.add_argument('-l', '--lang', type=str, default=None,
+                             help="language of tweets to keep")
+    args = argv_parser.parse_args()
+
+    paths = ([os.path.join(args.input, name) for name in sorted(os.listdir(args.input))
+              if name.endswith(".json")]
+             if os.path.isdir(args.input) else [args.input])
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as response_file:
+            tweets, writers = parse_timeline(response_file.read(), lang=args.lang)
+        print(f"{os.path.basename(path)}: {len(tweets)} tweets, {len(writers)} writers")
@@ -1,9 +1,42 @@
+import calendar
 import time
 
 
+def iso_to_timestamp(text: str) -> int:
+    """
+        Converts ISO-8601 UTC time text of tweets (e.g.
+        `'2020-07-28T10:11:12.000Z'`) to epoch seconds without strptime.
+
+            Args:
+                `text` (str): time text in YYYY-MM-DDTHH:MM:SS... format
+
+            Returns:
+                int - seconds since epoch (UTC)
+    """
+    year = int(text[0:4])
+    month = int(text[5:7])
+    day = int(text[8:10])
+
+    # days from civil date (proleptic gregorian calendar)
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = (year_of_era * 365 + year_of_era // 4 - year_of_era // 100 +
+                  day_of_year)
+    days = era * 146097 + day_of_era - 719468
+
+    return (days * 86400 + int(text[11:13]) * 3600 + int(text[14:16]) * 60 +
+            int(text[17:19]))
+
+
 class Tweet:
 
-    def __init__(self, **kwargs):
+    __slots__ = ('tweet_id', 'writer', 'timestamp', 'body', 'searchKey',
+                 'comment_num', 'retweet_num', 'like_num')
+
+    def __init__(self, tweet_id, writer, post_date, body, searchKey=None,
+                 comment_num=None, retweet_num=None, like_num=None):
         """
             Tweet instance that keeps information of a tweet. To create an
             instance some keyword arguments must be set.
@@ -11,40 +44,38 @@ class Tweet:
                 Args:
                     `tweet_id` (int): id number of tweet
                     `writer` (str): id of owner of the tweet
-                    `post_date` (struct time): struct time of tweet's post date
+                    `post_date` (int): post date of tweet in UTC epoch seconds
+                        (struct_time in UTC is also accepted)
                     `body` (str): content of tweet
                     `searchKey` (str)(optional): search key that tweet is found
+                        (tuple of str if tweet is found by a key group)
                     `comment_num` (int)(optional): number of comments of tweet
                     `retweet_num` (int)(optional): number of retweets of tweet
                     `like_num` (int)(optional): number of likes of tweet
 
                 Raises:
-                    TypeError if `post_date` argument is not `struct_time`
+                    TypeError if `post_date` argument is not `int` or
+                    `struct_time`
         """
-        if not isinstance(kwargs['post_date'], time.struct_time):
+        if isinstance(post_date, time.struct_time):
+            post_date = calendar.timegm(post_date)
+        elif not isinstance(post_date, int):
             raise TypeError("expected:{} but found: {}".format(
-                time.struct_time, type(kwargs['post_date'])))
-
-        self.tweet_id = kwargs['tweet_id']
-        self.writer = kwargs['writer']
-        self.post_date = kwargs['post_date']
-        self.body = kwargs['body']
-        try:
-            self.searchKey = kwargs['searchKey']
-        except KeyError:
-            self.searchKey = None
-        try:
-            self.comment_num = kwargs['comment_num']
-        except KeyError:
-            self.comment_num = None
-        try:
-            self.retweet_num = kwargs['retweet_num']
-        except KeyError:
-            self.retweet_num = None
-        try:
-            self.like_num = kwargs['like_num']
-        except KeyError:
-            self.like_num = None
+                int, type(post_date)))
+
+        self.tweet_id = tweet_id
+        self.writer = writer
+        self.timestamp = post_date
+        self.body = body
+        self.searchKey = searchKey
+        self.comment_num = comment_num
+        self.retweet_num = retweet_num
+        self.like_num = like_num
+
+    @property
+    def post_date(self) -> time.struct_time:
+        """Post date as struct_time in UTC (see `timestamp` for epoch seconds)"""
+        return time.gmtime(self.timestamp)
 
     def __hash__(self):
         return self.tweet_id
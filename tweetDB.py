@@ -1,14 +1,53 @@
+import calendar
 import sqlite3
 import time
-from datetime import datetime
+from collections import namedtuple
+from datetime import date, datetime
 
+from metrics import DB_COMMIT_SECONDS, DB_ROWS
 from tweet import Tweet
 from writer import Writer
 
 
+# Connection pragmas that can be set, with allowed values (None for integers)
+PRAGMAS = {
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+    'cache_size': None,
+    'mmap_size': None,
+    'temp_store': ('DEFAULT', 'FILE', 'MEMORY'),
+}
+
+# SQL expression of the hour bucket ('YYYY-MM-DD HH') of Tweet.post_date
+HOUR_BUCKET = "strftime('%Y-%m-%d %H', post_date, 'unixepoch')"
+
+# Version of stored data kept in `PRAGMA user_version`
+#   0: post dates are seconds of UTC time read as local time (time.mktime)
+#   1: post dates are UTC epoch seconds
+#   2: join dates of writers are UTC epoch seconds
+SCHEMA_VERSION = 2
+
+# SQL expression that converts seconds of UTC time read as local time
+# (time.mktime of a UTC struct_time) in column {0} to UTC epoch seconds
+_LOCAL_TO_UTC = "CAST(strftime('%s', {0}, 'unixepoch', 'localtime') AS INTEGER)"
+
+# Collection progress of a search window (see `TweetDB.update_window_progress`)
+#   since, until     : bounds of the window (datetime.date or datetime.datetime)
+#   oldest_post_date : UTC epoch seconds of the oldest collected tweet (None if no tweet)
+#   oldest_tweet_id  : id of the oldest collected tweet (None if no tweet)
+#   completed        : true if end of search results is reached
+WindowProgress = namedtuple('WindowProgress', ['searchKey', 'since', 'until',
+                                               'oldest_post_date',
+                                               'oldest_tweet_id', 'completed'])
+
+# Writer whose profile cannot be collected (see `TweetDB.insert_unreachable_writers`)
+#   status: 'existance' (account does not exist), 'suspended' or 'unknown'
+UnreachableWriter = namedtuple('UnreachableWriter', ['user_id', 'status'])
+
+
 class TweetDB:
 
-    def __init__(self, stock_market_name):
+    def __init__(self, stock_market_name, pragmas=None):
         """
             Database class for Tweets that will be collected. Uses SQLite3.
 
@@ -16,15 +55,50 @@ class TweetDB:
                     `stock_market_name` (str): stock market name that will be
                         used as database name after creation there will be a 
                         .db file with this name in the directory
+                    `pragmas` (dict): connection pragmas as <name, value>
+                        (e.g. `{"journal_mode": "WAL"}`), see `PRAGMAS`
 
             To make database creation on memory set stock_market_name to `':memory:'`
+
+                Raises:
+                    ValueError if a pragma or its value is not supported
         """
         self.name = stock_market_name + '.db' if stock_market_name != ':memory:' else ''
-        self.conn = sqlite3.connect(f'{self.name}')
+        self.conn = sqlite3.connect(f'{self.name}', cached_statements=256)
         self.c = self.conn.cursor()
+        if pragmas:
+            self.set_pragmas(pragmas)
+
+    def set_pragmas(self, pragmas: dict) -> None:
+        """
+            Sets connection pragmas.
+
+                Args:
+                    `pragmas` (dict): <name, value> pairs, see `PRAGMAS`
+
+                Raises:
+                    ValueError if a pragma or its value is not supported
+        """
+        for name, value in pragmas.items():
+            if name not in PRAGMAS:
+                raise ValueError(f"unsupported pragma: {name}")
+            allowed = PRAGMAS[name]
+            if allowed is None:
+                value = int(value)
+            elif str(value).upper() not in allowed:
+                raise ValueError(f"unsupported {name} value: {value}")
+            else:
+                value = str(value).upper()
+            self.c.execute(f"PRAGMA {name}={value}")
+
+    def get_schema_version(self) -> int:
+        """Returns version of stored data (see `SCHEMA_VERSION`)"""
+        self.c.execute("PRAGMA user_version")
+        return self.c.fetchone()[0]
 
     def create_tables(self):
         """Creates needed tables if they does not exists. """
+        version = self.get_schema_version()
         with self.conn:
             self.c.execute(
                 """
@@ -70,54 +144,144 @@ class TweetDB:
                     )
                 """
             )
+            # Tweet count per search key and hour of post date, kept up to
+            # date by trigger so that coverage queries do not scan tweets
+            self.c.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS TweetCoverage (
+                        searchKey       TEXT        NOT NULL,
+                        hour            TEXT        NOT NULL,
+                        tweet_count     INTEGER     NOT NULL,
+                        PRIMARY KEY (searchKey, hour)
+                    )
+                """
+            )
+            if version < 1:
+                # Hour buckets of older trigger are in local time
+                self.c.execute("DROP TRIGGER IF EXISTS TR_tweet_coverage")
+            self.c.execute(
+                f"""
+                    CREATE TRIGGER IF NOT EXISTS TR_tweet_coverage
+                    AFTER INSERT ON SearchKey_Tweet
+                    BEGIN
+                        INSERT INTO TweetCoverage
+                        SELECT NEW.searchKey, {HOUR_BUCKET}, 1
+                        FROM Tweet
+                        WHERE tweet_id = NEW.tweet_id
+                        ON CONFLICT (searchKey, hour) DO UPDATE SET
+                            tweet_count = tweet_count + 1;
+                    END
+                """
+            )
+            self.c.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS WindowProgress (
+                        searchKey           TEXT        NOT NULL,
+                        since               TEXT        NOT NULL,
+                        until               TEXT        NOT NULL,
+                        oldest_post_date    INTEGER,
+                        oldest_tweet_id     INTEGER,
+                        completed           INTEGER     NOT NULL,
+                        PRIMARY KEY (searchKey, since, until)
+                    )
+                """
+            )
+            self.c.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS UnreachableWriter (
+                        user_id         TEXT        PRIMARY KEY,
+                        status          TEXT
+                    )
+                """
+            )
+            if version < 1:
+                self._migrate_utc_post_dates()
+            if version < 2:
+                self._migrate_utc_join_dates()
+            self.c.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def _migrate_utc_post_dates(self) -> None:
+        """
+            Converts post dates stored by version 0 (seconds of UTC time read
+            as local time) to UTC epoch seconds and rebuilds TweetCoverage.
+            Uses time zone of this machine, which should be the one that
+            stored them. Commit is needed after execution.
+        """
+        self.c.execute(
+            f"UPDATE Tweet SET post_date = {_LOCAL_TO_UTC.format('post_date')}")
+        self.c.execute(
+            f"""
+                UPDATE WindowProgress
+                SET oldest_post_date = {_LOCAL_TO_UTC.format('oldest_post_date')}
+                WHERE oldest_post_date IS NOT NULL
+            """
+        )
+        self.c.execute("DELETE FROM TweetCoverage")
+        self.c.execute(
+            f"""
+                INSERT INTO TweetCoverage
+                SELECT searchKey, {HOUR_BUCKET} AS hour, COUNT(*)
+                FROM SearchKey_Tweet
+                JOIN Tweet USING (tweet_id)
+                GROUP BY searchKey, hour
+            """
+        )
 
-    def _insert_writer_executer(self, writer: Writer) -> None:
+    def _migrate_utc_join_dates(self) -> None:
         """
-            Executes a insert operation on single writer.
+            Converts join dates of writers stored by versions before 2
+            (seconds of UTC time read as local time) to UTC epoch seconds.
             Commit is needed after execution.
+        """
+        self.c.execute(
+            f"""
+                UPDATE Writer SET joined = {_LOCAL_TO_UTC.format('joined')}
+                WHERE joined IS NOT NULL
+            """
+        )
+
+    def _insert_writers_executer(self, writers) -> tuple:
+        """
+            Executes a bulk insert operation on writers, existing writers are
+            skipped. Commit is needed after execution.
 
                 Args:
-                    `writer` (Writer): Writer instance to insert
+                    `writers` (iterable): Writer instances to insert
+
+                Returns:
+                    tuple of (inserted, duplicate) writer counts
         """
-        try:
-            self.c.execute(
-                """
-                    INSERT INTO Writer VALUES (
-                        :user_id,
-                        :username,
-                        :following,
-                        :follower,
-                        :tweet_count,
-                        :bio_text,
-                        :location,
-                        :website,
-                        :birthdate,
-                        :joined
-                    )
-                """,
-                {
-                    'user_id': writer.user_id,
-                    'username': writer.username,
-                    'following': writer.following,
-                    'follower': writer.follower,
-                    'tweet_count': writer.tweet_count,
-                    'bio_text': writer.bio_text,
-                    'location': writer.location,
-                    'website': writer.website,
-                    'birthdate': self.struct_to_seconds(writer.born) if writer.born else None,
-                    'joined': time.mktime(writer.joined)
-                }
-            )
-        except sqlite3.IntegrityError:
-            print(f"Existing writer: {writer.user_id}")
+        rows = [(writer.user_id,
+                 writer.username,
+                 writer.following,
+                 writer.follower,
+                 writer.tweet_count,
+                 writer.bio_text,
+                 writer.location,
+                 writer.website,
+                 self.struct_to_seconds(writer.born) if writer.born else None,
+                 calendar.timegm(writer.joined) if writer.joined else None)
+                for writer in writers]
+        self.c.executemany(
+            """
+                INSERT INTO Writer VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+            """,
+            rows
+        )
+        inserted = max(self.c.rowcount, 0)
+        return inserted, len(rows) - inserted
 
-    def insert_writers(self, writers):
+    def insert_writers(self, writers) -> tuple:
         """
             Insert multiple writers.
 
                 Args:
                     writers (Iterable): Writer instances to insert
 
+                Returns:
+                    tuple of (inserted, duplicate) writer counts
+
                 Raises:
                     ValueError if one of the writers is not an instance
                     of Writer. In the case none of the writers will be
@@ -125,82 +289,123 @@ class TweetDB:
         """
         if any([not isinstance(e, Writer) for e in writers]):
             raise ValueError(Writer)
-        with self.conn:
-            for writer in writers:
-                self._insert_writer_executer(writer)
+        with DB_COMMIT_SECONDS.time(table='Writer'), self.conn:
+            inserted, duplicate = self._insert_writers_executer(writers)
+        DB_ROWS.inc(inserted, table='Writer', result='inserted')
+        DB_ROWS.inc(duplicate, table='Writer', result='duplicate')
+        return inserted, duplicate
 
-    def _insert_tweet_executer(self, tweet: Tweet) -> None:
+    def insert_unreachable_writers(self, unreachables) -> None:
         """
-            Executes a insert operation on single tweet.
-            Commit is needed after execution.
+            Records writers whose profiles cannot be collected, so that they
+            are not visited again. Recorded writers are skipped.
 
                 Args:
-                    `tweet` (Tweet): Tweet instance to insert
+                    `unreachables` (iterable): UnreachableWriter instances
         """
-        try:
-            self.c.execute(
-                """
-                    INSERT INTO Tweet VALUES (
-                        :tweet_id,
-                        :writer,
-                        :post_date,
-                        :body,
-                        :comment_num,
-                        :retweet_num,
-                        :like_num
-                    )
-                """,
-                {
-                    'tweet_id': tweet.tweet_id,
-                    'writer': tweet.writer,
-                    'post_date': time.mktime(tweet.post_date),
-                    'body': tweet.body,
-                    'comment_num': tweet.comment_num,
-                    'retweet_num': tweet.retweet_num,
-                    'like_num': tweet.like_num
-                }
-            )
-        except sqlite3.IntegrityError:
-            print(f"Existing tweet: {tweet.tweet_id}")
-        try:
-            self.c.execute(
+        with self.conn:
+            self.c.executemany(
                 """
-                    INSERT INTO SearchKey_Tweet VALUES (
-                        :tweet_id,
-                        :searchKey
-                    )
+                    INSERT INTO UnreachableWriter VALUES (?, ?)
+                    ON CONFLICT DO NOTHING
                 """,
-                {
-                    'tweet_id': tweet.tweet_id,
-                    'searchKey': tweet.searchKey
-                }
+                [(unreachable.user_id, unreachable.status)
+                 for unreachable in unreachables]
             )
-        except sqlite3.IntegrityError:
-            print(
-                f"Existing tweet-searchKey pair: {tweet.tweet_id}-{tweet.searchKey}")
 
-    def insert_tweet(self, tweet: Tweet) -> None:
+    def get_unreachable_writers(self) -> list:
+        """Returns list of UnreachableWriter"""
+        self.c.execute("SELECT user_id, status FROM UnreachableWriter")
+        return [UnreachableWriter(*row) for row in self.c.fetchall()]
+
+    def get_missing_writers(self) -> list:
+        """
+            Returns ids of writers of collected tweets whose profiles are
+            neither collected nor recorded as unreachable
+        """
+        return [row[0] for row in self._iter_query(
+            """
+                SELECT DISTINCT writer FROM Tweet
+                EXCEPT
+                SELECT user_id FROM Writer
+                EXCEPT
+                SELECT user_id FROM UnreachableWriter
+            """)]
+
+    def _insert_tweets_executer(self, tweets) -> tuple:
+        """
+            Executes a bulk insert operation on tweets and their search keys
+            (a pair for each key if `searchKey` of a tweet is a tuple),
+            existing tweets and tweet-searchKey pairs are skipped.
+            Commit is needed after execution.
+
+                Args:
+                    `tweets` (iterable): Tweet instances to insert
+
+                Returns:
+                    tuple of (inserted, duplicate) tweet counts
+        """
+        tweets = list(tweets)
+        self.c.executemany(
+            """
+                INSERT INTO Tweet VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+            """,
+            [(tweet.tweet_id,
+              tweet.writer,
+              tweet.timestamp,
+              tweet.body,
+              tweet.comment_num,
+              tweet.retweet_num,
+              tweet.like_num)
+             for tweet in tweets]
+        )
+        inserted = max(self.c.rowcount, 0)
+        self.c.executemany(
+            """
+                INSERT INTO SearchKey_Tweet VALUES (?, ?)
+                ON CONFLICT DO NOTHING
+            """,
+            [(tweet.tweet_id, searchKey)
+             for tweet in tweets for searchKey in self._search_keys(tweet)]
+        )
+        return inserted, len(tweets) - inserted
+
+    @staticmethod
+    def _search_keys(tweet: Tweet) -> tuple:
+        """Returns search keys of a tweet (a tweet of a key group has many)"""
+        if isinstance(tweet.searchKey, (tuple, list)):
+            return tweet.searchKey
+        return (tweet.searchKey,)
+
+    def insert_tweet(self, tweet: Tweet) -> tuple:
         """
             Inserts single tweet.
 
                 Args:
                     `tweet` (Tweet): Tweet instance to insert
 
+                Returns:
+                    tuple of (inserted, duplicate) tweet counts
+
                 Raises:
                     TypeError if input tweet is not a Tweet instance
         """
         if not isinstance(tweet, Tweet):
             raise TypeError(Tweet)
         with self.conn:
-            self._insert_tweet_executer(tweet)
+            return self._insert_tweets_executer((tweet,))
 
-    def insert_tweets(self, tweets):
+    def insert_tweets(self, tweets) -> tuple:
         """
             Inserts multiple tweets.  
 
                 Args:
                     `tweets` (iterable): any iterable that contains Tweet
 
+                Returns:
+                    tuple of (inserted, duplicate) tweet counts
+
                 Raises:
                     ValueError if input tweets contains at least one value that 
                     is not a Tweet instance. In the case, none of the tweets 
@@ -209,11 +414,147 @@ class TweetDB:
         """
         if any([not isinstance(tweet, Tweet) for tweet in tweets]):
             raise ValueError(Tweet)
+        with DB_COMMIT_SECONDS.time(table='Tweet'), self.conn:
+            inserted, duplicate = self._insert_tweets_executer(tweets)
+        DB_ROWS.inc(inserted, table='Tweet', result='inserted')
+        DB_ROWS.inc(duplicate, table='Tweet', result='duplicate')
+        return inserted, duplicate
+
+    def update_window_progress(self, progresses) -> None:
+        """
+            Records collection progress of windows. Oldest tweet of a window
+            only moves back in time and a completed window stays completed.
+
+                Args:
+                    `progresses` (iterable): WindowProgress instances
+        """
         with self.conn:
-            for tweet in tweets:
-                self.insert_tweet(tweet)
+            self.c.executemany(
+                """
+                    INSERT INTO WindowProgress VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (searchKey, since, until) DO UPDATE SET
+                        oldest_post_date = CASE
+                            WHEN oldest_post_date IS NULL
+                              OR excluded.oldest_post_date < oldest_post_date
+                            THEN excluded.oldest_post_date
+                            ELSE oldest_post_date END,
+                        oldest_tweet_id = CASE
+                            WHEN oldest_post_date IS NULL
+                              OR excluded.oldest_post_date < oldest_post_date
+                            THEN excluded.oldest_tweet_id
+                            ELSE oldest_tweet_id END,
+                        completed = MAX(completed, excluded.completed)
+                """,
+                [(progress.searchKey,
+                  str(progress.since),
+                  str(progress.until),
+                  progress.oldest_post_date,
+                  progress.oldest_tweet_id,
+                  int(progress.completed))
+                 for progress in progresses]
+            )
 
-    def _get_tweets_by_query(self, query: str, searchKey: str) -> list:
+    def merge_database(self, database_name: str) -> int:
+        """
+            Copies rows of another TweetDB (e.g. a shard of a node, see
+            `leaseTable`) into this one. Rows that already exist are kept,
+            window progresses are merged with `update_window_progress`.
+
+                Args:
+                    `database_name` (str): name of the database (without .db)
+
+                Returns:
+                    number of inserted tweets
+        """
+        self.c.execute("ATTACH DATABASE ? AS shard", (database_name + '.db',))
+        try:
+            with self.conn:
+                before = self.conn.total_changes
+                self.c.execute("INSERT OR IGNORE INTO Tweet SELECT * FROM shard.Tweet")
+                inserted = self.conn.total_changes - before
+                # Coverage of inserted keys is counted by TR_tweet_coverage
+                self.c.execute(
+                    "INSERT OR IGNORE INTO SearchKey_Tweet SELECT * FROM shard.SearchKey_Tweet")
+                self.c.execute("INSERT OR IGNORE INTO Writer SELECT * FROM shard.Writer")
+                self.c.execute(
+                    "INSERT OR IGNORE INTO UnreachableWriter SELECT * FROM shard.UnreachableWriter")
+            self.c.execute("SELECT * FROM shard.WindowProgress")
+            self.update_window_progress(
+                [self._window_progress_from_row(row) for row in self.c.fetchall()])
+        finally:
+            self.c.execute("DETACH DATABASE shard")
+        DB_ROWS.inc(inserted, table='Tweet', result='inserted')
+        return inserted
+
+    @staticmethod
+    def _window_bound(value: str):
+        """Converts stored window bound to datetime.date or datetime.datetime"""
+        if len(value) > 10:
+            return datetime.fromisoformat(value)
+        return date.fromisoformat(value)
+
+    def _window_progress_from_row(self, row) -> WindowProgress:
+        return WindowProgress(row[0],
+                              self._window_bound(row[1]),
+                              self._window_bound(row[2]),
+                              row[3],
+                              row[4],
+                              bool(row[5]))
+
+    def get_window_progress(self, searchKey, since, until) -> WindowProgress:
+        """Returns WindowProgress of the window or None if it is not started"""
+        self.c.execute(
+            "SELECT * FROM WindowProgress WHERE searchKey=? AND since=? AND until=?",
+            (searchKey, str(since), str(until)))
+        row = self.c.fetchone()
+        return self._window_progress_from_row(row) if row else None
+
+    def get_window_groups(self) -> list:
+        """Returns search keys (or key group names) that have recorded
+        window progress"""
+        self.c.execute("SELECT DISTINCT searchKey FROM WindowProgress ORDER BY searchKey")
+        return [row[0] for row in self.c.fetchall()]
+
+    def get_window_progresses(self, searchKey, completed=None) -> list:
+        """
+            Returns WindowProgress list of started windows of search key.
+
+                Args:
+                    `searchKey` (str): search key
+                    `completed` (bool): filter by completion (default: all)
+        """
+        if completed is None:
+            self.c.execute(
+                "SELECT * FROM WindowProgress WHERE searchKey=? ORDER BY since",
+                (searchKey,))
+        else:
+            self.c.execute(
+                "SELECT * FROM WindowProgress WHERE searchKey=? AND completed=? ORDER BY since",
+                (searchKey, int(completed)))
+        return [self._window_progress_from_row(row) for row in self.c.fetchall()]
+
+    def _iter_query(self, query: str, params=(), chunk_size=1000):
+        """
+            Generator that executes a query on its own cursor and yields rows,
+            reading `chunk_size` rows at once.
+
+                Args:
+                    `query` (str): SQLite query with `?` placeholders
+                    `params` (sequence): values bound to placeholders
+                    `chunk_size` (int): number of rows fetched at once
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def _get_tweets_by_query(self, query: str, searchKey: str, params=()) -> list:
         """
             Recieves tweets from database with given query.
 
@@ -221,51 +562,171 @@ class TweetDB:
                     `query` (str): SQLite query that will be executed
                                    (e.g. `"SELECT * FROM Tweet"`)
                     `searchKey` (str): search key
+                    `params` (sequence): values bound to `?` placeholders
 
                 Returns:
                     A list that contains Tweet instances created from executed
                     `query`
         """
-        self.c.execute(query)
-        tweets = []
-        for row in self.c.fetchall():
-            tweets.append(Tweet(tweet_id=row[0],
-                                writer=row[1],
-                                post_date=time.localtime(row[2]),
-                                body=row[3],
-                                searchKey=searchKey,
-                                comment_num=row[4],
-                                retweet_num=row[5],
-                                like_num=row[6]))
+        return [self._tweet_from_row(row, searchKey)
+                for row in self._iter_query(query, params)]
+
+    @staticmethod
+    def _tweet_from_row(row, searchKey) -> Tweet:
+        return Tweet(tweet_id=row[0],
+                     writer=row[1],
+                     post_date=row[2],
+                     body=row[3],
+                     searchKey=searchKey,
+                     comment_num=row[4],
+                     retweet_num=row[5],
+                     like_num=row[6])
 
-        return tweets
+    def iter_tweets(self, since=None, until=None, writer=None, searchKey=None,
+                    raw=False, chunk_size=1000):
+        """
+            Generator of tweets that match all given filters. Rows are read
+            `chunk_size` at a time with bound parameters, so memory use does
+            not depend on result size and statements are reused from
+            connection's statement cache.
+
+                Args:
+                    `since` (datetime.date|int): earliest post date (UTC date,
+                        datetime or epoch seconds)
+                    `until` (datetime.date|int): post date limit (exclusive)
+                    `writer` (str): id of owner of tweets
+                    `searchKey` (str): search key that tweets are found with
+                    `raw` (bool): yield row tuples of (tweet_id, writer,
+                        post_date, body, comment_num, retweet_num, like_num)
+                        instead of Tweet instances
+                    `chunk_size` (int): number of rows fetched at once
+
+                Yields:
+                    Tweet instances (or row tuples if `raw`) ordered by post date
+        """
+        conditions = []
+        params = []
+        if searchKey is not None:
+            query = ("SELECT Tweet.* FROM Tweet JOIN SearchKey_Tweet "
+                     "ON SearchKey_Tweet.tweet_id = Tweet.tweet_id")
+            conditions.append("SearchKey_Tweet.searchKey = ?")
+            params.append(searchKey)
+        else:
+            query = "SELECT Tweet.* FROM Tweet"
+        if since is not None:
+            conditions.append("Tweet.post_date >= ?")
+            params.append(since if isinstance(since, int)
+                          else self.date_to_seconds(since))
+        if until is not None:
+            conditions.append("Tweet.post_date < ?")
+            params.append(until if isinstance(until, int)
+                          else self.date_to_seconds(until))
+        if writer is not None:
+            conditions.append("Tweet.writer = ?")
+            params.append(writer)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY Tweet.post_date"
+
+        rows = self._iter_query(query, params, chunk_size=chunk_size)
+        if raw:
+            yield from rows
+        else:
+            for row in rows:
+                yield self._tweet_from_row(row, searchKey)
 
     def get_tweet(self, tweet_id, searchKey) -> Tweet:
         return self._get_tweets_by_query(
-            f"SELECT * FROM Tweet WHERE tweet_id={tweet_id}", searchKey)[0]
+            "SELECT * FROM Tweet WHERE tweet_id=?", searchKey, (tweet_id,))[0]
 
     def get_searchKey_tweets(self, searchKey) -> list:
-        return self._get_tweets_by_query(
-            f"""
-                SELECT * 
-                FROM Tweet
-                WHERE tweet_id=(
-                    SELECT tweet_id
-                    FROM SearchKey_Tweet
-                    WHERE searchKey='{searchKey}'
-                )
-            """,
-            searchKey
-        )
+        return list(self.iter_tweets(searchKey=searchKey))
+
+    def iter_tweet_ids(self, searchKey=None, chunk_size=10000):
+        """
+            Generator of stored tweet ids, reads `chunk_size` ids at once.
+
+                Args:
+                    `searchKey` (str): only ids of tweets found by the search
+                        key (default: all tweets)
+        """
+        if searchKey is None:
+            rows = self._iter_query("SELECT tweet_id FROM Tweet",
+                                    chunk_size=chunk_size)
+        else:
+            rows = self._iter_query(
+                "SELECT tweet_id FROM SearchKey_Tweet WHERE searchKey=?",
+                (searchKey,), chunk_size=chunk_size)
+        for row in rows:
+            yield row[0]
 
     def get_searchKeys(self):
         self.c.execute("SELECT DISTINCT searchKey FROM SearchKey_Tweet")
         return self.c.fetchall()
 
-    def get_companies_by_query(self, query):
-        self.c.execute(query)
+    def get_hourly_counts(self, searchKey=None) -> dict:
+        """
+            Counts tweets per hour of post date from TweetCoverage table.
+
+                Args:
+                    `searchKey` (str): count only tweets of the search key
+                        (default: all search keys, a tweet found by several
+                        keys is counted once per key)
+
+                Returns:
+                    dict of <datetime.datetime (hour), tweet count>
+        """
+        if searchKey is None:
+            self.c.execute(
+                "SELECT hour, SUM(tweet_count) FROM TweetCoverage GROUP BY hour")
+        else:
+            self.c.execute(
+                "SELECT hour, tweet_count FROM TweetCoverage WHERE searchKey=?",
+                (searchKey,))
+        return {datetime.strptime(hour, "%Y-%m-%d %H"): count
+                for hour, count in self.c.fetchall()}
+
+    def get_daily_counts(self, searchKey=None) -> dict:
+        """
+            Counts tweets per day of post date from TweetCoverage table.
+
+                Args:
+                    `searchKey` (str): count only tweets of the search key
+                        (default: all search keys, a tweet found by several
+                        keys is counted once per key)
+
+                Returns:
+                    dict of <datetime.date, tweet count>
+        """
+        if searchKey is None:
+            self.c.execute(
+                """
+                    SELECT substr(hour, 1, 10) AS day, SUM(tweet_count)
+                    FROM TweetCoverage
+                    GROUP BY day
+                """)
+        else:
+            self.c.execute(
+                """
+                    SELECT substr(hour, 1, 10) AS day, SUM(tweet_count)
+                    FROM TweetCoverage
+                    WHERE searchKey=?
+                    GROUP BY day
+                """,
+                (searchKey,))
+        return {date.fromisoformat(day): count
+                for day, count in self.c.fetchall()}
+
+    def get_companies_by_query(self, query, params=()):
+        self.c.execute(query, params)
         return self.c.fetchall()
 
+    @staticmethod
+    def date_to_seconds(value) -> int:
+        """Converts datetime.date or datetime.datetime (in UTC) to seconds as
+        post dates are stored"""
+        return calendar.timegm(value.timetuple())
+
     @staticmethod
     def struct_to_seconds(time_struct: time.struct_time):
         epoch = datetime(1970, 1, 1)
@@ -1,21 +1,42 @@
 import argparse
+import asyncio
 import datetime
+import functools
 import json
 import os
+import socket
 import time
-from multiprocessing import cpu_count
-from threading import Thread
-
-from collector import Collector, WebDriverException
-from tweetDB import TweetDB
+from multiprocessing import cpu_count, get_all_start_methods
+
+from asyncCollector import AsyncCollector, AsyncEngine
+from browserProfile import lean_profile_from_settings
+from bufferedQue import SeenIDs
+from cliArgs import bool_argument
+from collector import EXTRACTION_MODES, PACING_MODES
+from dbWriter import DBWriter
+from leaseTable import (LeaseKeeper, SQLiteLeaseTable, WorkItem,
+                        shard_name)
+from metrics import LOG_FORMATS, MetricsExporter, log, set_log_format
+from pageArchive import PageArchive
+from pageParser import close_parser_pool, parser_pool
+from scheduler import Scheduler, Window, WindowResult
+from searchKeys import (GroupContainer, KeyWindow, group_keys,
+                        interleave_windows, keys_label, merge_counts,
+                        parse_key, read_keys_file, recorded_groups)
+from sessionPool import SessionPool
+from tweetDB import TweetDB, WindowProgress
+from windowPlanner import plan_windows, resume_bound, retry_windows
 
 argv_parser = argparse.ArgumentParser()
 # Search parameters
-argv_parser.add_argument('-k', '--searchKey', type=str, required=True,
-                         help="search-key that will be searched")
+key_parser = argv_parser.add_mutually_exclusive_group(required=True)
+key_parser.add_argument('-k', '--searchKey', type=str, nargs='+',
+                        help="search-key(s) that will be searched")
+key_parser.add_argument('-K', '--keys_file', type=str,
+                        help="file of search-keys, one per line")
 argv_parser.add_argument('-a', '--search_as', type=str, default='tag',
                          choices=['tag', 'stock', 'word'],
-                         help="search key as a tag(#), stock($) or word")
+                         help="search keys without '#' or '$' prefix as a tag(#), stock($) or word")
 argv_parser.add_argument('-s', '--start_date', type=str, required=True,
                          help="starting date for search in YYYY-MM-DD format")
 argv_parser.add_argument('-e', '--end_date', type=str, required=True,
@@ -28,7 +49,7 @@ argv_parser.add_argument('-l', '--lang', type=str, default='en',
                                   'tr', 'uk', 'ur', 'vi', 'zh-cn', 'zh-tw'],
                          help="language of tweet to be collected")
 # Setting parameters
-argv_parser.add_argument('-f', '--settings_file', type=bool, required=True, default=True,
+argv_parser.add_argument('-f', '--settings_file', type=bool_argument, default=True,
                          help="use settings.json file (ignore setting parameters)")
 argv_parser.add_argument('-u', '--username', type=str, required=False,
                          help="username of twitter account")
@@ -41,6 +62,47 @@ argv_parser.add_argument('-t', '--thread_count', type=int, default=0, required=F
                          help="number of thread that is used in program")
 argv_parser.add_argument('-m', '--missing_run_count', type=int, default=1, required=False,
                          help="re-run number for missings dates")
+argv_parser.add_argument('-x', '--extraction', type=str, default='script',
+                         choices=EXTRACTION_MODES, required=False,
+                         help="tweet extraction mode of collectors")
+argv_parser.add_argument('-g', '--pacing', type=str, default='event',
+                         choices=PACING_MODES, required=False,
+                         help="wait for rendered tweets (event) or fixed seconds (sleep) after page loads and scrolls")
+argv_parser.add_argument('-r', '--recycle_pages', type=int, default=50, required=False,
+                         help="page loads after which a browser session is restarted (0 for never)")
+argv_parser.add_argument('-w', '--window_retries', type=int, default=2, required=False,
+                         help="re-run number of a failed date window")
+argv_parser.add_argument('-n', '--window_target_tweets', type=int, default=5000, required=False,
+                         help="expected tweet count per search window (0 for one day windows)")
+argv_parser.add_argument('-o', '--plan_from', type=str, default=None, required=False,
+                         help="database name (without .db) whose tweet counts are used to plan windows")
+argv_parser.add_argument('-b', '--db_batch_size', type=int, default=500, required=False,
+                         help="number of tweets committed to database at once")
+argv_parser.add_argument('-y', '--engine', type=str, default='thread',
+                         choices=['thread', 'async'], required=False,
+                         help="run browsers from worker threads (thread) or a single asyncio event loop (async)")
+argv_parser.add_argument('-j', '--key_group_tweets', type=int, default=2000, required=False,
+                         help="maximum daily tweet count of keys searched with one query (0 for one query per key)")
+argv_parser.add_argument('-z', '--key_group_size', type=int, default=10, required=False,
+                         help="maximum number of keys searched with one query")
+argv_parser.add_argument('-L', '--lean_profile', type=bool_argument, default=False, required=False,
+                         help="start browsers without images, media, fonts and unused features")
+argv_parser.add_argument('-M', '--metrics_file', type=str, default=None, required=False,
+                         help="path (without extension) of periodically written .prom and .json metrics files")
+argv_parser.add_argument('-H', '--metrics_port', type=int, default=None, required=False,
+                         help="port of local HTTP endpoint serving /metrics and /metrics.json")
+argv_parser.add_argument('-F', '--log_format', type=str, default='text',
+                         choices=LOG_FORMATS, required=False,
+                         help="plain text or JSON lines log output")
+argv_parser.add_argument('-A', '--archive_dir', type=str, default=None, required=False,
+                         help="capture tweet html of windows into archives of this directory "
+                              "instead of extracting tweets (see reparse.py)")
+argv_parser.add_argument('-P', '--parser_processes', type=int, default=0, required=False,
+                         help="number of processes parsing tweet html of lxml extraction (0 for cpu count)")
+argv_parser.add_argument('-C', '--lease_table', type=str, default=None, required=False,
+                         help="path of SQLite lease table shared by nodes of a multi-node run")
+argv_parser.add_argument('-N', '--node', type=str, default=None, required=False,
+                         help="name of this node in the lease table (default: <host>-<pid>)")
 args = argv_parser.parse_args()
 
 if args.settings_file:
@@ -55,6 +117,30 @@ if args.settings_file:
                     if settings["thread_count"] else cpu_count() * 2 - 1)
 
     MISSING_DATES_TRIAL_COUNT = settings["missing_run_count"]
+
+    EXTRACTION = settings.get("extraction", "script")
+    PACING = settings.get("pacing", "event")
+    RECYCLE_PAGES = settings.get("recycle_pages", 50)
+    WINDOW_RETRY_COUNT = settings.get("window_retries", 2)
+    WINDOW_TARGET_TWEETS = settings.get("window_target_tweets", 5000)
+    WINDOW_MAX_DAYS = settings.get("window_max_days", 7)
+    PLAN_FROM = settings.get("plan_from")
+    DB_BATCH_SIZE = settings.get("db_batch_size", 500)
+    DB_PRAGMAS = settings.get("db_pragmas")
+    KEY_GROUP_TWEETS = settings.get("key_group_tweets", 2000)
+    KEY_GROUP_SIZE = settings.get("key_group_size", 10)
+    ENGINE = settings.get("engine", "thread")
+    LEAN_PROFILE = lean_profile_from_settings(settings.get("lean_profile", False))
+    METRICS_FILE = settings.get("metrics_file")
+    METRICS_PORT = settings.get("metrics_port")
+    METRICS_INTERVAL = settings.get("metrics_interval", 10)
+    LOG_FORMAT = settings.get("log_format", "text")
+    ARCHIVE_DIR = settings.get("archive_dir")
+    PARSER_PROCESSES = settings.get("parser_processes", 0)
+    LEASE_TABLE = settings.get("lease_table")
+    NODE = settings.get("node")
+    LEASE_SECONDS = settings.get("lease_seconds", 120)
+    LEASE_ATTEMPTS = settings.get("lease_attempts", 3)
 else:
     USERNAME = args.username
     PASSWORD = args.password
@@ -64,25 +150,55 @@ else:
 
     MISSING_DATES_TRIAL_COUNT = args.missing_run_count
 
+    EXTRACTION = args.extraction
+    PACING = args.pacing
+    RECYCLE_PAGES = args.recycle_pages
+    WINDOW_RETRY_COUNT = args.window_retries
+    WINDOW_TARGET_TWEETS = args.window_target_tweets
+    WINDOW_MAX_DAYS = 7
+    PLAN_FROM = args.plan_from
+    DB_BATCH_SIZE = args.db_batch_size
+    DB_PRAGMAS = None
+    KEY_GROUP_TWEETS = args.key_group_tweets
+    KEY_GROUP_SIZE = args.key_group_size
+    ENGINE = args.engine
+    LEAN_PROFILE = lean_profile_from_settings(args.lean_profile)
+    METRICS_FILE = args.metrics_file
+    METRICS_PORT = args.metrics_port
+    METRICS_INTERVAL = 10
+    LOG_FORMAT = args.log_format
+    ARCHIVE_DIR = args.archive_dir
+    PARSER_PROCESSES = args.parser_processes
+    LEASE_TABLE = args.lease_table
+    NODE = args.node
+    LEASE_SECONDS = 120
+    LEASE_ATTEMPTS = 3
+
 if not os.path.isfile(CHROMEDRIVER_PATH):
     raise ValueError(f"missing chromedriver file: {CHROMEDRIVER_PATH}")
+if ENGINE == 'async' and EXTRACTION != 'script':
+    raise ValueError("async engine supports only script extraction")
+if EXTRACTION == 'lxml' and 'fork' not in get_all_start_methods():
+    # spawned parser processes would import and run this script again
+    raise ValueError("lxml extraction needs fork start method of processes")
+if ENGINE == 'async' and ARCHIVE_DIR:
+    raise ValueError("async engine does not support capturing to archives")
+
+if args.keys_file:
+    KEYS = read_keys_file(args.keys_file, args.search_as)
+else:
+    KEYS = []
+    for text in args.searchKey:
+        key = parse_key(text, args.search_as)
+        if key not in KEYS:
+            KEYS.append(key)
+if not KEYS:
+    raise ValueError("no search key is given")
 
-if args.search_as == 'tag':
-    if args.searchKey.startswith('$'):
-        print("WARNING: key starts with '$' but search_as selected as 'tag'. Consider using '-a stock'")
-    SEARCH_AS = '%23'
-elif args.search_as == 'stock':
-    if args.searchKey.startswith('#'):
-        print("WARNING: key starts with '#' but search_as selected as 'stock'. Consider using '-a tag'")
-    SEARCH_AS = '%24'
-elif args.search_as == 'word':
-    if args.searchKey.startswith('$'):
-        print("WARNING: key starts with '$' but search_as selected as 'word'. Consider using '-a word'")
-    elif args.searchKey.startswith('#'):
-        print("WARNING: key starts with '#' but search_as selected as 'word'. Consider using '-a word'")
-    SEARCH_AS = ''
-
-KEY = args.searchKey.replace('$', '').replace('#', '')
+NODE = NODE or f"{socket.gethostname()}-{os.getpid()}"
+
+DB_QUEUE_SIZE = DB_BATCH_SIZE * 20
+DB_FLUSH_SECONDS = 2.0
 
 LANG = args.lang
 
@@ -91,22 +207,87 @@ DATE_END = datetime.datetime.strptime(args.end_date, "%Y-%m-%d").date()
 DAY = datetime.timedelta(days=1)
 STEP = 1
 
-print(f"Collector is starting with {THREAD_COUNT} threads.")
-
-db_conn = TweetDB(f"{KEY}_{DATE_START}-{DATE_END}")
+# parser processes are forked before any thread is started
+if EXTRACTION == 'lxml':
+    parser_pool(PARSER_PROCESSES or None)
+
+set_log_format(LOG_FORMAT)
+metrics_exporter = MetricsExporter(METRICS_FILE, interval=METRICS_INTERVAL,
+                                   port=METRICS_PORT)
+metrics_url = metrics_exporter.start()
+if metrics_url is not None:
+    log('metrics', f"Serving metrics on {metrics_url}", url=metrics_url)
+
+log('start', f"Collector is starting with {THREAD_COUNT} threads.",
+    threads=THREAD_COUNT, engine=ENGINE)
+
+DB_NAME = f"{keys_label(KEYS, args.keys_file)}_{DATE_START}-{DATE_END}"
+if LEASE_TABLE:
+    # every node writes its own shard, shards are merged with leaseTable.py
+    DB_NAME = shard_name(DB_NAME, NODE)
+    lease_table = SQLiteLeaseTable(LEASE_TABLE, lease_seconds=LEASE_SECONDS,
+                                   max_attempts=LEASE_ATTEMPTS)
+    lease_keeper = LeaseKeeper(lease_table, NODE)
+    log('lease', f"Node {NODE} is writing {DB_NAME}.db", node=NODE,
+        database=DB_NAME)
+
+db_conn = TweetDB(DB_NAME, pragmas=DB_PRAGMAS)
 db_conn.create_tables()
 
-container_pool = [list() for _ in range(THREAD_COUNT)]
-
-
-def get_missing_dates(reverse_sorted: bool = False) -> list:
-    """Returns missing dates between DATE_START and DATE_END 
-    that are fetched from database"""
-    c = db_conn.conn.cursor()
-    c.execute("SELECT DISTINCT post_date FROM Tweet")
-    collected_dates = set([datetime.date.fromtimestamp(i[0])
-                           for i in c.fetchall()])
-    c.close()
+db_writer = DBWriter(DB_NAME, queue_size=DB_QUEUE_SIZE,
+                     batch_size=DB_BATCH_SIZE, flush_seconds=DB_FLUSH_SECONDS,
+                     pragmas=DB_PRAGMAS)
+db_writer.start()
+
+
+def open_plan_db() -> TweetDB:
+    """Returns PLAN_FROM database (or this run's database) to plan windows
+    from, an older PLAN_FROM database is migrated so that its tweet counts
+    are bucketed by UTC hours"""
+    if not PLAN_FROM:
+        return db_conn
+    plan_db = TweetDB(PLAN_FROM)
+    plan_db.create_tables()
+    return plan_db
+
+
+# groups recorded by an earlier run of this database are kept, so that
+# progress of their windows is found again
+KEY_GROUPS = recorded_groups(KEYS, db_conn.get_window_groups())
+grouped_keys = {key for group in KEY_GROUPS for key in group.keys}
+# other keys that are searched together, grouped by tweet counts of
+# planning database
+plan_db = open_plan_db()
+KEY_GROUPS += group_keys([key for key in KEYS if key not in grouped_keys],
+                         {key.key: plan_db.get_daily_counts(key.key)
+                          for key in KEYS if key not in grouped_keys},
+                         KEY_GROUP_TWEETS, max_keys=KEY_GROUP_SIZE)
+if plan_db is not db_conn:
+    plan_db.close_DB()
+log('plan', f"Searching {len(KEYS)} keys with {len(KEY_GROUPS)} queries.",
+    keys=len(KEYS), queries=len(KEY_GROUPS))
+
+# ids of collected tweets of each group shared by its collectors,
+# preloaded for resumed runs
+seen_ids = dict()
+for group in KEY_GROUPS:
+    seen_ids[group.name] = SeenIDs()
+    for key in group.keys:
+        seen_ids[group.name].update(db_conn.iter_tweet_ids(key.key))
+
+session_pool = SessionPool(THREAD_COUNT, USERNAME, PASSWORD,
+                           chromePath=CHROMEDRIVER_PATH,
+                           recycle_pages=RECYCLE_PAGES,
+                           capture_network=(EXTRACTION == 'network'),
+                           lean_profile=LEAN_PROFILE)
+
+
+def get_missing_dates(group, reverse_sorted: bool = False) -> list:
+    """Returns dates between DATE_START and DATE_END that have no tweets
+    of any key of the group in database"""
+    collected_dates = set()
+    for key in group.keys:
+        collected_dates.update(db_conn.get_daily_counts(key.key))
 
     all_dates = set([DATE_START + datetime.timedelta(days=i)
                      for i in range((DATE_END-DATE_START).days)])
@@ -114,76 +295,263 @@ def get_missing_dates(reverse_sorted: bool = False) -> list:
     return sorted(all_dates - collected_dates, reverse=reverse_sorted)
 
 
-def search_tweets_by_date_to_container(date: datetime.date, container: list):
-    """Main searching function that runs on thread"""
-    collector = Collector(USERNAME, PASSWORD, chromePath=CHROMEDRIVER_PATH)
-
-    from_ = date
-    to_ = date + DAY*STEP
-
-    print(f"Collecting {KEY}: {from_} - {to_}")
-
+def prepare_window(key_window: KeyWindow):
+    """Continues from recorded progress of the window. Returns search
+    limit (`until`) and checkpoint callback of the window, or None if
+    window is already collected"""
+    group = key_window.group
+    window = Window(key_window.since, key_window.until)
+
+    progress_db = TweetDB(DB_NAME)
+    progress = progress_db.get_window_progress(group.name, window.since,
+                                               window.until)
+    progress_db.close_DB()
+
+    until = resume_bound(window, progress)
+    if until is None:
+        log('window_skip', f"Already collected {group.name}: {window.since} - {window.until}",
+            group=group.name, since=window.since, until=window.until)
+        return None
+
+    if until != window.until:
+        # continue from the oldest collected second of the window
+        log('window_resume',
+            f"Resuming {group.name}: {window.since} - {window.until} from {until}",
+            group=group.name, since=window.since, until=window.until,
+            resume_from=until)
+    else:
+        db_writer.put_progress(WindowProgress(group.name, window.since,
+                                              window.until, None, None, False))
+
+    def checkpoint(oldest, completed):
+        db_writer.put_progress(WindowProgress(
+            group.name, window.since, window.until,
+            oldest.timestamp if oldest else None,
+            oldest.tweet_id if oldest else None,
+            completed))
+
+    log('window_start', f"Collecting {group.name}: {window.since} - {until}",
+        group=group.name, since=window.since, until=until)
+    return until, checkpoint
+
+
+def search_tweets_by_window(key_window: KeyWindow) -> int:
+    """Main searching function that runs on scheduler workers.
+    Tweets and progress are handed to database writer (tweet html to an
+    archive if ARCHIVE_DIR is set), returns number of tweets after they are
+    committed (raises DBWriterError if they could not be written)"""
+    db_writer.check()
+    prepared = prepare_window(key_window)
+    if prepared is None:
+        return 0
+    until, checkpoint = prepared
+    group = key_window.group
+
+    with session_pool.lease() as collector:
+        collector.search(group.query, tabName='live',
+                         from_=key_window.since, to_=until, lang=LANG,
+                         pacing=PACING)
+        if ARCHIVE_DIR:
+            archive = PageArchive(ARCHIVE_DIR, group.name, key_window.since,
+                                  key_window.until, lang=LANG, keys=group.keys)
+            count = collector.capture_to_archive(archive, pacing=PACING,
+                                                 checkpoint=checkpoint)
+        else:
+            count = collector.retrieve_tweets_to_container(
+                group.name, GroupContainer(group, db_writer), lang=LANG,
+                extraction=EXTRACTION, pacing=PACING, checkpoint=checkpoint,
+                seen=seen_ids[group.name])
+    db_writer.sync()
+    return count
+
+
+async def async_search_tweets_by_window(collector: AsyncCollector,
+                                        key_window: KeyWindow) -> int:
+    """asyncio version of `search_tweets_by_window` that runs on async
+    engine workers. Database calls are run on the default executor so that
+    other collectors of the loop are not blocked"""
+    db_writer.check()
+    loop = asyncio.get_running_loop()
+    prepared = await loop.run_in_executor(None, prepare_window, key_window)
+    if prepared is None:
+        return 0
+    until, checkpoint = prepared
+    group = key_window.group
+
+    await collector.search(group.query, tabName='live',
+                           from_=key_window.since, to_=until, lang=LANG,
+                           pacing=PACING)
+    count = await collector.retrieve_tweets_to_container(
+        group.name, GroupContainer(group, db_writer), lang=LANG,
+        extraction=EXTRACTION, pacing=PACING, checkpoint=checkpoint,
+        seen=seen_ids[group.name])
+    await loop.run_in_executor(None, db_writer.sync)
+    return count
+
+
+def window_collection(result: WindowResult):
+    """reports a finished window, and completes or gives back its lease
+    in lease table mode"""
+    name = result.window.group.name
+    if LEASE_TABLE:
+        item = WorkItem(name, result.window.since, result.window.until)
+        lease_keeper.drop(item)
+        if result.status == 'done':
+            lease_table.complete(NODE, item)
+        else:
+            lease_table.release(NODE, item, failed=(result.status == 'failed'))
+    fields = dict(group=name, since=result.window.since,
+                  until=result.window.until, status=result.status,
+                  attempts=result.attempts, elapsed=round(result.elapsed, 3))
+    if result.status == 'failed':
+        log('window_end',
+            f"Window {name}: {result.window.since} - {result.window.until} "
+            f"failed after {result.attempts} attempts: {result.error}",
+            error=str(result.error), **fields)
+    else:
+        log('window_end',
+            f"Window {name}: {result.window.since} - {result.window.until} "
+            f"{result.status}: {result.value} tweets in {result.elapsed:.1f}s",
+            tweets=result.value, **fields)
+
+
+def date_windows(dates_list: list) -> list:
+    """Returns a window of STEP days for each date"""
+    return [Window(date, date + DAY*STEP) for date in dates_list]
+
+
+def get_planned_windows(group) -> list:
+    """Plans windows of a key group between DATE_START and DATE_END from
+    tweet counts of PLAN_FROM database (or this run's database). The plan
+    is recorded as progress of not started windows, a restarted run keeps
+    the recorded plan since counts of this run's database have changed"""
+    progresses = db_conn.get_window_progresses(group.name)
+    if progresses:
+        return [Window(progress.since, progress.until)
+                for progress in progresses]
+
+    if not WINDOW_TARGET_TWEETS:
+        windows = date_windows([DATE_START + datetime.timedelta(days=i)
+                                for i in range((DATE_END-DATE_START).days)])
+    else:
+        plan_db = open_plan_db()
+        hourly_counts = merge_counts(plan_db.get_hourly_counts(key.key)
+                                     for key in group.keys)
+        if plan_db is not db_conn:
+            plan_db.close_DB()
+        windows = plan_windows(DATE_START, DATE_END, hourly_counts,
+                               WINDOW_TARGET_TWEETS, max_days=WINDOW_MAX_DAYS)
+
+    db_conn.update_window_progress(
+        WindowProgress(group.name, window.since, window.until, None, None, False)
+        for window in windows)
+    return windows
+
+
+def get_retry_windows(group) -> list:
+    """Returns started but incomplete windows of a key group and windows of
+    missing dates that are not covered by a recorded window"""
+    return retry_windows(db_conn.get_window_progresses(group.name),
+                         get_missing_dates(group), step_days=STEP)
+
+
+def collection_process(key_windows: list, source=None, poll_seconds=5.0) -> list:
+    """Searching process controller funtion. 
+    Schedules (key group, window) items, and items of `source` whenever a
+    worker is free (see `Scheduler.run`), returns WindowResult list"""
+    if ENGINE == 'async':
+        engine = AsyncEngine(
+            functools.partial(AsyncCollector.start, USERNAME, PASSWORD,
+                              chromePath=CHROMEDRIVER_PATH,
+                              lean_profile=LEAN_PROFILE),
+            THREAD_COUNT, retry_count=WINDOW_RETRY_COUNT,
+            recycle_pages=RECYCLE_PAGES)
+        results = asyncio.run(engine.run(key_windows,
+                                         async_search_tweets_by_window,
+                                         on_result=window_collection,
+                                         source=source,
+                                         poll_seconds=poll_seconds))
+    else:
+        scheduler = Scheduler(search_tweets_by_window, THREAD_COUNT,
+                              retry_count=WINDOW_RETRY_COUNT,
+                              on_cancel=session_pool.stop_leased)
+        results = scheduler.run(key_windows, on_result=window_collection,
+                                source=source, poll_seconds=poll_seconds)
+    db_writer.flush()
+    log('windows', f"Windows: {Scheduler.summary(results)}",
+        summary=Scheduler.summary(results))
+    return results
+
+
+def lease_collection(key_windows: list) -> None:
+    """Adds windows to lease table (unless another node already planned
+    their key groups) and collects windows claimed by this node until every
+    window of the table is done or failed. A window is claimed whenever a
+    worker is free"""
+    groups = {group.name: group for group in KEY_GROUPS}
+    added = lease_table.add(WorkItem(window.group.name, window.since, window.until)
+                            for window in key_windows)
+    log('lease', f"Added {added} windows to lease table.", windows=added)
+
+    def claim_windows(count):
+        items = lease_table.claim(NODE, count, groups)
+        if items:
+            lease_keeper.hold(items)
+            return [KeyWindow(groups[item.searchKey], item.since, item.until)
+                    for item in items]
+        # windows of other nodes are claimed when their leases expire
+        return None if lease_table.finished() else []
+
+    lease_keeper.start()
     try:
-        collector.search(SEARCH_AS + KEY, tabName='live',
-                         from_=from_, to_=to_, lang=LANG)
-        collector.retrieve_tweets_to_container(KEY, container, lang=LANG)
-    except WebDriverException as e:
-        print(f"An error occured in browser:\n{str(e)}\nClosing browser...")
-        collector.closeAll()
+        collection_process([], source=claim_windows,
+                           poll_seconds=LEASE_SECONDS / 4)
     finally:
-        container_pool.append(container)
-
-
-def container_collection(container: list):
-    """pushes content of container to database and empties the container"""
-    while len(container) > 0:
-        db_conn.insert_tweet(container.pop())
-    db_conn.conn.commit()
-
-
-def collection_process(dates_list: list):
-    """Searching process controller funtion. 
-    Opens threads and manages containers"""
-    while len(dates_list) > 0:
-        if len(container_pool) > 0:
-            process_container = container_pool.pop()
-            container_collection(process_container)
-
-            process_date = dates_list.pop()
-
-            def target_func():
-                search_tweets_by_date_to_container(process_date,
-                                                   process_container)
-
-            Thread(target=target_func).start()
-
-        else:
-            time.sleep(3)
-
-    while len(container_pool) != THREAD_COUNT:
-        time.sleep(3)
-
-    for container in container_pool:
-        container_collection(container)
+        lease_keeper.close()
+    log('lease', f"Lease table: {lease_table.counts()}",
+        **lease_table.counts())
 
 
 t0 = time.time()
+try:
+    # plan windows
+    target_windows = interleave_windows([(group, get_planned_windows(group))
+                                         for group in KEY_GROUPS])
+    log('plan', f"Planned {len(target_windows)} windows.", windows=len(target_windows))
+    # start collection
+    if LEASE_TABLE:
+        lease_collection(target_windows)
+        results = []
+    else:
+        results = collection_process(target_windows)
+
+    # start collection for incomplete windows and missing dates
+    # (lease table re-claims windows instead)
+    for _ in range(0 if LEASE_TABLE else MISSING_DATES_TRIAL_COUNT):
+        if any(result.status == 'cancelled' for result in results):
+            break
+
+        pending_windows = interleave_windows(
+            [(group, get_retry_windows(group)) for group in KEY_GROUPS])
+        log('plan', f"Number of incomplete windows: {len(pending_windows)}",
+            windows=len(pending_windows))
+
+        if len(pending_windows) == 0:
+            break
+
+        results = collection_process(pending_windows)
+finally:
+    session_pool.close()
+    try:
+        # raises DBWriterError if tweets are lost
+        db_writer.close()
+    finally:
+        close_parser_pool()
+        metrics_exporter.close()
 
-# extract dates
-target_dates = sorted([DATE_START + datetime.timedelta(days=i)
-                       for i in range((DATE_END-DATE_START).days)],
-                      reverse=True)
-# start collection
-collection_process(target_dates)
-
-# start collection for missing dates
-for _ in range(MISSING_DATES_TRIAL_COUNT):
-    missing_dates = get_missing_dates(reverse_sorted=True)
-    print(f"Number of missing days: {len(missing_dates)}")
-
-    if len(missing_dates) > 0:
-        break
-
-    collection_process(missing_dates)
+log('finish', f"Inserted {db_writer.inserted_count} tweets, "
+    f"skipped {db_writer.duplicate_count} existing tweets",
+    inserted=db_writer.inserted_count, duplicate=db_writer.duplicate_count)
 
-print(f"Collector finished in {datetime.timedelta(seconds=time.time() - t0)}")
+log('finish', f"Collector finished in {datetime.timedelta(seconds=time.time() - t0)}",
+    seconds=round(time.time() - t0, 3))
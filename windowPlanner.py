@@ -0,0 +1,162 @@
+import datetime
+import math
+
+from scheduler import Window
+
+DAY = datetime.timedelta(days=1)
+HOUR = datetime.timedelta(hours=1)
+
+
+def _day_windows(day: datetime.date, hourly: dict, target_tweets: int,
+                 min_hours: int) -> list:
+    """
+        Splits a day into hour aligned windows of about `target_tweets`
+        tweets each according to hourly tweet counts.
+
+            Args:
+                `day` (datetime.date): day to split
+                `hourly` (dict): <hour (int), tweet count> of the day
+                `target_tweets` (int): expected tweet count per window
+                `min_hours` (int): minimum length of a window in hours
+
+            Returns:
+                list of (Window, expected tweet count) tuples
+    """
+    start = datetime.datetime.combine(day, datetime.time())
+    day_total = sum(hourly.values())
+    window_count = min(math.ceil(day_total / target_tweets), 24 // min_hours)
+    share = day_total / window_count
+
+    windows = []
+    since_hour = 0
+    count = 0
+    for hour in range(24):
+        count += hourly.get(hour, 0)
+        hours = hour + 1 - since_hour
+        remaining_hours = 24 - hour - 1
+        if (hour == 23 or
+                (count >= share and hours >= min_hours and
+                 remaining_hours >= min_hours)):
+            windows.append((Window(start + HOUR * since_hour,
+                                   start + HOUR * (hour + 1)), count))
+            since_hour = hour + 1
+            count = 0
+    return windows
+
+
+def plan_windows(date_start: datetime.date, date_end: datetime.date,
+                 hourly_counts: dict, target_tweets: int, min_hours=1,
+                 max_days=7) -> list:
+    """
+        Plans search windows between `date_start` and `date_end` (exclusive)
+        so that each window holds about `target_tweets` tweets. Days with
+        more tweets are split into hour aligned windows, consecutive sparse
+        days are merged into a multi-day window. Days without any counts are
+        planned as single day windows.
+
+            Args:
+                `date_start` (datetime.date): first day
+                `date_end` (datetime.date): day after the last day
+                `hourly_counts` (dict): <datetime.datetime (hour), tweet count>
+                    observed earlier (e.g. `TweetDB.get_hourly_counts`)
+                `target_tweets` (int): expected tweet count per window
+                `min_hours` (int): minimum length of a split window in hours
+                `max_days` (int): maximum length of a merged window in days
+
+            Returns:
+                list of Window, windows with more expected tweets first so that
+                long windows do not start last
+    """
+    daily = dict()
+    for hour, count in hourly_counts.items():
+        daily.setdefault(hour.date(), dict())[hour.hour] = count
+
+    planned = []
+    merged_since = None
+    merged_count = 0
+    day = date_start
+    while day < date_end:
+        hourly = daily.get(day)
+        day_total = sum(hourly.values()) if hourly else None
+
+        # close running merged window if the day does not fit in
+        if merged_since is not None and (
+                day_total is None or
+                merged_count + day_total > target_tweets or
+                (day - merged_since).days >= max_days):
+            planned.append((Window(merged_since, day), merged_count))
+            merged_since = None
+            merged_count = 0
+
+        if day_total is None:
+            planned.append((Window(day, day + DAY), target_tweets))
+        elif day_total > target_tweets:
+            planned.extend(_day_windows(day, hourly, target_tweets, min_hours))
+        else:
+            if merged_since is None:
+                merged_since = day
+            merged_count += day_total
+        day += DAY
+
+    if merged_since is not None:
+        planned.append((Window(merged_since, date_end), merged_count))
+
+    planned.sort(key=lambda item: item[1], reverse=True)
+    return [window for window, _ in planned]
+
+
+def _as_datetime(bound) -> datetime.datetime:
+    if isinstance(bound, datetime.datetime):
+        return bound
+    return datetime.datetime.combine(bound, datetime.time())
+
+
+def resume_bound(window: Window, progress):
+    """
+        Returns search limit (`until`) that continues a window from its
+        recorded progress: end of the window if no tweet of it is recorded,
+        otherwise a second after its oldest recorded tweet (`until` of a
+        search takes whole seconds, so tweets of that second are searched
+        again and skipped as duplicates).
+
+            Args:
+                `window` (Window): search window
+                `progress` (WindowProgress): recorded progress of the window,
+                    None if it is not started
+
+            Returns:
+                datetime.date or datetime.datetime (UTC), None if window is
+                completed
+    """
+    if progress is not None and progress.completed:
+        return None
+    if progress is None or progress.oldest_post_date is None:
+        return window.until
+    return (datetime.datetime.utcfromtimestamp(progress.oldest_post_date) +
+            datetime.timedelta(seconds=1))
+
+
+def retry_windows(progresses: list, missing_dates: list, step_days=1) -> list:
+    """
+        Returns windows to be run again: started but incomplete windows and
+        windows of missing dates that no recorded window overlaps.
+
+            Args:
+                `progresses` (list): recorded WindowProgress of a key group
+                `missing_dates` (list): datetime.date of days without tweets
+                `step_days` (int): length of a window of a missing date
+
+            Returns:
+                list of Window
+    """
+    windows = [Window(progress.since, progress.until)
+               for progress in progresses if not progress.completed]
+
+    for date in missing_dates:
+        day_start = _as_datetime(date)
+        day_end = day_start + DAY
+        if not any(_as_datetime(progress.since) < day_end and
+                   day_start < _as_datetime(progress.until)
+                   for progress in progresses):
+            windows.append(Window(date, date + DAY * step_days))
+    return windows
@@ -1,9 +1,16 @@
 import time
 
+from metrics import log
+
 
 class Writer:
 
-    def __init__(self, **kwargs):
+    __slots__ = ('user_id', 'username', 'following', 'follower', 'tweet_count',
+                 'bio_text', 'location', 'website', 'born', 'joined')
+
+    def __init__(self, user_id, username, following, follower, tweet_count=None,
+                 bio_text=None, location=None, website=None, born=None,
+                 joined=None):
         """
             writer instance that keeps infromation of twitter user.
             To create an instance some keyword arguments must be set.
@@ -21,44 +28,28 @@ class Writer:
                     `joined` (struct_time): join date of user to twitter in struct_time
         """
 
-        self.user_id = kwargs['user_id']
-        self.username = kwargs['username']
-        self.following = kwargs['following']
-        self.follower = kwargs['follower']
-        try:
-            self.tweet_count = kwargs['tweet_count']
-        except KeyError:
-            self.tweet_count = None
-        try:
-            self.bio_text = kwargs['bio_text']
-        except KeyError:
-            self.bio_text = None
-        try:
-            self.location = kwargs['location']
-        except KeyError:
-            self.location = None
-        try:
-            self.website = kwargs['website']
-        except KeyError:
-            self.website = None
-        try:
-            self.born = kwargs['born']
-            if not isinstance(self.born, time.struct_time):
-                if self.born is not None:
-                    print("Born must be struct_time")
-                    self.born = None
-        except KeyError:
-            self.joined = None
-        try:
-            self.joined = kwargs['joined']
-            if not isinstance(self.joined, time.struct_time):
-                print("Joined time must be struct_time")
-                self.joined = None
-        except KeyError:
+        self.user_id = user_id
+        self.username = username
+        self.following = following
+        self.follower = follower
+        self.tweet_count = tweet_count
+        self.bio_text = bio_text
+        self.location = location
+        self.website = website
+        self.born = born
+        if not isinstance(self.born, time.struct_time):
+            if self.born is not None:
+                log('writer_error', "Born must be struct_time",
+                    user_id=user_id, field='born')
+                self.born = None
+        self.joined = joined
+        if not isinstance(self.joined, time.struct_time):
+            log('writer_error', "Joined time must be struct_time",
+                user_id=user_id, field='joined')
             self.joined = None
 
     def __hash__(self):
-        return self.user_id
+        return hash(self.user_id)
 
     def __eq__(self, other):
         if not isinstance(other, type(self)):
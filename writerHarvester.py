@@ -0,0 +1,236 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from browserProfile import lean_profile_from_settings
+from cliArgs import bool_argument
+from collector import DOM_EXTRACTION_MODES, PACING_MODES
+from dbWriter import DBWriter
+from metrics import log
+from sessionPool import SessionPool
+from tweetDB import TweetDB, UnreachableWriter
+from writer import Writer
+
+
+class WriterHarvester:
+    """
+    Collects writer profiles in parallel with the sessions of a SessionPool.
+    Writer ids are split into shards that are taken by the next free worker,
+    a worker keeps its session for a whole shard. Collected profiles and
+    unreachable writers are handed to a DBWriter as soon as they are read,
+    so an interrupted harvest continues from `TweetDB.get_missing_writers`.
+    """
+
+    def __init__(self, session_pool: SessionPool, db_writer: DBWriter,
+                 worker_count: int, retry_count=2, shard_size=20,
+                 pacing='event', extraction='script'):
+        """
+            Args:
+                `session_pool` (SessionPool): pool of logged-in collectors,
+                    should have at least `worker_count` sessions
+                `db_writer` (DBWriter): started writer of the database
+                `worker_count` (int): number of parallel workers
+                `retry_count` (int): re-run number of a writer whose profile
+                    cannot be read for an unknown reason, it is recorded as
+                    'unknown' unreachable writer afterwards
+                `shard_size` (int): number of writers visited with a lease
+                `pacing` (str): `'sleep'` or `'event'`, see `PACING_MODES`
+                `extraction` (str): `'element'` or `'script'`, see
+                    `DOM_EXTRACTION_MODES`
+        """
+        if pacing not in PACING_MODES:
+            raise ValueError(f"unknown pacing mode: {pacing}")
+        if extraction not in DOM_EXTRACTION_MODES:
+            raise ValueError(f"unknown extraction mode: {extraction}")
+        self._session_pool = session_pool
+        self._db_writer = db_writer
+        self._worker_count = worker_count
+        self._retry_count = retry_count
+        self._shard_size = shard_size
+        self._pacing = pacing
+        self._extraction = extraction
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Stops workers after the writer they are visiting"""
+        self._cancelled.set()
+
+    def _harvest_shard(self, shard: list, work: queue.Queue,
+                       results: queue.Queue) -> None:
+        """Visits writers of a shard, puts (user_id, status) into `results`
+        and queues writers to be retried again"""
+        if self._cancelled.is_set():
+            for user_id, _ in shard:
+                results.put((user_id, 'cancelled'))
+            return
+
+        retries = []
+        done = 0
+        try:
+            with self._session_pool.lease() as collector:
+                for user_id, attempt in shard:
+                    if self._cancelled.is_set():
+                        break
+                    writer = collector.retrieve_writer(
+                        user_id, pacing=self._pacing,
+                        extraction=self._extraction)
+                    done += 1
+                    if isinstance(writer, Writer):
+                        self._db_writer.put_writer(writer)
+                        results.put((user_id, 'collected'))
+                    elif writer.status is None and attempt <= self._retry_count:
+                        retries.append((user_id, attempt + 1))
+                    else:
+                        self._db_writer.put_unreachable(UnreachableWriter(
+                            user_id, writer.status or 'unknown'))
+                        results.put((user_id, 'unreachable'))
+        except Exception as e:
+            log('shard_error',
+                f"Writer shard failed after {done}/{len(shard)} writers: {e}",
+                done=done, shard=len(shard), error=str(e))
+            for user_id, attempt in shard[done:]:
+                if attempt <= self._retry_count:
+                    retries.append((user_id, attempt + 1))
+                else:
+                    results.put((user_id, 'failed'))
+            done = len(shard)
+
+        if self._cancelled.is_set():
+            for user_id, _ in retries + shard[done:]:
+                results.put((user_id, 'cancelled'))
+        elif retries:
+            work.put(retries)
+
+    def _work(self, work: queue.Queue, results: queue.Queue) -> None:
+        """Worker loop, runs until a None is taken from `work`"""
+        while True:
+            shard = work.get()
+            if shard is None:
+                return
+            self._harvest_shard(shard, work, results)
+
+    def harvest(self, user_ids) -> dict:
+        """
+            Collects profiles of given writers and blocks until each of them
+            is collected, recorded as unreachable, failed or cancelled.
+            KeyboardInterrupt cancels the harvest.
+
+                Args:
+                    `user_ids` (iterable): ids of writers to visit
+
+                Returns:
+                    dict of <status, writer count>
+
+                Raises:
+                    DBWriterError if collected profiles could not be written
+        """
+        user_ids = list(user_ids)
+        work = queue.Queue()
+        results = queue.Queue()
+        for i in range(0, len(user_ids), self._shard_size):
+            work.put([(user_id, 1)
+                      for user_id in user_ids[i:i + self._shard_size]])
+
+        counts = dict()
+        finished = 0
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=self._worker_count) as executor:
+            for _ in range(self._worker_count):
+                executor.submit(self._work, work, results)
+
+            try:
+                while finished < len(user_ids):
+                    try:
+                        user_id, status = results.get()
+                    except KeyboardInterrupt:
+                        log('cancel', "Cancelling writer collection...")
+                        self.cancel()
+                        continue
+                    finished += 1
+                    counts[status] = counts.get(status, 0) + 1
+                    if finished % 100 == 0 or finished == len(user_ids):
+                        rate = finished / max(time.time() - t0, 1e-9)
+                        log('writers', f"{finished}/{len(user_ids)} writers, "
+                            f"{rate:.2f} writers/s", finished=finished,
+                            total=len(user_ids), rate=round(rate, 2))
+            except BaseException:
+                self.cancel()
+                raise
+            finally:
+                for _ in range(self._worker_count):
+                    work.put(None)
+
+        self._db_writer.flush()
+        return counts
+
+
+if __name__ == "__main__":
+    argv_parser = argparse.ArgumentParser()
+    argv_parser.add_argument('-i', '--database', type=str, required=True,
+                             help="database name (without .db) whose writers are collected")
+    argv_parser.add_argument('-f', '--settings_file', type=bool_argument, default=True,
+                             help="use settings.json file (ignore setting parameters)")
+    argv_parser.add_argument('-u', '--username', type=str, required=False,
+                             help="username of twitter account")
+    argv_parser.add_argument('-p', '--password', type=str, required=False,
+                             help="password of twitter account")
+    argv_parser.add_argument('-d', '--chromedriver_path', type=str,
+                             default='chromedriver',
+                             help="chromedriver path that is used")
+    argv_parser.add_argument('-t', '--session_count', type=int, default=4,
+                             help="number of parallel browser sessions")
+    argv_parser.add_argument('-w', '--writer_retries', type=int, default=2,
+                             help="re-run number of a writer whose profile cannot be read")
+    argv_parser.add_argument('-g', '--pacing', type=str, default='event',
+                             choices=PACING_MODES,
+                             help="wait for rendered profile (event) or fixed seconds (sleep)")
+    argv_parser.add_argument('-x', '--extraction', type=str, default='script',
+                             choices=DOM_EXTRACTION_MODES,
+                             help="read profile fields with a single javascript call (script) or one call per field (element)")
+    argv_parser.add_argument('-L', '--lean_profile', type=bool_argument, default=False,
+                             help="start browsers without images, media, fonts and unused features")
+    args = argv_parser.parse_args()
+
+    if args.settings_file:
+        with open("settings.json", 'r') as settings_file:
+            settings = json.load(settings_file)
+        USERNAME = settings["username"]
+        PASSWORD = settings["password"]
+        CHROMEDRIVER_PATH = settings["chromedriver_path"]
+        RECYCLE_PAGES = settings.get("recycle_pages", 50)
+        DB_PRAGMAS = settings.get("db_pragmas")
+        LEAN_PROFILE = lean_profile_from_settings(settings.get("lean_profile", False))
+    else:
+        USERNAME = args.username
+        PASSWORD = args.password
+        CHROMEDRIVER_PATH = args.chromedriver_path
+        RECYCLE_PAGES = 50
+        DB_PRAGMAS = None
+        LEAN_PROFILE = lean_profile_from_settings(args.lean_profile)
+
+    database = TweetDB(args.database, pragmas=DB_PRAGMAS)
+    database.create_tables()
+    user_ids = database.get_missing_writers()
+    database.close_DB()
+    print(f"Collecting {len(user_ids)} writers with {args.session_count} sessions.")
+
+    db_writer = DBWriter(args.database, pragmas=DB_PRAGMAS)
+    db_writer.start()
+    session_pool = SessionPool(args.session_count, USERNAME, PASSWORD,
+                               chromePath=CHROMEDRIVER_PATH,
+                               recycle_pages=RECYCLE_PAGES,
+                               lean_profile=LEAN_PROFILE)
+    harvester = WriterHarvester(session_pool, db_writer, args.session_count,
+                                retry_count=args.writer_retries,
+                                pacing=args.pacing,
+                                extraction=args.extraction)
+    try:
+        counts = harvester.harvest(user_ids)
+    finally:
+        session_pool.close()
+        db_writer.close()
+
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))